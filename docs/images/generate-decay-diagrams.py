@@ -1,19 +1,40 @@
 #!/usr/bin/env python3
 """Generate context decay model diagrams for docs/hooks-and-ways/context-decay.md"""
 
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
+import argparse
+import hashlib
+import inspect
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 from pathlib import Path
 
+import numpy as np
+
 OUTPUT_DIR = Path(__file__).parent
+ANALYTICS_DIR = Path(__file__).resolve().parents[2] / 'tools' / 'ways-analytics'
+
+# The numeric model is shared with the analytics tools
+sys.path.insert(0, str(ANALYTICS_DIR))
+from decay_model import (  # noqa: E402
+    damped_sawtooth, injected_adherence, injection_envelope, moving_average,
+    rope_aggregate,
+)
+from downsample import downsample_curves  # noqa: E402
+
+# Measured inputs: figures use them when the file exists
+# (tools/ways-analytics/cofire.py --npz docs/images/cofire.npz,
+#  tools/ways-analytics/spectra.py --npz docs/images/spectra.npz)
+COFIRE_DATA = OUTPUT_DIR / 'cofire.npz'
+SPECTRA_DATA = OUTPUT_DIR / 'spectra.npz'
 
 # --- Style ---
 # Clean, modern style that reads well on both light and dark GitHub backgrounds.
 # Use a subtle off-white background so the plot area is visible on dark themes
 # without being harsh on light themes.
 
-plt.rcParams.update({
+STYLE = {
     'font.family': 'sans-serif',
     'font.sans-serif': ['DejaVu Sans', 'Helvetica', 'Arial'],
     'font.size': 11,
@@ -32,7 +53,9 @@ plt.rcParams.update({
     'text.color': '#2D3748',
     'legend.framealpha': 0.9,
     'legend.edgecolor': '#CBD5E0',
-})
+}
+
+DPI = 180
 
 # Color palette from the project's Mermaid style guide
 TEAL = '#2D7D9A'
@@ -42,90 +65,199 @@ ORANGE = '#C2572A'
 SLATE = '#5A6ABF'
 AMBER = '#8E6B2D'
 
+# matplotlib is only imported once a figure is actually rendered, so --list,
+# --data-only and the build-mode freshness check stay numpy-only.
+plt = None
+
+
+def load_pyplot():
+    """Import pyplot on first use with a non-interactive backend and STYLE."""
+    global plt
+    if plt is None:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as pyplot
+        pyplot.rcParams.update(STYLE)
+        plt = pyplot
+    return plt
+
+
 # --------------------------------------------------------------------------
-# Helper: generate damped sawtooth
+# Curves — the numbers behind each figure (no matplotlib)
 # --------------------------------------------------------------------------
 
-def damped_sawtooth(t, user_turns, alpha=0.35, beta=0.8, A0=1.0):
-    """
-    Model adherence as A0 * n^-alpha * exp(-beta * t_local).
-    user_turns: list of t values where user messages occur (partial reset).
-    Each user turn resets t_local to 0; the peak at reset equals the envelope.
-    Returns adherence array same shape as t.
-    """
-    adherence = np.zeros_like(t)
-    turn_idx = 0
-    n = 1  # turn counter
+def curves_sawtooth():
+    t = np.linspace(0.1, 30, 2000)
+    user_turns = [5, 10, 15, 20, 25]
 
-    for i, ti in enumerate(t):
-        # Check if we've passed a user turn boundary
-        while turn_idx < len(user_turns) and ti >= user_turns[turn_idx]:
-            n += 1
-            turn_idx += 1
+    alpha, beta = 0.38, 0.55
+    adherence = damped_sawtooth(t, user_turns, alpha=alpha, beta=beta)
 
-        # t_local: tokens since last user message
-        if turn_idx > 0:
-            t_local = ti - user_turns[turn_idx - 1]
-        else:
-            t_local = ti
+    # Decaying envelope (peak at each turn = A0 * n^-alpha), extended to the end
+    envelope_t = np.append([0.1] + user_turns, 30)
+    envelope_peaks = 1.0 * np.arange(1, len(envelope_t) + 1) ** -alpha
 
-        envelope = A0 * (n ** -alpha)
-        local_decay = np.exp(-beta * t_local)
-        adherence[i] = envelope * local_decay
+    return {
+        't': t, 'user_turns': np.array(user_turns, dtype=float),
+        'adherence': adherence,
+        'envelope_t': envelope_t, 'envelope_peaks': envelope_peaks,
+    }
 
-    return np.clip(adherence, 0, A0)
 
+def curves_steady():
+    t = np.linspace(0.1, 30, 2000)
+    user_turns = [5, 10, 15, 20, 25]
+    way_injections = [7.5, 17.5, 27]
 
-def injected_adherence(t, user_turns, way_injections, alpha=0.35, beta=0.8,
-                       A0=1.0, A_inject=0.7):
-    """
-    Combined adherence: decaying system prompt + fresh injections.
-    way_injections: list of t values where ways fire.
-    The injection term uses exp(-beta * t_since_inject) — same local decay,
-    but no turn-count envelope because it's not pinned at position zero.
-    """
-    base = damped_sawtooth(t, user_turns, alpha, beta, A0)
+    alpha, beta = 0.38, 0.55
+    return {
+        't': t, 'user_turns': np.array(user_turns, dtype=float),
+        'way_injections': np.array(way_injections, dtype=float),
+        'adherence_no_ways': damped_sawtooth(t, user_turns, alpha=alpha,
+                                             beta=beta),
+        'adherence_ways': injected_adherence(t, user_turns, way_injections,
+                                             alpha=alpha, beta=beta,
+                                             A_inject=0.65),
+    }
 
-    inject_component = np.zeros_like(t)
-    for inj_t in way_injections:
-        for i, ti in enumerate(t):
-            if ti >= inj_t:
-                t_since = ti - inj_t
-                contrib = A_inject * np.exp(-beta * t_since)
-                inject_component[i] = max(inject_component[i], contrib)
 
-    combined = base + inject_component
-    return np.clip(combined, 0, 1.3)
+def curves_saturation():
+    n_concurrent = np.linspace(0, 20, 200)
+    A_inject = 0.85
 
+    # Different competition coefficients
+    k_values = np.array([0.15, 0.3, 0.6])
+    A_eff = A_inject / (1 + k_values[:, None] * n_concurrent)
+    c = {'n_concurrent': n_concurrent, 'k_values': k_values, 'A_eff': A_eff}
 
-# --------------------------------------------------------------------------
-# Figure 1: Damped Sawtooth (no ways)
-# --------------------------------------------------------------------------
+    # Observed live injections at each injection point, from cofire.py
+    if COFIRE_DATA.is_file():
+        with np.load(COFIRE_DATA) as obs:
+            c['observed_n'] = obs['n']
+            c['observed_share'] = obs['share_points']
+            c['observed_quantiles'] = obs['quantiles']
+    return c
 
-def fig_damped_sawtooth():
-    fig, ax = plt.subplots(figsize=(10, 4.5))
 
+def curves_rope():
+    distance = np.arange(1, 513)
+    d_model = 128
+    base = 10000
+
+    # Aggregate attention score (mean over all bands)
+    aggregate = rope_aggregate(distance, d_model=d_model, base=base)
+
+    # Smooth envelope of aggregate for readability
+    envelope = moving_average(np.abs(aggregate), 30)
+
+    # Two representative bands: high-frequency (rapid decay), low (persists)
+    band_high = np.cos(distance * base ** (-2 * 2 / d_model))
+    band_low = np.cos(distance * base ** (-2 * 50 / d_model))
+
+    return {
+        'distance': distance, 'aggregate': aggregate, 'envelope': envelope,
+        'band_high': band_high, 'band_low': band_low,
+    }
+
+
+def curves_error():
+    rng = np.random.RandomState(42)
+    t = np.linspace(0, 30, 3000)
+
+    # Strategic drift: slow, low-frequency error that grows over time
+    strategic_drift = 0.08 * np.sin(0.3 * t) + 0.04 * t / 30
+
+    # Tactical noise: high-frequency convention violations, format errors
+    tactical_noise = (0.25 * np.sin(5.5 * t) +
+                      0.15 * np.sin(13 * t + 1.2) +
+                      0.1 * rng.randn(len(t)))
+    # Add occasional spikes (missed conventions)
+    spike_positions = np.array([3.5, 7.2, 11.8, 14.1, 18.5, 22.3, 26.7])
+    spikes = 0.35 * np.exp(-8 * (t[None, :] - spike_positions[:, None])**2).sum(axis=0)
+
+    tactical_noise += spikes
+
+    # Inner loop absorbs tactical noise — only strategic drift remains
+    # Plus some residual noise (inner loop isn't perfect)
+    residual = 0.04 * rng.randn(len(t))
+
+    return {
+        't': t, 'strategic_drift': strategic_drift,
+        'error_no_ways': strategic_drift + tactical_noise,
+        'error_with_ways': strategic_drift + residual,
+    }
+
+
+def curves_bode():
+    # Fleet spectra from spectra.py replace the model below: errors as the
+    # disturbance, corrections as what reaches the human, both scaled so the
+    # disturbance peaks at 0.5 on the figure's axis
+    if SPECTRA_DATA.is_file():
+        with np.load(SPECTRA_DATA) as obs:
+            scale = 0.5 / obs['disturbance_spectrum'].max()
+            return {
+                'freq': obs['freq'],
+                'disturbance_spectrum': obs['disturbance_spectrum'] * scale,
+                'human_sees': obs['human_sees'] * scale,
+                'crossover_freq': obs['crossover_freq'],
+                'observed': np.array(True),
+            }
+
+    # Frequency axis (log scale): low freq = strategic, high freq = tactical
+    freq = np.logspace(-2, 2, 500)
+
+    # Disturbance spectrum: combination of low-freq strategic and high-freq tactical
+    disturbance_spectrum = 0.5 / (1 + (freq / 0.3)**2) + 0.8 / (1 + ((freq - 8) / 3)**2)
+    disturbance_spectrum += 0.05  # noise floor
+
+    # Inner loop (ways) rejection: high-pass filter — attenuates high frequencies
+    # Ways act as a disturbance rejection that handles tactical (high-freq) errors
+    inner_loop_rejection = 1.0 / (1 + (freq / 1.5)**2)
+
+    return {
+        'freq': freq, 'disturbance_spectrum': disturbance_spectrum,
+        # What passes through to the human
+        'human_sees': disturbance_spectrum * inner_loop_rejection,
+        'crossover_freq': np.array(1.5),
+    }
+
+
+def curves_composite():
     t = np.linspace(0.1, 30, 2000)
     user_turns = [5, 10, 15, 20, 25]
+    way_injections = [3, 7, 12, 17, 22, 27]
 
     alpha, beta = 0.38, 0.55
-    adherence = damped_sawtooth(t, user_turns, alpha=alpha, beta=beta)
+
+    return {
+        't': t, 'user_turns': np.array(user_turns, dtype=float),
+        'way_injections': np.array(way_injections, dtype=float),
+        # Component 1: System prompt (decaying)
+        'sys_prompt': damped_sawtooth(t, user_turns, alpha=alpha, beta=beta,
+                                      A0=0.8),
+        # Component 2: Ways (inner loop injections)
+        'ways_component': injection_envelope(t, way_injections,
+                                             amplitude=0.45, beta=beta),
+        # Component 3: Human steering — a sharp boost at each user turn
+        'human_component': injection_envelope(t, user_turns, amplitude=0.25,
+                                              beta=0.8),
+    }
+
+# --------------------------------------------------------------------------
+# Figure 1: Damped Sawtooth (no ways)
+# --------------------------------------------------------------------------
+
+def fig_damped_sawtooth(c):
+    t, user_turns, adherence = c['t'], c['user_turns'], c['adherence']
+
+    fig, ax = plt.subplots(figsize=(10, 4.5))
 
     # Fill under the curve
     ax.fill_between(t, adherence, alpha=0.15, color=ORANGE)
     ax.plot(t, adherence, color=ORANGE, linewidth=2, label='System prompt adherence')
 
     # Draw the decaying envelope (peak at each turn = A0 * n^-alpha)
-    envelope_t = np.array([0.1] + user_turns)
-    envelope_peaks = []
-    for n_val, ut in enumerate(envelope_t, 1):
-        peak = 1.0 * (n_val ** -alpha)
-        envelope_peaks.append(peak)
-    # Extend envelope to end
-    envelope_t_ext = np.append(envelope_t, 30)
-    envelope_peaks.append(1.0 * ((len(envelope_t) + 1) ** -alpha))
-
-    ax.plot(envelope_t_ext, envelope_peaks, '--', color=PURPLE, linewidth=1.5,
+    ax.plot(c['envelope_t'], c['envelope_peaks'], '--', color=PURPLE, linewidth=1.5,
             alpha=0.7, label=r'Peak envelope ($n^{-\alpha}$)')
 
     # Mark user turns
@@ -154,27 +286,20 @@ def fig_damped_sawtooth():
     ax.grid(True, axis='y')
 
     fig.tight_layout()
-    fig.savefig(OUTPUT_DIR / 'context-decay-sawtooth.png', dpi=180,
-                bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close(fig)
-    print('  context-decay-sawtooth.png')
+    return fig
 
 
 # --------------------------------------------------------------------------
 # Figure 2: With injection (steady state)
 # --------------------------------------------------------------------------
 
-def fig_steady_state():
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4.5), sharey=True)
-
-    t = np.linspace(0.1, 30, 2000)
-    user_turns = [5, 10, 15, 20, 25]
-    way_injections = [7.5, 17.5, 27]
+def fig_steady_state(c):
+    t, way_injections = c['t'], c['way_injections']
+    adherence_no_ways = c['adherence_no_ways']
 
-    alpha, beta = 0.38, 0.55
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4.5), sharey=True)
 
     # Left panel: without ways (same as fig 1 but smaller)
-    adherence_no_ways = damped_sawtooth(t, user_turns, alpha=alpha, beta=beta)
     ax1.fill_between(t, adherence_no_ways, alpha=0.12, color=ORANGE)
     ax1.plot(t, adherence_no_ways, color=ORANGE, linewidth=2)
     ax1.axhline(0.15, color='#A0AEC0', linewidth=1, linestyle='--', alpha=0.6)
@@ -194,9 +319,7 @@ def fig_steady_state():
              color=ORANGE, ha='center', style='italic', alpha=0.8)
 
     # Right panel: with ways
-    adherence_ways = injected_adherence(t, user_turns, way_injections,
-                                        alpha=alpha, beta=beta,
-                                        A_inject=0.65)
+    adherence_ways = c['adherence_ways']
     ax2.fill_between(t, adherence_ways, alpha=0.12, color=GREEN)
     ax2.plot(t, adherence_ways, color=GREEN, linewidth=2,
              label='Combined adherence')
@@ -228,38 +351,52 @@ def fig_steady_state():
     fig.suptitle('Timed Injection Maintains Adherence Across Conversation Length',
                  fontsize=13, fontweight='bold', y=1.02)
     fig.tight_layout()
-    fig.savefig(OUTPUT_DIR / 'context-decay-comparison.png', dpi=180,
-                bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close(fig)
-    print('  context-decay-comparison.png')
+    return fig
 
 
 # --------------------------------------------------------------------------
 # Figure 3: Saturation curve
 # --------------------------------------------------------------------------
 
-def fig_saturation():
-    fig, ax = plt.subplots(figsize=(8, 4.5))
+def fig_saturation(c):
+    n_concurrent = c['n_concurrent']
 
-    n_concurrent = np.linspace(0, 20, 200)
-    A_inject = 0.85
+    fig, ax = plt.subplots(figsize=(8, 4.5))
 
     # Different competition coefficients
-    k_values = [0.15, 0.3, 0.6]
     colors = [GREEN, TEAL, PURPLE]
     labels = ['Low competition (small ways)', 'Medium competition',
               'High competition (large ways)']
 
-    for k, color, label in zip(k_values, colors, labels):
-        A_eff = A_inject / (1 + k * n_concurrent)
+    for A_eff, color, label in zip(c['A_eff'], colors, labels):
         ax.plot(n_concurrent, A_eff, color=color, linewidth=2.2, label=label)
 
-    # Mark the sweet spot
-    ax.axvspan(1, 4, alpha=0.08, color=GREEN)
-    ax.text(2.5, 0.88, 'sweet spot\n(1-4 ways)', fontsize=9, ha='center',
-            color=GREEN, style='italic',
-            bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
-                      edgecolor=GREEN, alpha=0.8))
+    if 'observed_share' in c:
+        # Measured concurrency behind the curves; the band is its p50-p90
+        share = c['observed_share']
+        ax_obs = ax.twinx()
+        ax_obs.bar(c['observed_n'], share, width=0.8, color=SLATE, alpha=0.18,
+                   label='Observed (share of injections)')
+        ax_obs.set_ylim(0, share.max() * 2.2)
+        ax_obs.set_ylabel('Share of injection points', fontsize=10, color=SLATE)
+        ax_obs.tick_params(axis='y', colors=SLATE)
+        ax.set_zorder(ax_obs.get_zorder() + 1)
+        ax.patch.set_visible(False)
+
+        p50, p90 = (int(q) for q in c['observed_quantiles'][:2])
+        ax.axvspan(p50, max(p90, p50 + 0.5), alpha=0.08, color=GREEN)
+        ax.text((p50 + max(p90, p50 + 0.5)) / 2, 0.88,
+                f'observed\n(p50-p90: {p50}-{p90})', fontsize=9, ha='center',
+                color=GREEN, style='italic',
+                bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
+                          edgecolor=GREEN, alpha=0.8))
+    else:
+        # Mark the sweet spot
+        ax.axvspan(1, 4, alpha=0.08, color=GREEN)
+        ax.text(2.5, 0.88, 'sweet spot\n(1-4 ways)', fontsize=9, ha='center',
+                color=GREEN, style='italic',
+                bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
+                          edgecolor=GREEN, alpha=0.8))
 
     # Diminishing returns zone
     ax.axvspan(8, 20, alpha=0.05, color=ORANGE)
@@ -273,50 +410,34 @@ def fig_saturation():
     ax.set_xlim(0, 20)
     ax.set_ylim(0, 1.0)
     ax.set_xticks([0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20])
-    ax.legend(loc='upper right', fontsize=9)
+    handles, labels = ax.get_legend_handles_labels()
+    if 'observed_share' in c:
+        extra = ax_obs.get_legend_handles_labels()
+        handles, labels = handles + extra[0], labels + extra[1]
+    ax.legend(handles, labels, loc='upper right', fontsize=9)
     ax.grid(True, alpha=0.5)
 
     fig.tight_layout()
-    fig.savefig(OUTPUT_DIR / 'context-decay-saturation.png', dpi=180,
-                bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close(fig)
-    print('  context-decay-saturation.png')
+    return fig
 
 
 # --------------------------------------------------------------------------
 # Figure 4: RoPE Positional Decay — frequency band decomposition
 # --------------------------------------------------------------------------
 
-def fig_rope_decay():
-    fig, ax = plt.subplots(figsize=(10, 5))
+def fig_rope_decay(c):
+    distance, aggregate, envelope = c['distance'], c['aggregate'], c['envelope']
 
-    distance = np.arange(1, 513)
-    d_model = 128
-    base = 10000
-
-    # Compute aggregate attention score (sum of all bands, normalized)
-    aggregate = np.zeros_like(distance, dtype=float)
-    for k in range(d_model // 2):
-        theta_k = base ** (-2 * k / d_model)
-        aggregate += np.cos(distance * theta_k)
-    aggregate /= (d_model // 2)
-
-    # Smooth envelope of aggregate for readability
-    from scipy.ndimage import uniform_filter1d
-    envelope = uniform_filter1d(np.abs(aggregate), size=30)
+    fig, ax = plt.subplots(figsize=(10, 5))
 
     # Show just two representative bands as faint background context
     # High-frequency: rapid oscillation, decays fast
-    theta_high = base ** (-2 * 2 / d_model)
-    band_high = np.cos(distance * theta_high)
-    ax.plot(distance, band_high, color=ORANGE, linewidth=0.8, alpha=0.25)
+    ax.plot(distance, c['band_high'], color=ORANGE, linewidth=0.8, alpha=0.25)
     ax.text(80, 0.82, 'high-freq band\n(rapid decay)', fontsize=8.5,
             color=ORANGE, alpha=0.7, style='italic')
 
     # Low-frequency: slow oscillation, persists
-    theta_low = base ** (-2 * 50 / d_model)
-    band_low = np.cos(distance * theta_low)
-    ax.plot(distance, band_low, color=PURPLE, linewidth=0.8, alpha=0.25)
+    ax.plot(distance, c['band_low'], color=PURPLE, linewidth=0.8, alpha=0.25)
     ax.text(350, 0.82, 'low-freq band\n(slow decay)', fontsize=8.5,
             color=PURPLE, alpha=0.7, style='italic')
 
@@ -357,39 +478,20 @@ def fig_rope_decay():
     ax.grid(True, alpha=0.4)
 
     fig.tight_layout()
-    fig.savefig(OUTPUT_DIR / 'formal-rope-decay.png', dpi=180,
-                bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close(fig)
-    print('  formal-rope-decay.png')
+    return fig
 
 
 # --------------------------------------------------------------------------
 # Figure 5: Operator Error Envelope — difficulty floor comparison
 # --------------------------------------------------------------------------
 
-def fig_error_envelope():
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(11, 7), sharex=True)
-
-    np.random.seed(42)
-    t = np.linspace(0, 30, 3000)
-
-    # Strategic drift: slow, low-frequency error that grows over time
-    strategic_drift = 0.08 * np.sin(0.3 * t) + 0.04 * t / 30
-
-    # Tactical noise: high-frequency convention violations, format errors
-    tactical_noise = (0.25 * np.sin(5.5 * t) +
-                      0.15 * np.sin(13 * t + 1.2) +
-                      0.1 * np.random.randn(len(t)))
-    # Add occasional spikes (missed conventions)
-    spikes = np.zeros_like(t)
-    spike_positions = [3.5, 7.2, 11.8, 14.1, 18.5, 22.3, 26.7]
-    for sp in spike_positions:
-        spikes += 0.35 * np.exp(-8 * (t - sp)**2)
+def fig_error_envelope(c):
+    t, strategic_drift = c['t'], c['strategic_drift']
+    error_no_ways, error_with_ways = c['error_no_ways'], c['error_with_ways']
 
-    tactical_noise += spikes
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(11, 7), sharex=True)
 
     # --- Top panel: WITHOUT WAYS ---
-    error_no_ways = strategic_drift + tactical_noise
     ax1.fill_between(t, error_no_ways, alpha=0.15, color=ORANGE)
     ax1.plot(t, error_no_ways, color=ORANGE, linewidth=1.2,
              label='Total error (human must correct)')
@@ -425,11 +527,6 @@ def fig_error_envelope():
     ax1.grid(True, axis='y', alpha=0.4)
 
     # --- Bottom panel: WITH WAYS ---
-    # Inner loop absorbs tactical noise — only strategic drift remains
-    # Plus some residual noise (inner loop isn't perfect)
-    residual = 0.04 * np.random.randn(len(t))
-    error_with_ways = strategic_drift + residual
-
     ax2.fill_between(t, error_with_ways, alpha=0.15, color=GREEN)
     ax2.plot(t, error_with_ways, color=GREEN, linewidth=1.2,
              label='Residual error (after inner loop)')
@@ -470,32 +567,18 @@ def fig_error_envelope():
     fig.suptitle('The Difficulty Floor: How Cascade Control Reduces Operator Workload',
                  fontsize=13, fontweight='bold', y=1.01)
     fig.tight_layout()
-    fig.savefig(OUTPUT_DIR / 'formal-error-envelope.png', dpi=180,
-                bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close(fig)
-    print('  formal-error-envelope.png')
+    return fig
 
 
 # --------------------------------------------------------------------------
 # Figure 6: Cascade Disturbance Rejection — Bode magnitude plot
 # --------------------------------------------------------------------------
 
-def fig_cascade_bode():
-    fig, ax = plt.subplots(figsize=(10, 5.5))
+def fig_cascade_bode(c):
+    freq, disturbance_spectrum = c['freq'], c['disturbance_spectrum']
+    human_sees = c['human_sees']
 
-    # Frequency axis (log scale): low freq = strategic, high freq = tactical
-    freq = np.logspace(-2, 2, 500)
-
-    # Disturbance spectrum: combination of low-freq strategic and high-freq tactical
-    disturbance_spectrum = 0.5 / (1 + (freq / 0.3)**2) + 0.8 / (1 + ((freq - 8) / 3)**2)
-    disturbance_spectrum += 0.05  # noise floor
-
-    # Inner loop (ways) rejection: high-pass filter — attenuates high frequencies
-    # Ways act as a disturbance rejection that handles tactical (high-freq) errors
-    inner_loop_rejection = 1.0 / (1 + (freq / 1.5)**2)
-
-    # What passes through to the human
-    human_sees = disturbance_spectrum * inner_loop_rejection
+    fig, ax = plt.subplots(figsize=(10, 5.5))
 
     # Plot
     ax.fill_between(freq, disturbance_spectrum, alpha=0.12, color=ORANGE)
@@ -511,25 +594,35 @@ def fig_cascade_bode():
                     where=(disturbance_spectrum > human_sees),
                     alpha=0.08, color=TEAL)
 
-    # Mark the crossover frequency
-    crossover_freq = 1.5
-    ax.axvline(crossover_freq, color=SLATE, linewidth=1.5, linestyle='--',
-               alpha=0.7)
-    ax.text(crossover_freq * 1.15, 0.42, 'crossover\nfrequency',
-            fontsize=9, color=SLATE, style='italic', fontweight='bold')
+    # Measured spectra span their own band; place the labels within it
+    if 'observed' in c:
+        xlim = (float(freq[0]), float(freq[-1]))
+        at = lambda frac: xlim[0] * (xlim[1] / xlim[0]) ** frac  # noqa: E731
+        strategic_x, tactical_x, arrow_x, arrow_text_x = at(0.03), at(0.62), at(0.55), at(0.72)
+    else:
+        xlim = (0.03, 80)
+        strategic_x, tactical_x, arrow_x, arrow_text_x = 0.06, 12, 6, 20
+
+    # Mark the crossover frequency (measured spectra may have none)
+    crossover_freq = float(c['crossover_freq'])
+    if np.isfinite(crossover_freq):
+        ax.axvline(crossover_freq, color=SLATE, linewidth=1.5, linestyle='--',
+                   alpha=0.7)
+        ax.text(crossover_freq * 1.15, 0.42, 'crossover\nfrequency',
+                fontsize=9, color=SLATE, style='italic', fontweight='bold')
 
     # Label the regions
-    ax.text(0.06, 0.35, 'Strategic errors\n(human handles)',
+    ax.text(strategic_x, 0.35, 'Strategic errors\n(human handles)',
             fontsize=10, color=PURPLE, fontweight='bold',
             bbox=dict(boxstyle='round,pad=0.4', facecolor='white',
                       edgecolor=PURPLE, alpha=0.9))
-    ax.text(12, 0.25, 'Tactical errors\n(ways handle)',
+    ax.text(tactical_x, 0.25, 'Tactical errors\n(ways handle)',
             fontsize=10, color=TEAL, fontweight='bold',
             bbox=dict(boxstyle='round,pad=0.4', facecolor='white',
                       edgecolor=TEAL, alpha=0.9))
 
     # Inner loop attenuation annotation
-    ax.annotate('inner loop\nattenuation', xy=(6, 0.15), xytext=(20, 0.35),
+    ax.annotate('inner loop\nattenuation', xy=(arrow_x, 0.15), xytext=(arrow_text_x, 0.35),
                 fontsize=9, color=TEAL,
                 arrowprops=dict(arrowstyle='->', color=TEAL, lw=1.5),
                 bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
@@ -540,54 +633,31 @@ def fig_cascade_bode():
                   fontsize=10)
     ax.set_ylabel('Disturbance magnitude', fontsize=11)
     ax.set_title('Cascade Disturbance Rejection: What Each Loop Handles', pad=12)
-    ax.set_xlim(0.03, 80)
+    ax.set_xlim(*xlim)
     ax.set_ylim(0, 0.65)
     ax.legend(loc='upper right', fontsize=9)
     ax.grid(True, alpha=0.4, which='both')
-    ax.set_xticks([0.1, 1, 10])
-    ax.set_xticklabels(['0.1\n(slow drift)', '1\n(per-turn)', '10\n(per-tool-call)'])
+    ticks = [(v, label) for v, label in
+             ((0.1, '0.1\n(slow drift)'), (1, '1\n(per-turn)'), (10, '10\n(per-tool-call)'))
+             if xlim[0] <= v <= xlim[1]]
+    ax.set_xticks([v for v, _ in ticks])
+    ax.set_xticklabels([label for _, label in ticks])
+    ax.tick_params(axis='x', which='minor', labelbottom=False)
 
     fig.tight_layout()
-    fig.savefig(OUTPUT_DIR / 'formal-cascade-bode.png', dpi=180,
-                bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close(fig)
-    print('  formal-cascade-bode.png')
+    return fig
 
 
 # --------------------------------------------------------------------------
 # Figure 7: Composite Adherence — stacked contributions
 # --------------------------------------------------------------------------
 
-def fig_composite_adherence():
-    fig, ax = plt.subplots(figsize=(11, 5.5))
-
-    t = np.linspace(0.1, 30, 2000)
-    user_turns = [5, 10, 15, 20, 25]
-    way_injections = [3, 7, 12, 17, 22, 27]
-
-    alpha, beta = 0.38, 0.55
-
-    # Component 1: System prompt (decaying)
-    sys_prompt = damped_sawtooth(t, user_turns, alpha=alpha, beta=beta, A0=0.8)
+def fig_composite_adherence(c):
+    t, user_turns, way_injections = c['t'], c['user_turns'], c['way_injections']
+    sys_prompt = c['sys_prompt']
+    ways_component, human_component = c['ways_component'], c['human_component']
 
-    # Component 2: Ways (inner loop injections)
-    ways_component = np.zeros_like(t)
-    for inj_t in way_injections:
-        for i, ti in enumerate(t):
-            if ti >= inj_t:
-                t_since = ti - inj_t
-                contrib = 0.45 * np.exp(-beta * t_since)
-                ways_component[i] = max(ways_component[i], contrib)
-
-    # Component 3: Human steering (periodic corrections at user turns)
-    human_component = np.zeros_like(t)
-    for ut in user_turns:
-        for i, ti in enumerate(t):
-            if ti >= ut:
-                t_since = ti - ut
-                # Human correction is a sharp boost that decays
-                contrib = 0.25 * np.exp(-0.8 * t_since)
-                human_component[i] = max(human_component[i], contrib)
+    fig, ax = plt.subplots(figsize=(11, 5.5))
 
     # Stack them
     ax.fill_between(t, 0, sys_prompt, alpha=0.3, color=ORANGE,
@@ -645,10 +715,155 @@ def fig_composite_adherence():
     ax.grid(True, axis='y', alpha=0.4)
 
     fig.tight_layout()
-    fig.savefig(OUTPUT_DIR / 'formal-composite-adherence.png', dpi=180,
+    return fig
+
+
+# --------------------------------------------------------------------------
+# Build
+# --------------------------------------------------------------------------
+
+# name → (figure function, curves function, output file)
+FIGURES = {
+    'sawtooth': (fig_damped_sawtooth, curves_sawtooth, 'context-decay-sawtooth.png'),
+    'steady': (fig_steady_state, curves_steady, 'context-decay-comparison.png'),
+    'saturation': (fig_saturation, curves_saturation, 'context-decay-saturation.png'),
+    'rope': (fig_rope_decay, curves_rope, 'formal-rope-decay.png'),
+    'error': (fig_error_envelope, curves_error, 'formal-error-envelope.png'),
+    'bode': (fig_cascade_bode, curves_bode, 'formal-cascade-bode.png'),
+    'composite': (fig_composite_adherence, curves_composite, 'formal-composite-adherence.png'),
+}
+
+# name → (x key, series sharing it, points, method), applied between the
+# curves and the figure. points is the bucket budget — one per pixel column
+# of the axes at DPI — so matplotlib's input is bounded however long the
+# trace. minmax keeps every sawtooth peak and injection edge; see downsample.py.
+DOWNSAMPLE = {
+    'sawtooth': ('t', ('adherence',), 10 * DPI, 'minmax'),
+    'steady': ('t', ('adherence_no_ways', 'adherence_ways'), 6 * DPI, 'minmax'),
+    'rope': ('distance', ('aggregate', 'envelope', 'band_high', 'band_low'), 10 * DPI, 'minmax'),
+    'error': ('t', ('strategic_drift', 'error_no_ways', 'error_with_ways'), 11 * DPI, 'minmax'),
+    'composite': ('t', ('sys_prompt', 'ways_component', 'human_component'), 11 * DPI, 'minmax'),
+}
+
+# name → measured data file the figure's curves read when present
+FIGURE_DATA = {
+    'saturation': COFIRE_DATA,
+    'bode': SPECTRA_DATA,
+}
+
+MANIFEST = OUTPUT_DIR / 'decay-diagrams.manifest.json'
+
+
+def prepare(name):
+    """Curves for one figure after its downsampling stage.
+
+    Returns (curves, samples before, samples after).
+    """
+    c = FIGURES[name][1]()
+    if name not in DOWNSAMPLE:
+        return c, None, None
+    x, series, points, method = DOWNSAMPLE[name]
+    return downsample_curves(c, x, series, points, method)
+
+
+def render(name):
+    """Render one figure to its PNG. Module-level so pool workers can call it.
+
+    Returns (name, PNG hash, samples before, samples after downsampling).
+    """
+    fn, _, filename = FIGURES[name]
+    c, before, after = prepare(name)
+    load_pyplot()
+    fig = fn(c)
+    fig.savefig(OUTPUT_DIR / filename, dpi=DPI,
                 bbox_inches='tight', facecolor=fig.get_facecolor())
     plt.close(fig)
-    print('  formal-composite-adherence.png')
+    return name, _file_hash(OUTPUT_DIR / filename), before, after
+
+
+def describe(name, before, after):
+    """Output line for a rendered figure, with the points downsampling dropped."""
+    if before is None:
+        return f'  {FIGURES[name][2]}'
+    return (f'  {FIGURES[name][2]} ({before:,} → {after:,} points,'
+            f' {before - after:,} dropped)')
+
+
+def _file_hash(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def figure_key(name):
+    """Content address for a figure: everything that can change its pixels.
+
+    Covers the figure and curves functions' source and arguments, the style
+    rcParams, the palette, the output dpi, the downsampling stage, the
+    shared numeric model and any measured data the curves read.
+    """
+    fn, curves, _ = FIGURES[name]
+    h = hashlib.sha256()
+    for f in (fn, curves):
+        h.update(inspect.getsource(f).encode())
+        h.update(repr(inspect.signature(f)).encode())
+    h.update(json.dumps(STYLE, sort_keys=True).encode())
+    h.update(json.dumps([TEAL, PURPLE, GREEN, ORANGE, SLATE, AMBER, DPI]).encode())
+    h.update(json.dumps(DOWNSAMPLE.get(name)).encode())
+    for module in ('decay_model.py', 'downsample.py'):
+        h.update((ANALYTICS_DIR / module).read_bytes())
+    data = FIGURE_DATA.get(name)
+    if data is not None and data.is_file():
+        h.update(data.read_bytes())
+    return h.hexdigest()
+
+
+def load_manifest():
+    try:
+        return json.loads(MANIFEST.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def is_current(name, manifest):
+    """A figure is current when its key matches and the PNG is the one we wrote."""
+    entry = manifest.get(name)
+    if not entry or entry.get('key') != figure_key(name):
+        return False
+    png = OUTPUT_DIR / FIGURES[name][2]
+    return png.is_file() and _file_hash(png) == entry.get('sha256')
+
+
+def build(names, jobs=None, force=False):
+    """Render stale figures in a process pool and record them in the manifest."""
+    manifest = load_manifest()
+    stale = [n for n in names if force or not is_current(n, manifest)]
+    for name in names:
+        if name not in stale:
+            print(f'  {FIGURES[name][2]} (up to date)')
+    if not stale:
+        return 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for name, digest, before, after in pool.map(render, stale):
+                manifest[name] = {
+                    'output': FIGURES[name][2],
+                    'key': figure_key(name),
+                    'sha256': digest,
+                }
+                print(describe(name, before, after))
+    finally:
+        # Keep whatever finished so a failing figure doesn't force a full rebuild
+        MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+    return len(stale)
+
+
+def write_curves(names, out_dir):
+    """Save each figure's curves as <name>.npz without importing matplotlib."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        path = out_dir / f'{name}.npz'
+        np.savez_compressed(path, **FIGURES[name][1]())
+        print(f'  {path}')
 
 
 # --------------------------------------------------------------------------
@@ -656,25 +871,49 @@ def fig_composite_adherence():
 # --------------------------------------------------------------------------
 
 if __name__ == '__main__':
-    import sys
-
-    all_figures = {
-        'sawtooth': fig_damped_sawtooth,
-        'steady': fig_steady_state,
-        'saturation': fig_saturation,
-        'rope': fig_rope_decay,
-        'error': fig_error_envelope,
-        'bode': fig_cascade_bode,
-        'composite': fig_composite_adherence,
-    }
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('figures', nargs='*', metavar='FIGURE',
+                        help=f'figures to render (default: all; available: {", ".join(FIGURES)})')
+    parser.add_argument('--build', action='store_true',
+                        help='incremental parallel build: skip figures whose PNG is up to date')
+    parser.add_argument('--force', action='store_true',
+                        help='with --build, re-render even if up to date')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes for --build (default: CPU count)')
+    parser.add_argument('--list', action='store_true',
+                        help='list figures, outputs and build status, then exit')
+    parser.add_argument('--data-only', action='store_true',
+                        help='write curves as .npz instead of rendering PNGs')
+    parser.add_argument('--out', type=Path, default=OUTPUT_DIR / 'data',
+                        help='output directory for --data-only (default: %(default)s)')
+    args = parser.parse_args()
 
     # Allow selective generation: python generate-decay-diagrams.py rope error bode composite
-    requested = sys.argv[1:] if len(sys.argv) > 1 else list(all_figures.keys())
+    requested = args.figures or list(FIGURES)
+    unknown = [n for n in requested if n not in FIGURES]
+    for name in unknown:
+        print(f'  Unknown figure: {name} (available: {", ".join(FIGURES)})')
+    requested = [n for n in requested if n in FIGURES]
+
+    if args.list:
+        manifest = load_manifest()
+        for name in requested:
+            state = 'up to date' if is_current(name, manifest) else 'stale'
+            print(f'{name:<12} {FIGURES[name][2]:<32} {state}')
+        sys.exit(0)
+
+    if args.data_only:
+        print('Writing context decay curves...')
+        write_curves(requested, args.out)
+        print('Done.')
+        sys.exit(0)
 
     print('Generating context decay diagrams...')
-    for name in requested:
-        if name in all_figures:
-            all_figures[name]()
-        else:
-            print(f'  Unknown figure: {name} (available: {", ".join(all_figures.keys())})')
-    print('Done.')
+    if args.build:
+        rendered = build(requested, jobs=args.jobs, force=args.force)
+        print(f'Done. ({rendered} rendered, {len(requested) - rendered} up to date)')
+    else:
+        for name in requested:
+            _, _, before, after = render(name)
+            print(describe(name, before, after))
+        print('Done.')
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""Token cost of progressive disclosure (ADR-105), replayed over real prompts.
+
+Loads every way under hooks/ways/ (threshold, vocabulary, scope, pattern and
+body size), replays a prompt corpus session by session through the prompt
+scan rules, and reports injected tokens per session, per tree and per depth:
+the expected (mean) and worst observed cost next to the structural numbers
+ADR-105 quotes — all-fire worst case and average root → leaf path.
+
+Usage:
+  disclosure_cost.py prompts.jsonl                  # table
+  disclosure_cost.py ~/.claude/projects/            # replay transcripts
+  disclosure_cost.py prompts.jsonl --scale 1.1      # what-if: thresholds +10%
+  disclosure_cost.py prompts.jsonl --set softwaredev/code/supplychain=2.2 --json
+
+Input: .jsonl files or directories of them. A line is a prompt if it has
+"prompt" (top level or under "payload", as in tools/ways-bench/corpus.jsonl)
+or is a transcript user message with text content. Sessions come from
+"session", "session_id" or "sessionId", else one session per file.
+
+Rules, as in `ways scan prompt` (cmd/scan/mod.rs) with the BM25 engine:
+  - a way fires on its pattern regex or a BM25 score ≥ its threshold
+    (default 2.0) over description + vocabulary; the prompt is lowercased
+  - once any ancestor way has been shown, the threshold drops to 80%
+    (--lowering); a parent shown by a prompt lowers its children for that
+    same prompt, as the scan visits a directory before its subdirectories
+  - a way is shown once per session (re-disclosure is token-gated and out
+    of scope here); state-triggered ways never fire from prompts
+  - cost is body bytes / 4, as in `ways tree`
+Note that the binary's batch_bm25_score already drops scores below a way's
+full threshold, so today lowering has no effect there; --lowering 1 models
+the binary as built.
+
+Scoring uses a term index: one BM25 weight matrix (terms × ways) built once,
+each distinct prompt reduced to term ids, and all scores computed with one
+gather + reduceat. Sessions are replayed in lockstep, one prompt position
+at a time across all sessions. Stemming follows bm25.rs (Snowball English)
+when the snowballstemmer package is installed; without it terms are
+matched unstemmed, as in vocab_collisions.py.
+"""
+import argparse, glob, json, os, re, sys, time
+
+import numpy as np
+
+from locale_index import WAYS_DIR
+from locale_pack import locale_entries
+from vocab_collisions import OVERRIDE, bm25_matrix, frontmatter, tokenize
+
+try:
+    import snowballstemmer
+    _STEMMER = snowballstemmer.stemmer("english")
+except ImportError:
+    _STEMMER = None
+
+FIELDS = ("description", "vocabulary", "threshold", "scope", "pattern", "trigger")
+DEFAULT_THRESHOLD = 2.0
+# scan/mod.rs parent_threshold
+LOWERING = 0.8
+# ADR-105 targets: realistic single path, worst-case full tree
+PATH_BUDGET = 1200
+TREE_BUDGET = 4000
+
+
+# ── Ways ────────────────────────────────────────────────────────────
+
+def body_tokens(path):
+    """Frontmatter-stripped body bytes / 4, like `ways tree`."""
+    with open(path, "rb") as f:
+        content = f.read()
+    end = content.find(b"\n---", 4)
+    body = content[content.find(b"\n", end + 1) + 1:] if end >= 0 else content
+    return len(body) // 4
+
+
+def _threshold(value):
+    try:
+        threshold = float(value or DEFAULT_THRESHOLD)
+    except ValueError:
+        return DEFAULT_THRESHOLD
+    # batch_bm25_score treats a non-positive threshold as the default
+    return threshold if threshold > 0 else DEFAULT_THRESHOLD
+
+
+def load_corpus(scope="agent"):
+    """(candidate ways, BM25 documents) as the prompt scan sees them.
+
+    Documents mirror ways-corpus.jsonl — every .md way with description and
+    vocabulary, .lang.md overrides included, plus every locale stub at its
+    way's threshold — and fix BM25's document statistics. Candidates are
+    the prompt-triggerable ways in `scope`, sorted by id (parents first).
+    Ids are the way's directory, as in way_id_from_path.
+    """
+    ways, docs, own = {}, [], {}
+    for path in sorted(glob.glob(f"{WAYS_DIR}**/*.md", recursive=True)):
+        wid = os.path.dirname(path)[len(WAYS_DIR):]
+        if ".check." in os.path.basename(path) or not wid:
+            continue
+        with open(path, encoding="utf-8") as f:
+            if f.readline().rstrip() != "---":
+                continue
+        fm = frontmatter(path, FIELDS)
+        threshold = _threshold(fm.get("threshold"))
+        if fm.get("description") and "vocabulary" in fm:
+            docs.append((wid, f"{fm['description']} {fm['vocabulary']}", threshold))
+        if OVERRIDE.search(path) or wid in own:
+            continue
+        own[wid] = threshold
+        scopes = [s.strip() for s in fm.get("scope", "").split(",") if s.strip()] or ["agent"]
+        if fm.get("trigger") or scope not in scopes:
+            continue
+        ways[wid] = {"id": wid, "threshold": threshold, "pattern": fm.get("pattern"),
+                     "tokens": body_tokens(path)}
+    for wid, _, entry in locale_entries():
+        docs.append((wid, f"{entry.get('description', '')} {entry.get('vocabulary', '')}",
+                     own.get(wid, DEFAULT_THRESHOLD)))
+    return [ways[w] for w in sorted(ways)], docs
+
+
+def ancestors(ids):
+    """(W, W) bool: [i, j] when way j is a proper ancestor of way i."""
+    index = {w: i for i, w in enumerate(ids)}
+    anc = np.zeros((len(ids), len(ids)), dtype=bool)
+    for i, w in enumerate(ids):
+        parts = w.split("/")
+        for n in range(1, len(parts)):
+            j = index.get("/".join(parts[:n]))
+            if j is not None:
+                anc[i, j] = True
+    return anc
+
+
+# ── Term index ──────────────────────────────────────────────────────
+
+_stems = {}
+
+
+def stemmed(text):
+    """bm25.rs tokens: tokenize, Porter2-stem, keep stems of ≥ 3 bytes."""
+    if _STEMMER is None:
+        return tokenize(text)
+    out = []
+    for t in tokenize(text):
+        s = _stems.get(t)
+        if s is None:
+            s = _stems[t] = _STEMMER.stemWord(t)
+        if len(s.encode("utf-8")) >= 3:
+            out.append(s)
+    return out
+
+
+class TermIndex:
+    """BM25 weights of every (term, document) pair, built once.
+
+    A query's score for a document is the sum of its tokens' weights, and
+    repeated query tokens count again, as in Corpus::bm25_score. Documents
+    fold onto candidate ways: a way scores the best of its documents, each
+    over that document's threshold, so 1.0 is exactly "fires".
+    """
+
+    def __init__(self, docs, ways):
+        rows, cols, weights, terms = bm25_matrix([text for _, text, _ in docs], stemmed)
+        self.terms = {t: i for i, t in enumerate(terms)}
+        self.n_ways = len(ways)
+        column = {w["id"]: j for j, w in enumerate(ways)}
+        # Documents of non-candidates only shape the statistics above
+        keep = sorted((d for d, doc in enumerate(docs) if doc[0] in column),
+                      key=lambda d: column[docs[d][0]])
+        slot = np.full(len(docs), -1)
+        slot[keep] = np.arange(len(keep))
+        thresholds = np.array([docs[d][2] for d in keep])
+        hit = slot[rows] >= 0
+        self.weights = np.zeros((len(terms) + 1, len(keep)), dtype=np.float32)  # last row: unknown term
+        self.weights[cols[hit], slot[rows[hit]]] = weights[hit] / thresholds[slot[rows[hit]]]
+        owner = np.array([column[docs[d][0]] for d in keep], dtype=np.int64)
+        self.starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]]) if len(keep) else owner
+        self.columns = owner[self.starts]
+
+    def scores(self, prompts, chunk=4096):
+        """(P, W) best document score over threshold for every candidate way."""
+        unknown = len(self.terms)
+        out = np.zeros((len(prompts), self.n_ways), dtype=np.float32)
+        if not len(self.columns):
+            return out
+        for lo in range(0, len(prompts), chunk):
+            ids, starts = [], []
+            for text in prompts[lo:lo + chunk]:
+                starts.append(len(ids))
+                ids.extend(self.terms.get(t, unknown) for t in stemmed(text))
+                ids.append(unknown)   # keeps every prompt's slice non-empty
+            per_doc = np.add.reduceat(self.weights[ids], starts, axis=0)
+            out[lo:lo + len(starts), self.columns] = np.maximum.reduceat(per_doc, self.starts, axis=1)
+        return out
+
+
+def pattern_matches(ways, prompts):
+    """(P, W) bool: prompt matches the way's pattern regex."""
+    out = np.zeros((len(prompts), len(ways)), dtype=bool)
+    for j, w in enumerate(ways):
+        if not w["pattern"]:
+            continue
+        try:
+            rx = re.compile(w["pattern"])
+        except re.error:
+            continue   # an invalid regex never matches, as in regex_matches
+        out[:, j] = [rx.search(p) is not None for p in prompts]
+    return out
+
+
+# ── Prompts ─────────────────────────────────────────────────────────
+
+def _text(obj):
+    payload = obj.get("payload") if isinstance(obj.get("payload"), dict) else obj
+    if isinstance(payload.get("prompt"), str):
+        return payload["prompt"], payload.get("session_id")
+    if obj.get("type") == "user" and not obj.get("isMeta"):
+        content = (obj.get("message") or {}).get("content")
+        if isinstance(content, list):
+            if any(isinstance(c, dict) and c.get("type") == "tool_result" for c in content):
+                return None, None
+            content = " ".join(c.get("text", "") for c in content if isinstance(c, dict))
+        if isinstance(content, str):
+            return content, None
+    return None, None
+
+
+def load_sessions(paths):
+    """{session: [lowercased prompt, ...]} in file order."""
+    files = []
+    for p in paths:
+        files += sorted(glob.glob(os.path.join(p, "**", "*.jsonl"), recursive=True)) if os.path.isdir(p) else [p]
+    sessions = {}
+    for fp in files:
+        with open(fp, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(obj, dict):
+                    continue
+                text, sid = _text(obj)
+                if text and text.strip():
+                    key = obj.get("session") or sid or obj.get("sessionId") or fp
+                    sessions.setdefault(key, []).append(text.lower())
+    return sessions
+
+
+# ── Replay ──────────────────────────────────────────────────────────
+
+def replay(order, fire, fire_lowered, anc):
+    """Which ways each session shows: (S, W) bool.
+
+    order is (S, L) prompt indices padded with -1; fire/fire_lowered are
+    (P, W) verdicts at the full and the lowered threshold. All sessions
+    advance one prompt at a time; within a prompt, disclosure cascades down
+    the tree until nothing new fires.
+    """
+    n_sessions = order.shape[0]
+    shown = np.zeros((n_sessions, anc.shape[0]), dtype=bool)
+    anc_t = anc.T.astype(np.float32)
+    depth = int(anc.sum(axis=1).max(initial=0))
+    for k in range(order.shape[1]):
+        rows = order[:, k]
+        live = (rows >= 0)[:, None]
+        full, lowered = fire[rows] & live, fire_lowered[rows] & live
+        for _ in range(depth + 1):
+            parent_shown = shown.astype(np.float32) @ anc_t > 0
+            new = ~shown & np.where(parent_shown, lowered, full)
+            if not new.any():
+                break
+            shown |= new
+    return shown
+
+
+def simulate(ways, scores, patterns, order, anc, lowering=LOWERING, scale=1.0, overrides=None):
+    """Replay with thresholds scaled by `scale` and/or set per way."""
+    base = np.array([w["threshold"] for w in ways])
+    factor = np.array([(overrides or {}).get(w["id"], t * scale) for w, t in zip(ways, base)]) / base
+    fire = patterns | (scores >= factor)
+    fire_lowered = patterns | (scores >= factor * lowering)
+    return replay(order, fire, fire_lowered, anc)
+
+
+# ── Reporting ───────────────────────────────────────────────────────
+
+def trees(ways, anc):
+    """Every way with descendants: {root id: (member indices, path costs)}."""
+    tokens = np.array([w["tokens"] for w in ways])
+    out = {}
+    for r, w in enumerate(ways):
+        members = np.flatnonzero(anc[:, r])
+        if not len(members):
+            continue
+        members = np.r_[r, members]
+        leaves = [i for i in members if not anc[:, i].any()]
+        # root → leaf: the leaf, its ancestors inside the tree, and the root
+        paths = [int(tokens[i] + tokens[anc[i] & np.isin(np.arange(len(ways)), members)].sum())
+                 for i in leaves]
+        out[w["id"]] = (members, paths)
+    return out
+
+
+def summarize(ways, shown, anc):
+    tokens = np.array([w["tokens"] for w in ways])
+    depth = anc.sum(axis=1)
+    per_session = shown @ tokens
+    report = {
+        "sessions": int(shown.shape[0]),
+        "per_session": _stats(per_session),
+        "ways_per_session_max": int(shown.sum(axis=1).max(initial=0)),
+        "trees": {}, "depth": {},
+    }
+    for root, (members, paths) in trees(ways, anc).items():
+        cost = shown[:, members] @ tokens[members]
+        report["trees"][root] = dict(
+            ways=len(members), all_fire=int(tokens[members].sum()),
+            avg_path=round(float(np.mean(paths))), longest_path=max(paths),
+            touched=round(float((cost > 0).mean()), 4) if len(cost) else 0.0,
+            **_stats(cost))
+    for d in range(int(depth.max(initial=0)) + 1):
+        at = depth == d
+        report["depth"][d] = dict(ways=int(at.sum()), **_stats(shown[:, at] @ tokens[at]))
+    return report
+
+
+def _stats(cost):
+    if not len(cost):
+        return {"expected": 0, "p95": 0, "worst": 0}
+    return {"expected": round(float(cost.mean()), 1),
+            "p95": round(float(np.percentile(cost, 95))),
+            "worst": int(cost.max())}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prompts", nargs="+", help="prompt .jsonl files or directories")
+    parser.add_argument("--scope", default="agent")
+    parser.add_argument("--lowering", type=float, default=LOWERING,
+                        help="threshold factor once a parent is shown (default: %(default)s)")
+    parser.add_argument("--scale", type=float, default=1.0, help="what-if: multiply every threshold")
+    parser.add_argument("--set", action="append", default=[], metavar="WAY=THRESHOLD",
+                        help="what-if: override one way's threshold (repeatable)")
+    parser.add_argument("--path-budget", type=int, default=PATH_BUDGET)
+    parser.add_argument("--tree-budget", type=int, default=TREE_BUDGET)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.set:
+        way, sep, value = item.partition("=")
+        try:
+            overrides[way] = float(value)
+        except ValueError:
+            sep = ""
+        if not sep:
+            parser.error(f"--set takes WAY=THRESHOLD, got {item!r}")
+
+    started = time.perf_counter()
+    ways, docs = load_corpus(args.scope)
+    unknown = sorted(set(overrides) - {w["id"] for w in ways})
+    if unknown:
+        parser.error(f"--set: no prompt-triggered way {', '.join(unknown)}")
+    sessions = load_sessions(args.prompts)
+    if not ways or not sessions:
+        print("No ways or no prompts found.", file=sys.stderr)
+        return 1
+
+    prompts = sorted({p for ps in sessions.values() for p in ps})
+    slot = {p: i for i, p in enumerate(prompts)}
+    order = np.full((len(sessions), max(map(len, sessions.values()))), -1, dtype=np.int64)
+    for s, ps in enumerate(sessions.values()):
+        order[s, :len(ps)] = [slot[p] for p in ps]
+
+    index = TermIndex(docs, ways)
+    scores = index.scores(prompts)
+    patterns = pattern_matches(ways, prompts)
+    anc = ancestors([w["id"] for w in ways])
+    indexed = time.perf_counter()
+
+    base = summarize(ways, simulate(ways, scores, patterns, order, anc, args.lowering), anc)
+    variant = None
+    if args.scale != 1.0 or overrides:
+        variant = summarize(ways, simulate(ways, scores, patterns, order, anc, args.lowering,
+                                           args.scale, overrides), anc)
+    done = time.perf_counter()
+
+    meta = {
+        "prompts": sum(map(len, sessions.values())), "distinct_prompts": len(prompts),
+        "sessions": len(sessions), "ways": len(ways), "documents": len(docs), "terms": len(index.terms),
+        "stemming": _STEMMER is not None, "lowering": args.lowering,
+        "index_seconds": round(indexed - started, 3), "replay_seconds": round(done - indexed, 3),
+    }
+    if args.json:
+        out = {**meta, "baseline": base}
+        if variant:
+            out["variant"] = {"scale": args.scale, "set": overrides, **variant}
+        json.dump(out, sys.stdout, indent=2)
+        print()
+        return 0
+
+    print(f"{meta['prompts']:,} prompts in {meta['sessions']:,} sessions, {meta['ways']} ways,"
+          f" {meta['documents']:,} documents, {meta['terms']:,} terms"
+          f" (stemming {'on' if meta['stemming'] else 'off'})")
+    print(f"index {meta['index_seconds']:.2f}s, replay {meta['replay_seconds']:.2f}s")
+    ps = base["per_session"]
+    print(f"per session: expected {ps['expected']:,.0f} tokens, p95 {ps['p95']:,},"
+          f" worst {ps['worst']:,} ({base['ways_per_session_max']} ways)")
+    if variant:
+        vs = variant["per_session"]
+        print(f"  what-if:   expected {vs['expected']:,.0f} tokens, p95 {vs['p95']:,},"
+              f" worst {vs['worst']:,} ({variant['ways_per_session_max']} ways)")
+    print()
+    print(f"{'tree':<40} {'ways':>4} {'all-fire':>8} {'avg path':>8} {'longest':>7}"
+          f" {'expected':>8} {'p95':>6} {'worst':>6} {'touched':>7}" + ("  Δexpected" if variant else ""))
+    for root, t in sorted(base["trees"].items(), key=lambda kv: -kv[1]["all_fire"]):
+        flag = "!" if (t["all_fire"] > args.tree_budget or t["worst"] > args.tree_budget
+                       or t["avg_path"] > args.path_budget) else " "
+        delta = f"  {variant['trees'][root]['expected'] - t['expected']:+9.1f}" if variant else ""
+        print(f"{flag}{root:<39} {t['ways']:>4} {t['all_fire']:>8,} {t['avg_path']:>8,}"
+              f" {t['longest_path']:>7,} {t['expected']:>8.1f} {t['p95']:>6,} {t['worst']:>6,}"
+              f" {t['touched']:>7.1%}{delta}")
+    print(f"  ! over budget: all-fire or worst > {args.tree_budget:,}, or avg path > {args.path_budget:,}")
+    print()
+    print(f"{'depth':>5} {'ways':>4} {'expected':>8} {'p95':>6} {'worst':>6}" + ("  Δexpected" if variant else ""))
+    for d, r in base["depth"].items():
+        delta = f"  {variant['depth'][d]['expected'] - r['expected']:+9.1f}" if variant else ""
+        print(f"{d:>5} {r['ways']:>4} {r['expected']:>8.1f} {r['p95']:>6,} {r['worst']:>6,}{delta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Flag near-duplicate locale stubs with MinHash + LSH.
+
+Catches copy-paste and untranslated slots: an `es` vocabulary identical to
+`pt`, an English description pasted into a `ja` entry, two ways sharing one
+stub. Every description and vocabulary (locale stubs plus the English
+frontmatter) is shingled into character n-grams, MinHashed, and bucketed by
+LSH bands; only pairs that share a bucket are compared exactly, so cost
+grows with the number of entries rather than its square.
+
+Usage:
+  locale_dupes.py                      # pairs with Jaccard >= 0.7
+  locale_dupes.py --threshold 0.5 --field vocabulary
+  locale_dupes.py --json
+
+Pairs are labelled same-way (two languages of one way) or cross-way.
+"""
+import argparse, json, sys, zlib
+from itertools import combinations
+
+import numpy as np
+
+from locale_pack import locale_entries
+from vocab_collisions import documents_en
+
+NUM_PERM = 128
+BANDS = 32
+SHINGLE = 4
+# Smallest prime above 2^32; with a, b, x < 2^32, a*x + b stays inside uint64
+PRIME = np.uint64((1 << 32) + 15)
+FIELDS = ("description", "vocabulary")
+
+
+def shingles(text, k=SHINGLE):
+    """Character k-grams of whitespace-normalized, lowercased text."""
+    text = " ".join(text.lower().split())
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def entries(fields=FIELDS):
+    """[(way, lang, field, text)] for stubs and English frontmatter."""
+    out = []
+    for way, fm in documents_en().items():
+        for field in fields:
+            if fm.get(field):
+                out.append((way, "en", field, fm[field]))
+    for way, lang, entry in locale_entries():
+        for field in fields:
+            text = entry.get(field)
+            if isinstance(text, str) and text.strip():
+                out.append((way, lang, field, text))
+    return out
+
+
+def minhash(sets, num_perm=NUM_PERM, seed=1):
+    """Signatures (len(sets), num_perm) as uint64, one vectorized pass.
+
+    Shingles hash to 32 bits; permutation k is h -> (a_k h + b_k) mod p.
+    Entries' hashes are concatenated and reduced per entry with
+    np.minimum.reduceat.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    lengths = np.array([len(s) for s in sets])
+    hashes = np.fromiter(
+        (zlib.crc32(sh.encode("utf-8")) for s in sets for sh in s),
+        dtype=np.uint64, count=int(lengths.sum()))
+    sig = np.full((len(sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    nonempty = lengths > 0
+    if not hashes.size:
+        return sig
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+    # Chunk the permutations to bound the (perm x shingles) working set
+    for lo in range(0, num_perm, 16):
+        hi = min(lo + 16, num_perm)
+        perm = (a[lo:hi, None] * hashes[None, :] + b[lo:hi, None]) % PRIME
+        sig[nonempty, lo:hi] = np.minimum.reduceat(perm, starts, axis=1).T
+    return sig
+
+
+def lsh_candidates(sig, bands=BANDS):
+    """Index pairs (i < j) sharing at least one identical band."""
+    rows = sig.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        block = np.ascontiguousarray(sig[:, band * rows:(band + 1) * rows])
+        _, inverse, counts = np.unique(block, axis=0, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse.ravel(), kind="stable")
+        for members in np.split(order, np.cumsum(counts)[:-1]):
+            if len(members) > 1:
+                pairs.update(combinations(sorted(members.tolist()), 2))
+    return pairs
+
+
+def find_duplicates(items, threshold=0.7, bands=BANDS):
+    """Pairs of `items` (way, lang, field, text) with exact Jaccard >= threshold."""
+    sets = [shingles(text) for _, _, _, text in items]
+    sig = minhash(sets)
+    found = []
+    for i, j in lsh_candidates(sig, bands):
+        if items[i][2] != items[j][2]:
+            continue
+        union = len(sets[i] | sets[j])
+        jac = len(sets[i] & sets[j]) / union if union else 0.0
+        if jac >= threshold:
+            found.append((i, j, jac, float((sig[i] == sig[j]).mean())))
+    found.sort(key=lambda p: (-p[2], p[0], p[1]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=0.7, help="minimum Jaccard")
+    parser.add_argument("--field", choices=FIELDS, action="append", help="only this field")
+    parser.add_argument("--bands", type=int, default=BANDS,
+                        help=f"LSH bands over {NUM_PERM} permutations (more = higher recall)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    items = entries(tuple(args.field or FIELDS))
+    pairs = find_duplicates(items, args.threshold, args.bands)
+    rows = []
+    for i, j, jac, est in pairs:
+        (wa, la, field, ta), (wb, lb, _, tb) = items[i], items[j]
+        rows.append({
+            "kind": "same-way" if wa == wb else "cross-way", "field": field,
+            "a": {"way": wa, "lang": la, "text": ta}, "b": {"way": wb, "lang": lb, "text": tb},
+            "jaccard": round(jac, 3), "minhash_estimate": round(est, 3),
+        })
+
+    if args.json:
+        json.dump({"entries": len(items), "pairs": rows}, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    for r in rows:
+        a, b = r["a"], r["b"]
+        print(f"  {r['jaccard']:.2f} {r['kind']:<9} {r['field']:<11} "
+              f"{a['way']}[{a['lang']}] ~ {b['way']}[{b['lang']}]")
+    print(f"  {len(rows)} near-duplicate pairs among {len(items)} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
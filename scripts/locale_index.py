@@ -0,0 +1,277 @@
+"""In-memory index of packed locale stubs (hooks/ways/**/*.locales.jsonl).
+
+One streaming pass per file builds way path → lang → entry and validates
+the packed-stub schema at the same time. Per-file results are cached by
+content hash under the hash of languages.json, so callers that only need
+the index (corpus checks, coverage dashboards) pay the parse cost once.
+
+    from locale_index import load_index
+    idx = load_index()
+    idx.stubs_for("ja")                  # {way: entry}
+    idx.languages_for("softwaredev/code/security")
+
+Paths are relative to the repo root, like the rest of scripts/.
+"""
+import glob, hashlib, json, os
+from concurrent.futures import ProcessPoolExecutor
+
+LANGUAGES = "tools/ways-cli/languages.json"
+WAYS_DIR = "hooks/ways/"
+LOCALE_GLOB = "hooks/ways/**/*.locales.jsonl"
+CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "claude-ways", "locale-check.json",
+)
+CACHE_VERSION = 2
+# Below this many files a pool costs more than it saves
+POOL_MIN_FILES = 16
+
+REQUIRED_KEYS = ("lang", "description", "vocabulary")
+ALLOWED_KEYS = set(REQUIRED_KEYS) | {"embed_threshold"}
+# Same clamp `ways tune` applies when it writes thresholds
+THRESHOLD_RANGE = (0.10, 0.90)
+
+
+def load_active(raw):
+    """Active non-English language codes from languages.json bytes."""
+    return {
+        k for k, v in json.loads(raw)["languages"].items()
+        if v.get("active") and k != "en"
+    }
+
+
+def way_path(fp):
+    """hooks/ways/a/b/b.locales.jsonl → a/b"""
+    return os.path.dirname(fp)[len(WAYS_DIR):]
+
+
+def override_sibling(path):
+    """hooks/ways/a/b/b.ja.md → hooks/ways/a/b/b.locales.jsonl (None if not an override).
+
+    Same shape test as extract_locale_from_filename in the ways CLI, minus
+    the active-language lookup: the caller only checks the sibling.
+    """
+    name = os.path.basename(path)
+    if not path.startswith(WAYS_DIR) or not name.endswith(".md") or ".check." in name:
+        return None
+    parts = name[:-len(".md")].split(".")
+    lang = parts[-1]
+    if len(parts) < 2 or not 2 <= len(lang) <= 5 or not all(c.islower() or c == "-" for c in lang):
+        return None
+    return os.path.join(os.path.dirname(path), ".".join(parts[:-1]) + ".locales.jsonl")
+
+
+def read_override(path):
+    """Working-tree contents of an override file, or None."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def issue(kind, fp, message, line=None, lang=None):
+    return {"kind": kind, "file": fp, "line": line, "lang": lang, "message": message}
+
+
+def index_file(fp, data, active):
+    """Parse and validate one locale file in a single pass.
+
+    Returns {"entries": {lang: entry}, "issues": [issue, ...]}. Entries carry
+    their source line; the first occurrence of a duplicated lang wins.
+    """
+    entries, issues = {}, []
+    rel = fp.replace(WAYS_DIR, "")
+    lo, hi = THRESHOLD_RANGE
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return {"entries": {}, "issues": [issue("INVALID", fp, f"{fp}: {e}")]}
+
+    for i, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            issues.append(issue("INVALID", fp, f"{fp}:{i} {e}", i))
+            continue
+        if not isinstance(obj, dict):
+            issues.append(issue("INVALID", fp, f"{fp}:{i} entry is not an object", i))
+            continue
+
+        lang = obj.get("lang", "")
+        if lang in entries:
+            first = entries[lang]["line"]
+            issues.append(issue("DUPLICATE", fp, f"{fp}:{i} lang={lang} (first at line {first})", i, lang))
+            continue
+
+        unknown = sorted(set(obj) - ALLOWED_KEYS)
+        if unknown:
+            issues.append(issue("SCHEMA", fp, f"{fp}:{i} lang={lang} unknown keys: {', '.join(unknown)}", i, lang))
+        for key in REQUIRED_KEYS:
+            value = obj.get(key)
+            if not isinstance(value, str) or not value.strip():
+                issues.append(issue("SCHEMA", fp, f"{fp}:{i} lang={lang} empty or missing {key}", i, lang))
+        if "embed_threshold" in obj:
+            t = obj["embed_threshold"]
+            if isinstance(t, bool) or not isinstance(t, (int, float)) or not lo <= t <= hi:
+                issues.append(issue("SCHEMA", fp, f"{fp}:{i} lang={lang} embed_threshold {t!r} outside [{lo}, {hi}]", i, lang))
+
+        entries[lang] = dict(obj, line=i)
+
+    missing = active - set(entries)
+    if missing:
+        issues.append(issue("GAP", fp, f"{rel} missing: {', '.join(sorted(missing))}"))
+
+    inactive = set(entries) - active
+    if inactive:
+        issues.append(issue("INACTIVE", fp, f"{rel} has entries for: {', '.join(sorted(inactive))}"))
+    return {"entries": entries, "issues": issues}
+
+
+def _index_task(args):
+    return index_file(*args)
+
+
+def find_shadows(fp, entries, active, read=read_override):
+    """Override .lang.md files next to a locale file that shadow its entries.
+
+    An override is the documented way to graduate a stub into a full
+    native-language way, so it is only flagged when it has no body — then it
+    just hides the packed entry for no gain. `read` maps a path to its bytes
+    (None when absent); callers checking the git index pass a staged reader.
+    """
+    d = os.path.dirname(fp)
+    stem = os.path.basename(fp)[:-len(".locales.jsonl")]
+    issues = []
+    for lang in sorted(entries):
+        if lang not in active:
+            continue
+        override = os.path.join(d, f"{stem}.{lang}.md")
+        data = read(override)
+        if data is None:
+            continue
+        body = data.decode("utf-8", errors="replace")
+        if body.startswith("---"):
+            end = body.find("\n---", 3)
+            body = body[end + 4:] if end >= 0 else ""
+        if not body.strip():
+            issues.append(issue("SHADOW", fp, f"{override} has no body but shadows {fp} lang={lang}", lang=lang))
+    return issues
+
+
+class LocaleIndex:
+    """way path → lang → entry, plus the issues found while building it."""
+
+    def __init__(self, results, active):
+        self.active = active
+        self.files = sorted(results)
+        self.ways = {way_path(fp): results[fp]["entries"] for fp in self.files}
+        self.issues = [i for fp in self.files for i in results[fp]["issues"]]
+
+    def languages_for(self, way):
+        return sorted(self.ways.get(way, {}))
+
+    def stubs_for(self, lang):
+        return {way: e[lang] for way, e in self.ways.items() if lang in e}
+
+    def entries(self):
+        """Yield (way, lang, entry) for every indexed stub."""
+        for way, by_lang in self.ways.items():
+            for lang, entry in by_lang.items():
+                yield way, lang, entry
+
+    def report(self):
+        counts = {}
+        for i in self.issues:
+            counts[i["kind"]] = counts.get(i["kind"], 0) + 1
+        return {
+            "files": len(self.files),
+            "entries": sum(len(v) for v in self.ways.values()),
+            "active_languages": sorted(self.active),
+            "issue_counts": counts,
+            "issues": self.issues,
+            "index": self.ways,
+        }
+
+
+def read_files(paths):
+    files = {}
+    for p in paths:
+        if os.path.isfile(p):
+            with open(p, "rb") as f:
+                files[p] = f.read()
+    return files
+
+
+def _load_cache(lang_hash):
+    try:
+        with open(CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION or cache.get("languages") != lang_hash:
+        return {}
+    return cache.get("files", {})
+
+
+def _save_cache(lang_hash, files):
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    tmp = f"{CACHE_FILE}.{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump({"version": CACHE_VERSION, "languages": lang_hash, "files": files}, f)
+    os.replace(tmp, CACHE_FILE)
+
+
+def build_index(files, lang_raw, use_cache=True, jobs=None, prune=False,
+                read=read_override):
+    """Index {path: bytes}. Returns (LocaleIndex, number of cache hits).
+
+    prune=True rewrites the cache with only these files (full-tree runs).
+    read: where override .lang.md files come from (find_shadows).
+    """
+    active = load_active(lang_raw)
+    lang_hash = hashlib.sha256(lang_raw).hexdigest()
+    cache = _load_cache(lang_hash) if use_cache else {}
+
+    # Issues name the file, so the key is path + content hash
+    keys = {fp: f"{hashlib.sha256(data).hexdigest()}:{fp}" for fp, data in files.items()}
+    results, todo = {}, []
+    for fp in sorted(files):
+        hit = cache.get(keys[fp])
+        if hit is not None:
+            results[fp] = hit
+        else:
+            todo.append(fp)
+
+    tasks = [(fp, files[fp], active) for fp in todo]
+    if len(tasks) >= POOL_MIN_FILES and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            fresh = list(pool.map(_index_task, tasks, chunksize=8))
+    else:
+        fresh = [_index_task(t) for t in tasks]
+    results.update(zip(todo, fresh))
+
+    if use_cache and (todo or prune):
+        if prune:
+            cache = {}
+        cache.update({keys[fp]: results[fp] for fp in files})
+        _save_cache(lang_hash, cache)
+
+    # Shadowing depends on neighbouring files, not this file's bytes: never cached
+    for fp in results:
+        shadows = find_shadows(fp, results[fp]["entries"], active, read)
+        if shadows:
+            results[fp] = dict(results[fp], issues=results[fp]["issues"] + shadows)
+
+    return LocaleIndex(results, active), len(files) - len(todo)
+
+
+def load_index(use_cache=True, jobs=None):
+    """Index the whole working tree."""
+    with open(LANGUAGES, "rb") as f:
+        lang_raw = f.read()
+    files = read_files(sorted(glob.glob(LOCALE_GLOB, recursive=True)))
+    return build_index(files, lang_raw, use_cache, jobs, prune=True)[0]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Compile all locale stubs into one memory-mappable pack.
+
+Usage:
+  locale_pack.py build [-o PATH]       # compile hooks/ways/**/*.locales.jsonl
+  locale_pack.py check [-o PATH]       # exit 1 if the pack is missing or stale
+  locale_pack.py query --lang ja       # all stubs for a language
+  locale_pack.py query --way softwaredev/code/security
+
+Consumers open the pack with LocalePack and answer "all stubs for language
+X" or "all languages for way Y" by binary search over fixed-width tables —
+no tree walk, no JSON. The analysis scripts take every stub through
+locale_entries(), which reads a fresh pack and falls back to
+locale_index.load_index() otherwise. The staleness check only stats the recorded sources
+(every locale file, every directory under hooks/ways, languages.json), so a
+new or removed file shows up as a changed directory mtime without listing.
+
+Layout (little-endian):
+  header    magic, version, table counts, section offsets, languages.json sha256
+  strings   u32 offsets[n+1] followed by the UTF-8 blob
+  langs     code, active flag, first record, record count — sorted by code
+  ways      path, first by-way slot, record count — sorted by path
+  records   way, lang, description, vocabulary, f32 embed_threshold (NaN if unset)
+            sorted by (lang, way), so each language is one contiguous run
+  by_way    u32 record index sorted by (way, lang)
+  sources   path, kind (0 file, 1 dir), mtime_ns, size
+"""
+import argparse, glob, hashlib, json, math, mmap, os, struct, sys
+
+from locale_index import LANGUAGES, LOCALE_GLOB, WAYS_DIR, build_index, load_index, read_files
+
+PACK_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "claude-ways", "locales.pack",
+)
+MAGIC = b"WLPK"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHH6I7Q32s")
+LANG = struct.Struct("<IB3xII")
+WAY = struct.Struct("<III")
+RECORD = struct.Struct("<IIIIf")
+SOURCE = struct.Struct("<IB3xqq")
+U32 = struct.Struct("<I")
+
+SOURCE_FILE, SOURCE_DIR = 0, 1
+
+
+def _sources(paths):
+    """Stat records for the locale files, their tree, and languages.json."""
+    out = [(p, SOURCE_FILE) for p in [LANGUAGES, *paths]]
+    for d, _, _ in os.walk(WAYS_DIR.rstrip("/")):
+        out.append((d, SOURCE_DIR))
+    stats = []
+    for p, kind in out:
+        st = os.stat(p)
+        stats.append((p, kind, st.st_mtime_ns, 0 if kind == SOURCE_DIR else st.st_size))
+    return stats
+
+
+def compile_pack(out=PACK_FILE, use_cache=True):
+    """Build the pack from the working tree. Returns (records, bytes written)."""
+    with open(LANGUAGES, "rb") as f:
+        lang_raw = f.read()
+    paths = sorted(glob.glob(LOCALE_GLOB, recursive=True))
+    # Stat before reading, so an edit racing the build leaves the pack stale
+    sources = _sources(paths)
+    index, _ = build_index(read_files(paths), lang_raw, use_cache=use_cache, prune=True)
+    every = json.loads(lang_raw)["languages"]
+
+    strings, blob = {}, []
+
+    def intern(s):
+        i = strings.get(s)
+        if i is None:
+            i = strings[s] = len(blob)
+            blob.append(s.encode("utf-8"))
+        return i
+
+    ways = sorted(index.ways)
+    way_ids = {w: i for i, w in enumerate(ways)}
+    langs = sorted({lang for _, lang, _ in index.entries()} | index.active)
+    lang_ids = {l: i for i, l in enumerate(langs)}
+
+    records = sorted(
+        (lang_ids[lang], way_ids[way], entry) for way, lang, entry in index.entries()
+    )
+    rec_bytes = bytearray()
+    for lang_id, way_id, e in records:
+        t = e.get("embed_threshold")
+        rec_bytes += RECORD.pack(
+            way_id, lang_id, intern(str(e.get("description", ""))),
+            intern(str(e.get("vocabulary", ""))),
+            float(t) if isinstance(t, (int, float)) and not isinstance(t, bool) else math.nan,
+        )
+
+    counts = [0] * len(langs)
+    for lang_id, _, _ in records:
+        counts[lang_id] += 1
+    lang_bytes, pos = bytearray(), 0
+    for l, n in zip(langs, counts):
+        active = bool(every.get(l, {}).get("active"))
+        lang_bytes += LANG.pack(intern(l), int(active), pos, n)
+        pos += n
+
+    by_way = sorted(range(len(records)), key=lambda r: (records[r][1], records[r][0]))
+    by_way_bytes = b"".join(U32.pack(r) for r in by_way)
+    way_bytes, pos = bytearray(), 0
+    for i, w in enumerate(ways):
+        n = len(index.ways[w])
+        way_bytes += WAY.pack(intern(w), pos, n)
+        pos += n
+
+    source_bytes = b"".join(
+        SOURCE.pack(intern(p), kind, mtime, size) for p, kind, mtime, size in sources
+    )
+
+    offsets, acc = [], 0
+    for b in blob:
+        offsets.append(acc)
+        acc += len(b)
+    offsets.append(acc)
+    string_bytes = b"".join(U32.pack(o) for o in offsets) + b"".join(blob)
+
+    sections = [string_bytes, bytes(lang_bytes), bytes(way_bytes), bytes(rec_bytes),
+                by_way_bytes, source_bytes]
+    pos, starts = HEADER.size, []
+    for s in sections:
+        pos = (pos + 7) & ~7
+        starts.append(pos)
+        pos += len(s)
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, len(blob), len(langs), len(ways), len(records),
+        len(sources), 0, *starts, pos, hashlib.sha256(lang_raw).digest(),
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = f"{out}.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        for start, s in zip(starts, sections):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(s)
+    os.replace(tmp, out)
+    return len(records), pos
+
+
+class LocalePack:
+    """Read-only view of a compiled pack; lookups touch only the pages they need."""
+
+    def __init__(self, path=PACK_FILE):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.n_strings, self.n_langs, self.n_ways, self.n_records,
+         self.n_sources, _, self._strings, self._langs, self._ways, self._records,
+         self._by_way, self._sources, self.size, self.languages_sha256) = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a locale pack (version {VERSION})")
+        self._blob = self._strings + 4 * (self.n_strings + 1)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def string(self, i):
+        start, end = struct.unpack_from("<II", self._mm, self._strings + 4 * i)
+        return self._mm[self._blob + start:self._blob + end].decode("utf-8")
+
+    def _lang(self, i):
+        return LANG.unpack_from(self._mm, self._langs + LANG.size * i)
+
+    def _way(self, i):
+        return WAY.unpack_from(self._mm, self._ways + WAY.size * i)
+
+    def _record(self, i):
+        way, lang, desc, vocab, t = RECORD.unpack_from(self._mm, self._records + RECORD.size * i)
+        entry = {"lang": self.string(self._lang(lang)[0]), "description": self.string(desc),
+                 "vocabulary": self.string(vocab)}
+        if not math.isnan(t):
+            entry["embed_threshold"] = round(t, 4)
+        return self.string(self._way(way)[0]), entry
+
+    def _search(self, n, key_of, key):
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(key_of(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < n and self.string(key_of(lo)) == key else None
+
+    def languages(self, active_only=False):
+        out = []
+        for i in range(self.n_langs):
+            code, active, _, _ = self._lang(i)
+            if active or not active_only:
+                out.append(self.string(code))
+        return out
+
+    def ways(self):
+        return [self.string(self._way(i)[0]) for i in range(self.n_ways)]
+
+    def stubs_for(self, lang):
+        """{way: entry} for one language."""
+        i = self._search(self.n_langs, lambda k: self._lang(k)[0], lang)
+        if i is None:
+            return {}
+        _, _, start, count = self._lang(i)
+        return dict(self._record(r) for r in range(start, start + count))
+
+    def languages_for(self, way):
+        """{lang: entry} for one way path (relative to hooks/ways)."""
+        i = self._search(self.n_ways, lambda k: self._way(k)[0], way)
+        if i is None:
+            return {}
+        _, start, count = self._way(i)
+        out = {}
+        for slot in range(start, start + count):
+            _, entry = self._record(U32.unpack_from(self._mm, self._by_way + 4 * slot)[0])
+            out[entry["lang"]] = entry
+        return out
+
+    def entries(self):
+        """Yield (way, lang, entry) for every stub, in (way, lang) order."""
+        for slot in range(self.n_records):
+            way, entry = self._record(U32.unpack_from(self._mm, self._by_way + 4 * slot)[0])
+            yield way, entry["lang"], entry
+
+    def stale(self):
+        """Source paths whose stat no longer matches the pack (empty when fresh)."""
+        changed = []
+        for i in range(self.n_sources):
+            path_id, kind, mtime, size = SOURCE.unpack_from(self._mm, self._sources + SOURCE.size * i)
+            path = self.string(path_id)
+            try:
+                st = os.stat(path)
+            except OSError:
+                changed.append(path)
+                continue
+            if st.st_mtime_ns != mtime or (kind == SOURCE_FILE and st.st_size != size):
+                changed.append(path)
+        return changed
+
+
+def open_pack(path=PACK_FILE, rebuild=True):
+    """Open the pack, recompiling it first if it is missing or stale."""
+    try:
+        pack = LocalePack(path)
+    except (OSError, ValueError):
+        if not rebuild:
+            raise
+    else:
+        if not rebuild or not pack.stale():
+            return pack
+        pack.close()
+    compile_pack(path)
+    return LocalePack(path)
+
+
+def locale_entries(path=PACK_FILE):
+    """[(way, lang, entry)] for every stub — from the pack when it is fresh.
+
+    A missing or stale pack is left alone (`make locale-pack` rebuilds it)
+    and the stubs are indexed from the tree instead.
+    """
+    try:
+        with LocalePack(path) as pack:
+            if not pack.stale():
+                return list(pack.entries())
+    except (OSError, ValueError):
+        pass
+    return list(load_index().entries())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("build", "check", "query"))
+    parser.add_argument("-o", "--output", default=PACK_FILE, help="pack path (default: %(default)s)")
+    parser.add_argument("--lang", help="query: stubs for this language")
+    parser.add_argument("--way", help="query: languages for this way path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        n, size = compile_pack(args.output)
+        print(f"  Packed {n} locale entries into {args.output} ({size} bytes)")
+        return 0
+
+    if args.command == "check":
+        try:
+            with LocalePack(args.output) as pack:
+                changed = pack.stale()
+        except (OSError, ValueError) as e:
+            print(f"  MISSING: {e}")
+            return 1
+        for p in changed:
+            print(f"  STALE: {p}")
+        if changed:
+            return 1
+        print("  Locale pack: FRESH")
+        return 0
+
+    if not args.lang and not args.way:
+        parser.error("query needs --lang or --way")
+    with open_pack(args.output) as pack:
+        result = pack.stubs_for(args.lang) if args.lang else pack.languages_for(args.way)
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
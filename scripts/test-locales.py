@@ -1,45 +1,134 @@
 #!/usr/bin/env python3
-"""Validate locale files: no gaps, no duplicates, no inactive entries."""
-import json, glob, sys
-
-with open("tools/ways-cli/languages.json") as f:
-    active = {
-        k for k, v in json.load(f)["languages"].items()
-        if v.get("active") and k != "en"
-    }
-
-errors = 0
-file_count = 0
-
-for fp in sorted(glob.glob("hooks/ways/**/*.locales.jsonl", recursive=True)):
-    file_count += 1
-    seen = {}
-    with open(fp) as f:
-        for i, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-            obj = json.loads(line)
-            lang = obj.get("lang", "")
-            if lang in seen:
-                print(f"  DUPLICATE: {fp}:{i} lang={lang} (first at line {seen[lang]})")
-                errors += 1
-            seen[lang] = i
-
-    missing = active - set(seen.keys())
-    if missing:
-        rel = fp.replace("hooks/ways/", "")
-        print(f"  GAP: {rel} missing: {', '.join(sorted(missing))}")
-        errors += 1
-
-    inactive = set(seen.keys()) - active
-    if inactive:
-        rel = fp.replace("hooks/ways/", "")
-        print(f"  INACTIVE: {rel} has entries for: {', '.join(sorted(inactive))}")
-        errors += 1
-
-print(f"  Checked {file_count} files, {len(active)} active languages")
-if errors:
-    print(f"  {errors} issues found")
-    sys.exit(1)
-print("  Locale coverage: PASS")
+"""Validate locale files: schema, no gaps, no duplicates, no inactive entries.
+
+Usage:
+  test-locales.py                 # full tree (parallel, cached)
+  test-locales.py --staged        # only locale files staged in the index
+                                  # (or next to a staged .lang.md override)
+  test-locales.py --since REF     # only locale files changed since REF
+  test-locales.py --no-cache      # ignore and don't update the result cache
+  test-locales.py --json          # machine-readable report with the index
+
+Validation and the way → lang → entry index live in locale_index.py; this
+script picks the files and reports. Per-file results are cached by content
+hash plus the hash of languages.json, so editing the active-language set
+re-validates everything. With --staged, everything is read from the index —
+locale files and the .lang.md overrides that may shadow them — so unstaged
+edits can't change the verdict.
+"""
+import argparse, glob, json, os, subprocess, sys
+
+from locale_index import (LANGUAGES, LOCALE_GLOB, build_index, override_sibling,
+                          read_files, read_override)
+
+
+def git_lines(*args):
+    out = subprocess.run(["git", *args], capture_output=True, text=True, check=True)
+    return [l for l in out.stdout.splitlines() if l]
+
+
+def is_locale(path):
+    return path.startswith("hooks/ways/") and path.endswith(".locales.jsonl")
+
+
+def read_index(paths):
+    """Staged contents of `paths` via one git cat-file process."""
+    if not paths:
+        return {}
+    out = subprocess.run(
+        ["git", "cat-file", "--batch"], input="".join(f":{p}\n" for p in paths).encode(),
+        capture_output=True, check=True,
+    ).stdout
+    blobs, pos = {}, 0
+    for p in paths:
+        header_end = out.index(b"\n", pos)
+        header = out[pos:header_end].split()
+        if header[-1] == b"missing":
+            pos = header_end + 1
+            continue
+        size = int(header[2])
+        blobs[p] = out[header_end + 1:header_end + 1 + size]
+        pos = header_end + 1 + size + 1
+    return blobs
+
+
+def index_overrides(locale_paths):
+    """Reader for the staged .lang.md overrides next to `locale_paths`."""
+    wanted = set(locale_paths)
+    dirs = sorted({os.path.dirname(p) for p in wanted})
+    staged = [p for p in git_lines("ls-files", "--cached", "--", *dirs)
+              if override_sibling(p) in wanted] if dirs else []
+    return read_index(staged).get
+
+
+def select_files(args):
+    """Return ({path: bytes}, languages.json bytes, full_tree, override reader)."""
+    if args.staged:
+        changed = git_lines("diff", "--cached", "--name-only", "--diff-filter=ACMR")
+        lang_raw = read_index([LANGUAGES]).get(LANGUAGES)
+    elif args.since:
+        changed = git_lines("diff", "--name-only", "--diff-filter=ACMR", args.since, "--")
+        changed += git_lines("ls-files", "--others", "--exclude-standard", "hooks/ways")
+        lang_raw = None
+    else:
+        changed = None
+        lang_raw = None
+    if lang_raw is None:
+        with open(LANGUAGES, "rb") as f:
+            lang_raw = f.read()
+
+    # A change to the language set touches every file's verdict
+    full_tree = changed is None or LANGUAGES in changed
+    if full_tree and args.staged:
+        paths = sorted(p for p in git_lines("ls-files", "--cached", "hooks/ways") if is_locale(p))
+        return read_index(paths), lang_raw, True, index_overrides(paths)
+    if full_tree:
+        paths = sorted(glob.glob(LOCALE_GLOB, recursive=True))
+    else:
+        # An added, changed or emptied override changes its sibling's verdict
+        paths = sorted({p for p in changed if is_locale(p)}
+                       | {override_sibling(p) for p in changed if override_sibling(p)})
+        if args.staged:
+            files = read_index(paths)
+            return files, lang_raw, False, index_overrides(files)
+    return read_files(paths), lang_raw, full_tree, read_override
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--staged", action="store_true", help="check locale files staged for commit")
+    mode.add_argument("--since", metavar="REF", help="check locale files changed since a git ref")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the result cache")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument("--json", action="store_true", help="print the report and index as JSON")
+    args = parser.parse_args()
+
+    files, lang_raw, full_tree, read = select_files(args)
+    # A full run sees every live file, so it also drops cache entries for old contents
+    index, cached = build_index(files, lang_raw, use_cache=not args.no_cache,
+                                jobs=args.jobs, prune=full_tree, read=read)
+
+    if args.json:
+        report = index.report()
+        report["scope"] = "full" if full_tree else "changed"
+        report["cached"] = cached
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        sys.exit(1 if index.issues else 0)
+
+    for issue in index.issues:
+        print(f"  {issue['kind']}: {issue['message']}")
+
+    scope = "" if full_tree else " changed"
+    print(f"  Checked {len(files)}{scope} files, {len(index.active)} active languages"
+          f" ({cached} cached)")
+    if index.issues:
+        print(f"  {len(index.issues)} issues found")
+        sys.exit(1)
+    print("  Locale coverage: PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Find ways whose trigger vocabulary competes for the same prompts.
+
+Builds a BM25-weighted term × way matrix per language — English from the
+.md frontmatter, other languages from the .locales.jsonl stubs — and the
+way × way overlap W·Wᵀ, then reports the most similar pairs.
+
+Usage:
+  vocab_collisions.py                 # top 10 pairs per language
+  vocab_collisions.py --lang ja --top 25
+  vocab_collisions.py --json          # every pair above --min-score
+
+Scores are cosine similarities of the BM25 vectors (0 = no shared terms,
+1 = identical weighting). Tokenization follows bm25.rs — alphabetic runs,
+lowercased, stopwords and tokens under 3 bytes dropped — without the
+Porter2 stemming, so inflected variants count as different terms.
+"""
+import argparse, glob, json, os, re, sys
+
+import numpy as np
+
+from locale_index import WAYS_DIR
+from locale_pack import locale_entries
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# From bm25.rs
+STOPWORDS = set("""
+the a an is are was were be been being have has had do does did will would
+could should may might must shall can this that these those it its what how
+why when where who let lets just to for of in on at by and or but not with
+from into about than then so if up out no yes all some any each my your our
+me we you i
+""".split())
+TOKEN = re.compile(r"[^\W\d_]+")
+OVERRIDE = re.compile(r"\.[a-z][a-z-]{1,4}\.md$")
+
+
+def tokenize(text):
+    return [
+        t for t in (m.group().lower() for m in TOKEN.finditer(text))
+        if len(t.encode("utf-8")) >= 3 and t not in STOPWORDS
+    ]
+
+
+def frontmatter(path, keys=("description", "vocabulary")):
+    """Top-level scalar `keys` from a way file's frontmatter."""
+    with open(path, encoding="utf-8") as f:
+        if f.readline().rstrip() != "---":
+            return {}
+        out = {}
+        for line in f:
+            if line.rstrip() == "---":
+                break
+            key, sep, value = line.partition(":")
+            if sep and key in keys:
+                out[key] = value.strip().strip("\"'")
+        return out
+
+
+def way_id(path):
+    """hooks/ways/a/b/b.md → a/b; hooks/ways/a/b/c.md → a/b/c"""
+    d, name = os.path.split(path[len(WAYS_DIR):])
+    stem = name[:-len(".md")]
+    return d if stem == os.path.basename(d) else f"{d}/{stem}".lstrip("/")
+
+
+def documents_en():
+    """{way: {description, vocabulary}} from English way frontmatter."""
+    out = {}
+    for path in sorted(glob.glob(f"{WAYS_DIR}**/*.md", recursive=True)):
+        if OVERRIDE.search(path):
+            continue
+        fm = frontmatter(path)
+        if fm:
+            out[way_id(path)] = fm
+    return out
+
+
+def documents():
+    """{lang: {way: text}} for every way and locale stub."""
+    docs = {"en": {
+        way: f"{fm.get('description', '')} {fm.get('vocabulary', '')}".strip()
+        for way, fm in documents_en().items()
+    }}
+    for way, lang, entry in locale_entries():
+        docs.setdefault(lang, {})[way] = f"{entry.get('description', '')} {entry.get('vocabulary', '')}"
+    return docs
+
+
+def bm25_matrix(texts, tokenizer=tokenize):
+    """COO triplets (doc, term, weight) and the term list for one language."""
+    vocab, rows, cols, tfs, lengths = {}, [], [], [], []
+    for d, text in enumerate(texts):
+        counts = {}
+        tokens = tokenizer(text)
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        lengths.append(len(tokens))
+        for t, c in counts.items():
+            rows.append(d)
+            cols.append(vocab.setdefault(t, len(vocab)))
+            tfs.append(c)
+    rows, cols = np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+    tf = np.array(tfs, dtype=float)
+    dl = np.array(lengths, dtype=float)
+    n = len(texts)
+    df = np.bincount(cols, minlength=len(vocab)).astype(float)
+    idf = np.maximum(np.log((n - df + 0.5) / (df + 0.5) + 1.0), 0.0)
+    avgdl = dl.mean() if n and dl.mean() > 0 else 1.0
+    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * dl[rows] / avgdl))
+    return rows, cols, idf[cols] * norm, list(vocab)
+
+
+def overlap(rows, cols, weights, n_docs):
+    """Sparse W·Wᵀ for i < j, as (i, j, dot) arrays.
+
+    A postings join: entries sharing a term are paired with one repeat/
+    arange expansion (Σ df² pairs), and pair products are summed per (i, j)
+    with one bincount — no per-pair Python.
+    """
+    order = np.argsort(cols, kind="stable")
+    rows, cols, weights = rows[order], cols[order], weights[order]
+    _, start, df = np.unique(cols, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(df)), df)
+    fan = df[group]                       # partners per entry (incl. itself)
+    left = np.repeat(np.arange(len(rows)), fan)
+    first = np.repeat(np.cumsum(fan) - fan, fan)
+    right = start[group][left] + np.arange(len(left)) - first
+
+    i, j = rows[left], rows[right]
+    keep = i < j
+    i, j = i[keep], j[keep]
+    prod = weights[left[keep]] * weights[right[keep]]
+    keys, inverse = np.unique(i * n_docs + j, return_inverse=True)
+    dots = np.bincount(inverse, prod)
+    return keys // n_docs, keys % n_docs, dots
+
+
+def collisions(texts, min_score=0.0):
+    """Pairs sorted by cosine: [(i, j, cosine, dot)], plus the COO matrix."""
+    rows, cols, weights, terms = bm25_matrix(texts)
+    if not len(rows):
+        return [], (rows, cols, weights, terms)
+    norms = np.sqrt(np.bincount(rows, weights ** 2, minlength=len(texts)))
+    i, j, dots = overlap(rows, cols, weights, len(texts))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos = np.where(norms[i] * norms[j] > 0, dots / (norms[i] * norms[j]), 0.0)
+    order = np.argsort(-cos, kind="stable")
+    pairs = [(int(i[k]), int(j[k]), float(cos[k]), float(dots[k]))
+             for k in order if cos[k] >= min_score]
+    return pairs, (rows, cols, weights, terms)
+
+
+def shared_terms(matrix, a, b, limit=6):
+    """Highest-weighted terms two documents share."""
+    rows, cols, weights, terms = matrix
+    wa = dict(zip(cols[rows == a].tolist(), weights[rows == a].tolist()))
+    wb = dict(zip(cols[rows == b].tolist(), weights[rows == b].tolist()))
+    common = sorted(set(wa) & set(wb), key=lambda t: -(wa[t] * wb[t]))
+    return [terms[t] for t in common[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lang", action="append", help="only these languages (repeatable)")
+    parser.add_argument("--top", type=int, default=10, help="pairs shown per language")
+    parser.add_argument("--min-score", type=float, default=0.2, help="cosine floor for --json")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    docs = documents()
+    report = {}
+    for lang in sorted(docs):
+        if args.lang and lang not in args.lang:
+            continue
+        ways = sorted(docs[lang])
+        pairs, matrix = collisions([docs[lang][w] for w in ways],
+                                   args.min_score if args.json else 0.0)
+        shown = pairs if args.json else pairs[:args.top]
+        report[lang] = {
+            "ways": len(ways),
+            "terms": len(matrix[3]),
+            "pairs": [
+                {"a": ways[i], "b": ways[j], "cosine": round(c, 4), "dot": round(d, 4),
+                 "shared": shared_terms(matrix, i, j)}
+                for i, j, c, d in shown
+            ],
+        }
+
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    for lang, r in report.items():
+        print(f"{lang}: {r['ways']} ways, {r['terms']} terms")
+        for p in r["pairs"]:
+            print(f"  {p['cosine']:.3f}  {p['a']:<38} {p['b']:<38} {' '.join(p['shared'])}")
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
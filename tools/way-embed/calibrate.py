@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Batch-calibrate locale stub embed_thresholds from cached embeddings.
+
+Embeds every locale stub (and an optional labelled prompt set) once through
+`way-embed generate`, keeps the vectors in a memory-mapped float32 matrix
+keyed by content hash, and sweeps thresholds for all stubs at once with
+matrix products. Only new or edited texts are sent to way-embed.
+
+Usage:
+  calibrate.py                            # suggest thresholds (table)
+  calibrate.py --prompts fixtures.jsonl   # add labelled prompts
+  calibrate.py --way code/security --json
+  calibrate.py --apply                    # write changed thresholds back
+
+Labels: every stub is a query that should fire its own way and no other —
+the same self/non-self split `ways tune` uses, but scored against every
+other stub instead of per-stub way-embed calls. A stub never scores against
+itself. Prompt lines are {"prompt": ..., "expected": "way" | ["way", ...] |
+null}; expected matches a way id by suffix, like test-multilingual.sh.
+
+For each stub the sweep picks the threshold with the best F1 (the middle of
+the best plateau), clamped to 0.10–0.90 and rounded to 0.01 like
+`ways tune --apply`.
+"""
+import argparse, hashlib, json, os, re, subprocess, sys, tempfile
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+from locale_index import load_index, way_path  # noqa: E402
+
+XDG_WAY = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "claude-ways" / "user"
+MODEL = XDG_WAY / "multilingual-minilm-l12-v2-q8.gguf"
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "claude-ways" / "calibrate"
+FIXTURES = Path.home() / ".claude" / "tools" / "way-match" / "test-fixtures.jsonl"
+# Same clamp and default as tune.rs
+THRESHOLDS = np.round(np.arange(0.10, 0.905, 0.01), 2)
+DEFAULT_THRESHOLD = 0.25
+EMBEDDING = re.compile(r'"id":"([0-9a-f]+)".*"embedding":\[([^\]]*)\]')
+
+
+def find_way_embed():
+    for p in (XDG_WAY / "way-embed", Path.home() / ".claude" / "bin" / "way-embed"):
+        if p.is_file() and os.access(p, os.X_OK):
+            return p
+    return None
+
+
+def text_key(description, vocabulary):
+    """Content hash of exactly what way-embed embeds: description + ' ' + vocabulary."""
+    return hashlib.sha256(f"{description} {vocabulary}".encode("utf-8")).hexdigest()
+
+
+class VectorCache:
+    """Append-only float32 matrix on disk plus a hash → row index.
+
+    vectors.f32 is raw rows of `dim` floats, opened with np.memmap; the
+    index is rewritten atomically after each append. A different model
+    (path, size, mtime) starts a fresh cache.
+    """
+
+    def __init__(self, model, root=CACHE_DIR):
+        self.root = Path(root)
+        self.data = self.root / "vectors.f32"
+        self.index_path = self.root / "index.json"
+        st = Path(model).stat()
+        self.model_id = f"{Path(model).resolve()}:{st.st_size}:{st.st_mtime_ns}"
+        self.dim, self.rows = None, {}
+        try:
+            idx = json.loads(self.index_path.read_text())
+            if idx.get("model") == self.model_id:
+                self.dim, self.rows = idx["dim"], idx["rows"]
+        except (OSError, ValueError, KeyError):
+            pass
+        if not self.rows and self.data.exists():
+            self.data.unlink()
+
+    def missing(self, keys):
+        return [k for k in dict.fromkeys(keys) if k not in self.rows]
+
+    def append(self, vectors):
+        """vectors: {key: list of floats}."""
+        if not vectors:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        block = np.asarray(list(vectors.values()), dtype=np.float32)
+        self.dim = self.dim or block.shape[1]
+        start = len(self.rows)
+        with open(self.data, "ab") as f:
+            f.write(block.tobytes())
+        for i, key in enumerate(vectors):
+            self.rows[key] = start + i
+        tmp = self.index_path.with_name(f"index.json.{os.getpid()}")
+        tmp.write_text(json.dumps({"model": self.model_id, "dim": self.dim, "rows": self.rows}))
+        os.replace(tmp, self.index_path)
+
+    def matrix(self, keys):
+        mm = np.memmap(self.data, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim))
+        return np.asarray(mm[[self.rows[k] for k in keys]])
+
+
+def embed(way_embed, model, texts, chunk=500):
+    """{key: (description, vocabulary)} → {key: vector} via `way-embed generate`."""
+    out = {}
+    items = list(texts.items())
+    with tempfile.TemporaryDirectory(prefix="calibrate-") as tmp:
+        src, dst = Path(tmp) / "in.jsonl", Path(tmp) / "out.jsonl"
+        for lo in range(0, len(items), chunk):
+            with open(src, "w", encoding="utf-8") as f:
+                for key, (desc, vocab) in items[lo:lo + chunk]:
+                    f.write(json.dumps({"id": key, "description": desc, "vocabulary": vocab},
+                                       ensure_ascii=False, separators=(",", ":")) + "\n")
+            subprocess.run([str(way_embed), "generate", "--corpus", str(src), "--model", str(model),
+                            "--output", str(dst)], check=True, stderr=subprocess.DEVNULL)
+            with open(dst, encoding="utf-8") as f:
+                for line in f:
+                    m = EMBEDDING.search(line)
+                    if m:
+                        out[m.group(1)] = [float(x) for x in m.group(2).split(",")]
+            print(f"  embedded {min(lo + chunk, len(items))}/{len(items)}", file=sys.stderr)
+    return out
+
+
+def load_prompts(path):
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            p = json.loads(line)
+            expected = p.get("expected")
+            if expected is None or p.get("match") is False:
+                expected = []
+            elif isinstance(expected, str):
+                expected = [expected]
+            prompts.append((p["prompt"], expected))
+    return prompts
+
+
+def sweep(scores, labels, exclude=None):
+    """TP/FP/FN per stub per threshold: arrays of shape (len(THRESHOLDS), stubs).
+
+    scores, labels: (queries, stubs). exclude masks query/stub pairs that
+    must not count (a stub scored against itself).
+    """
+    valid = ~exclude if exclude is not None else np.ones(scores.shape, dtype=bool)
+    pos = labels & valid
+    neg = ~labels & valid
+    n_pos = pos.sum(axis=0)
+    tp = np.empty((len(THRESHOLDS), scores.shape[1]), dtype=np.int64)
+    fp = np.empty_like(tp)
+    for k, t in enumerate(THRESHOLDS):
+        fired = scores >= t
+        tp[k] = (fired & pos).sum(axis=0)
+        fp[k] = (fired & neg).sum(axis=0)
+    return tp, fp, n_pos[None, :] - tp
+
+
+def best_thresholds(tp, fp, fn):
+    """Middle of each stub's best-F1 plateau, and the F1 curve."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f1 = np.where(tp > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+    best = f1.max(axis=0)
+    at_best = f1 >= best[None, :] - 1e-12
+    lo = at_best.argmax(axis=0)
+    hi = len(THRESHOLDS) - 1 - at_best[::-1].argmax(axis=0)
+    return THRESHOLDS[(lo + hi) // 2], f1
+
+
+def apply_thresholds(updates):
+    """Rewrite embed_threshold in place: updates = {(file, line): value}."""
+    by_file = {}
+    for (fp, line), value in updates.items():
+        by_file.setdefault(fp, {})[line] = value
+    for fp, lines in by_file.items():
+        with open(fp, encoding="utf-8") as f:
+            text = f.read().splitlines()
+        for line, value in lines.items():
+            obj = json.loads(text[line - 1])
+            obj["embed_threshold"] = value
+            text[line - 1] = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        with open(fp, "w", encoding="utf-8") as f:
+            f.write("\n".join(text) + "\n")
+    return len(by_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=Path, default=MODEL)
+    parser.add_argument("--way-embed", type=Path, default=None)
+    parser.add_argument("--prompts", type=Path, default=None,
+                        help=f"labelled prompts (default: {FIXTURES} if present)")
+    parser.add_argument("--way", help="only report stubs whose way id contains this")
+    parser.add_argument("--apply", action="store_true", help="write changed thresholds")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    way_embed = args.way_embed or find_way_embed()
+    if not way_embed:
+        print("error: way-embed not found. Run `make setup` to install.", file=sys.stderr)
+        return 1
+    if not args.model.is_file():
+        print(f"error: model not found at {args.model}. Run `make setup` first.", file=sys.stderr)
+        return 1
+
+    os.chdir(REPO_ROOT)
+    index = load_index()
+    files = {way_path(fp): fp for fp in index.files}
+    stubs = [(way, lang, e) for way, lang, e in index.entries() if lang in index.active]
+    stub_keys = [text_key(e["description"], e["vocabulary"]) for _, _, e in stubs]
+    texts = {k: (e["description"], e["vocabulary"]) for k, (_, _, e) in zip(stub_keys, stubs)}
+
+    prompts_path = args.prompts or (FIXTURES if FIXTURES.is_file() else None)
+    prompts = load_prompts(prompts_path) if prompts_path else []
+    # way-embed embeds "description vocabulary", so a prompt is (prompt, "")
+    prompt_keys = [text_key(p, "") for p, _ in prompts]
+    texts.update({k: (p, "") for k, (p, _) in zip(prompt_keys, prompts)})
+
+    cache = VectorCache(args.model)
+    todo = cache.missing(texts)
+    if todo:
+        cache.append(embed(way_embed, args.model, {k: texts[k] for k in todo}))
+    stub_vecs = cache.matrix(stub_keys)
+
+    # Queries: every stub, then the prompts. Vectors are L2-normalized.
+    ways = np.array([w for w, _, _ in stubs])
+    query_vecs = np.vstack([stub_vecs, cache.matrix(prompt_keys)]) if prompts else stub_vecs
+    scores = query_vecs @ stub_vecs.T
+    labels = np.vstack([
+        ways[:, None] == ways[None, :],
+        *([np.array([[any(w == x or w.endswith("/" + x) for x in exp) for w in ways]
+                      for _, exp in prompts])] if prompts else []),
+    ])
+    exclude = np.zeros(scores.shape, dtype=bool)
+    np.fill_diagonal(exclude[:len(stubs)], True)
+
+    tp, fp, fn = sweep(scores, labels, exclude)
+    suggested, f1 = best_thresholds(tp, fp, fn)
+
+    rows, updates = [], {}
+    for s, (way, lang, e) in enumerate(stubs):
+        if args.way and args.way not in way:
+            continue
+        current = e.get("embed_threshold", DEFAULT_THRESHOLD)
+        cur_k = int(np.abs(THRESHOLDS - current).argmin())
+        new_k = int(np.abs(THRESHOLDS - suggested[s]).argmin())
+        new = float(suggested[s])
+        changed = abs(new - current) > 0.005 and f1[new_k, s] > f1[cur_k, s]
+        rows.append({"way": way, "lang": lang, "current": current, "suggested": new,
+                     "f1_current": round(float(f1[cur_k, s]), 3),
+                     "f1_suggested": round(float(f1[new_k, s]), 3),
+                     "tp": int(tp[new_k, s]), "fp": int(fp[new_k, s]), "fn": int(fn[new_k, s]),
+                     "changed": bool(changed)})
+        if changed:
+            updates[(files[way], e["line"])] = new
+
+    if args.apply and updates:
+        n = apply_thresholds(updates)
+        print(f"Updated {len(updates)} thresholds in {n} files. Run `ways corpus` to regenerate.",
+              file=sys.stderr)
+
+    if args.json:
+        json.dump({"stubs": len(stubs), "prompts": len(prompts), "embedded": len(todo),
+                   "results": rows}, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    print(f"{'way':<44} {'lang':<6} {'cur':>5} {'new':>5} {'F1 cur':>7} {'F1 new':>7}")
+    for r in rows:
+        if r["changed"]:
+            print(f"{r['way']:<44} {r['lang']:<6} {r['current']:5.2f} {r['suggested']:5.2f}"
+                  f" {r['f1_current']:7.3f} {r['f1_suggested']:7.3f}")
+    changed = sum(r["changed"] for r in rows)
+    print(f"\n{len(rows)} stubs, {changed} with a better-F1 threshold"
+          f" ({len(todo)} texts embedded, {len(texts) - len(todo)} cached)")
+    if changed and not args.apply:
+        print("Run with --apply to write them to the .locales.jsonl files.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""Per-scope staleness check for the embedding corpus (ADR-109).
+
+Hashes the global ways tree and every project's .claude/ways/ found under
+~/.claude/projects/, and says which scopes changed since the corpus was
+last generated. Only the files `ways corpus` reads are hashed (way .md
+files other than *.check.md, and *.locales.jsonl); a project whose ways
+dir holds none of them is not a scope. Scopes are walked in parallel; file
+contents are hashed only when a file's (size, mtime) changed since the last
+run, and each directory gets a Merkle hash over its children, so a changed
+way is pinpointed down to its directory.
+
+Usage:
+  staleness.py                 # verdict per scope; exit 1 if any is stale
+  staleness.py --mark          # record the current trees as embedded
+  staleness.py --json
+
+  staleness.py || { ways corpus && staleness.py --mark; }
+
+`ways corpus` hashes scopes with a process-local hasher, so its manifest
+hashes can't be recomputed here. Instead --mark stores this tool's Merkle
+roots next to the manifest (embed-manifest.merkle.json), bound to the
+manifest's own sha256: if the manifest is regenerated without --mark, every
+scope reads as unknown (stale), like a missing manifest does in ADR-109.
+
+Verdicts: fresh, stale (Merkle root changed), new (a project scope neither
+the manifest nor the baseline lists), unknown (no baseline for this
+manifest), removed (in the manifest, no longer on disk — harmless, dropped
+at next regen). `ways corpus` lists only projects with semantic ways; --mark
+records the others too, so they read fresh until their files change.
+"""
+import argparse, hashlib, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+XDG_WAY = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "claude-ways" / "user"
+MANIFEST = XDG_WAY / "embed-manifest.json"
+BASELINE = XDG_WAY / "embed-manifest.merkle.json"
+HASH_CACHE = XDG_WAY / "embed-hash-cache.json"
+GLOBAL_WAYS = Path.home() / ".claude" / "hooks" / "ways"
+PROJECTS = Path.home() / ".claude" / "projects"
+STALE = ("stale", "new", "unknown")
+
+
+# ── Scope discovery (mirrors tools/ways-cli/src/cmd/corpus.rs) ──────
+
+def resolve_encoded_path(encoded):
+    """Greedy filesystem resolution of Claude Code's lossy / → - encoding."""
+    current, pending = "", ""
+    for seg in encoded.lstrip("-").split("-"):
+        if not pending:
+            if os.path.isdir(f"{current}/{seg}"):
+                current = f"{current}/{seg}"
+            else:
+                pending = seg
+        elif os.path.isdir(f"{current}/{pending}-{seg}"):
+            current, pending = f"{current}/{pending}-{seg}", ""
+        elif os.path.isdir(f"{current}/{pending}/{seg}"):
+            current, pending = f"{current}/{pending}/{seg}", ""
+        else:
+            pending = f"{pending}-{seg}"
+    if pending:
+        if not os.path.isdir(f"{current}/{pending}"):
+            return None
+        current = f"{current}/{pending}"
+    return current if os.path.isdir(current) else None
+
+
+def resolve_project_path(encoded):
+    try:
+        idx = json.loads((PROJECTS / encoded / "sessions-index.json").read_text())
+        path = idx["entries"][0]["projectPath"]
+        if path:
+            return path
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        pass
+    return resolve_encoded_path(encoded)
+
+
+def find_ways_dir(project_path):
+    home, check = Path.home(), Path(project_path)
+    while check != Path("/") and check != home:
+        if (check / ".claude" / "ways").is_dir():
+            return check / ".claude" / "ways"
+        check = check.parent
+    return None
+
+
+def discover(global_dir):
+    """{scope: ways dir}; scope is "global" or the encoded project name."""
+    scopes = {"global": Path(global_dir)}
+    seen = set()
+    if PROJECTS.is_dir():
+        for entry in sorted(os.scandir(PROJECTS), key=lambda e: e.name):
+            if not entry.is_dir():
+                continue
+            path = resolve_project_path(entry.name)
+            ways = find_ways_dir(path) if path else None
+            if ways is None or ways in seen:
+                continue
+            seen.add(ways)
+            marker = ways.parent / ".ways-embed"
+            try:
+                if marker.read_text().strip() == "disinclude":
+                    continue
+            except OSError:
+                pass
+            scopes[entry.name] = ways
+    return scopes
+
+
+# ── Merkle hashing ──────────────────────────────────────────────────
+
+def is_corpus_file(name):
+    """Files scan_ways_dir in corpus.rs reads; anything else can't change the corpus."""
+    if name.endswith(".locales.jsonl"):
+        return True
+    return name.endswith(".md") and ".check." not in name
+
+
+def file_digest(path, st, cache, fresh, counts):
+    """sha256 of a file, reusing the cached digest while (size, mtime) match."""
+    hit = cache.get(path)
+    if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+        counts["cached"] += 1
+        fresh[path] = hit
+        return hit[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    counts["read"] += 1
+    fresh[path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+    return fresh[path][2]
+
+
+def tree_hash(root, cache):
+    """Merkle hashes for one scope.
+
+    Returns ({relative dir: hash}, {path: [size, mtime_ns, sha256]} for every
+    corpus file seen, counts). A directory hashes the sorted (kind, name, hash)
+    of its children, so any change moves every hash on the path up to the
+    root; directories without corpus files below them are left out.
+    """
+    dirs, fresh, counts = {}, {}, {"files": 0, "read": 0, "cached": 0}
+    visiting = set()
+
+    def walk(d, rel):
+        real = os.path.realpath(d)
+        if real in visiting:        # symlink cycle
+            return None
+        visiting.add(real)
+        lines = []
+        try:
+            entries = sorted(os.scandir(d), key=lambda e: e.name)
+        except OSError:
+            entries = []
+        for e in entries:
+            try:
+                if e.is_dir():
+                    child = walk(e.path, f"{rel}/{e.name}" if rel else e.name)
+                    if child:
+                        lines.append(f"d {e.name} {child}")
+                elif e.is_file() and is_corpus_file(e.name):
+                    counts["files"] += 1
+                    lines.append(f"f {e.name} {file_digest(e.path, e.stat(), cache, fresh, counts)}")
+            except OSError:
+                continue
+        visiting.discard(real)
+        if not lines and rel:
+            return None
+        dirs[rel] = hashlib.sha256("\n".join(lines).encode()).hexdigest()
+        return dirs[rel]
+
+    walk(str(root), "")
+    return dirs, fresh, counts
+
+
+def changed_dirs(old, new):
+    """Deepest directories whose hash differs (or that appeared/vanished)."""
+    diff = {d for d in set(old) | set(new) if old.get(d) != new.get(d)}
+    return sorted(d for d in diff
+                  if not any(o != d and o.startswith(f"{d}/" if d else "") for o in diff))
+
+
+def _load(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _save(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}")
+    tmp.write_text(json.dumps(data, separators=(",", ":")))
+    os.replace(tmp, path)
+
+
+def scan(scopes, cache, jobs=None):
+    """Hash every scope in parallel: {scope: (dirs, fresh, counts, seconds)}."""
+    def one(item):
+        name, root = item
+        start = time.perf_counter()
+        dirs, fresh, counts = tree_hash(root, cache)
+        return name, (dirs, fresh, counts, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        return dict(pool.map(one, scopes.items()))
+
+
+def check(global_dir=GLOBAL_WAYS, jobs=None, mark=False):
+    """Per-scope verdicts; with mark, record the current trees as the baseline."""
+    started = time.perf_counter()
+    scopes = discover(global_dir)
+    cache = (_load(HASH_CACHE) or {}).get("files", {})
+    results = scan(scopes, cache, jobs)
+    results = {name: r for name, r in results.items()
+               if name == "global" or r[2]["files"]}
+
+    files = {}
+    for _, fresh, _, _ in results.values():
+        files.update(fresh)
+    _save(HASH_CACHE, {"files": files})
+
+    manifest_bytes = MANIFEST.read_bytes() if MANIFEST.is_file() else None
+    manifest_sha = hashlib.sha256(manifest_bytes).hexdigest() if manifest_bytes else None
+    try:
+        listed = set(json.loads(manifest_bytes or b"{}").get("projects", {}))
+    except ValueError:
+        listed = set()
+    baseline = _load(BASELINE) or {}
+    known = baseline.get("scopes", {}) if manifest_sha and baseline.get("manifest_sha256") == manifest_sha else None
+
+    report = {}
+    for name, (dirs, _, counts, seconds) in sorted(results.items()):
+        root = dirs.get("", "")
+        entry = {"path": str(scopes[name]), "hash": root, "files": counts["files"],
+                 "read": counts["read"], "cached": counts["cached"], "ms": round(seconds * 1000, 2)}
+        if known is None or name not in known:
+            unlisted = name != "global" and manifest_sha and name not in listed
+            entry["verdict"] = "new" if unlisted else "unknown"
+        elif known[name]["root"] == root:
+            entry["verdict"] = "fresh"
+        else:
+            entry["verdict"] = "stale"
+            entry["changed"] = changed_dirs(known[name]["dirs"], dirs)
+        report[name] = entry
+    for name in sorted(listed - set(results)):
+        report[name] = {"verdict": "removed"}
+
+    if mark:
+        if not manifest_sha:
+            raise FileNotFoundError(f"{MANIFEST} not found — run `ways corpus` first")
+        _save(BASELINE, {"manifest_sha256": manifest_sha, "scopes": {
+            name: {"path": str(scopes[name]), "root": dirs.get("", ""), "dirs": dirs}
+            for name, (dirs, _, _, _) in results.items()}})
+    return report, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ways-dir", type=Path, default=GLOBAL_WAYS,
+                        help="global ways tree (default: %(default)s)")
+    parser.add_argument("--mark", action="store_true",
+                        help="record the current trees as matching the manifest")
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        report, elapsed = check(args.ways_dir, args.jobs, args.mark)
+    except FileNotFoundError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    stale = [n for n, r in report.items() if r["verdict"] in STALE]
+
+    if args.json:
+        json.dump({"seconds": round(elapsed, 4), "stale": stale, "scopes": report},
+                  sys.stdout, indent=2)
+        print()
+    else:
+        for name, r in report.items():
+            if r["verdict"] == "removed":
+                print(f"  {'removed':<8} {name}")
+                continue
+            print(f"  {r['verdict']:<8} {name:<44} {r['files']:>4} files"
+                  f" ({r['read']} read) {r['ms']:>8.1f} ms")
+            for d in r.get("changed", []):
+                print(f"             changed: {d or '.'}")
+        print(f"  {len(report)} scopes, {len(stale)} need regeneration ({elapsed * 1000:.0f} ms)")
+        if args.mark:
+            print(f"  Baseline recorded: {BASELINE}")
+    return 0 if args.mark or not stale else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
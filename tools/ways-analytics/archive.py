@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Month-partitioned columnar archive for the ways event log.
+
+Old events move out of events.jsonl into one compressed partition per month:
+
+  ~/.claude/stats/archive/events-2026-02.npz    one zlib member per column
+  ~/.claude/stats/archive/events-2026-02.json   rows, min/max ts, dictionaries
+
+Every field except `ts` is dictionary-encoded: the partition stores int32
+codes (-1 for absent) and the .json holds the distinct strings. `ts` is
+stored as int64 POSIX seconds, sorted. Scans read the small .json files to
+prune months by timestamp, then decompress only the requested columns.
+
+Usage:
+  archive.py compact                     # archive whole months older than 30 days
+  archive.py compact --keep-days 90 --dry-run
+  archive.py list                        # partitions, rows, on-disk size
+  archive.py query --project ~/src/app --since 2026-07-01 --until 2026-09-30
+
+events.iter_events() yields archived events before the JSONL tail, so the
+replay and rollup tools see one continuous log.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from events import STATS_FILE, parse_ts
+
+ARCHIVE_DIR = STATS_FILE.parent / 'archive'
+ARCHIVE_VERSION = 1
+TS_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def month_of(ts):
+    return ts[:7]
+
+
+def format_ts(secs):
+    return time.strftime(TS_FORMAT, time.gmtime(int(secs)))
+
+
+class Partition:
+    """One month: metadata in memory, columns loaded on demand."""
+
+    def __init__(self, meta_path):
+        self.meta_path = Path(meta_path)
+        self.data_path = self.meta_path.with_suffix('.npz')
+        self.meta = json.loads(self.meta_path.read_text())
+        self.month = self.meta['month']
+        self.rows = self.meta['rows']
+        self.min_ts = self.meta['min_ts']
+        self.max_ts = self.meta['max_ts']
+
+    @property
+    def fields(self):
+        return list(self.meta['dictionaries'])
+
+    def overlaps(self, since=None, until=None):
+        return ((since is None or self.max_ts >= since)
+                and (until is None or self.min_ts <= until))
+
+    def columns(self, names):
+        """{name: array} — 'ts' as int64 seconds, other fields as int32 codes."""
+        with np.load(self.data_path) as npz:
+            return {n: npz[n] for n in names if n in npz.files}
+
+    def decode(self, name, codes):
+        """Codes → object array of strings (None where absent)."""
+        table = np.array(self.meta['dictionaries'][name] + [None], dtype=object)
+        return table[codes]
+
+    def lookup(self, name, value):
+        """Code of `value` in a column's dictionary, or None."""
+        try:
+            return self.meta['dictionaries'][name].index(value)
+        except (KeyError, ValueError):
+            return None
+
+    def iter_events(self, events=None):
+        """Yield event dicts in time order, optionally only the named events."""
+        cols = self.columns(['ts'] + self.fields)
+        rows = np.arange(self.rows)
+        if events:
+            codes = [self.lookup('event', e) for e in events]
+            rows = rows[np.isin(cols.get('event', np.empty(0)), [c for c in codes if c is not None])]
+        ts = cols.pop('ts')[rows]
+        decoded = {n: self.decode(n, c[rows]) for n, c in cols.items()}
+        names = list(decoded)
+        for i in range(len(rows)):
+            ev = {'ts': format_ts(ts[i])}
+            for n in names:
+                v = decoded[n][i]
+                if v is not None:
+                    ev[n] = v
+            yield ev
+
+
+def partitions(archive=ARCHIVE_DIR, since=None, until=None):
+    """Partitions overlapping [since, until] (POSIX seconds), oldest first."""
+    archive = Path(archive)
+    if not archive.is_dir():
+        return []
+    parts = [Partition(p) for p in sorted(archive.glob('events-*.json'))]
+    return [p for p in parts if p.overlaps(since, until)]
+
+
+def encode(events, month):
+    """Event dicts of one month → (columns for np.savez, metadata)."""
+    events = sorted(events, key=lambda e: e['_t'])
+    fields = sorted({k for e in events for k in e if k not in ('ts', '_t')})
+    columns = {'ts': np.fromiter((e['_t'] for e in events), dtype=np.int64, count=len(events))}
+    dictionaries = {}
+    for name in fields:
+        table, codes = {}, np.empty(len(events), dtype=np.int32)
+        for i, e in enumerate(events):
+            v = e.get(name)
+            if v is None:
+                codes[i] = -1
+                continue
+            v = v if isinstance(v, str) else json.dumps(v)
+            c = table.get(v)
+            if c is None:
+                c = table[v] = len(table)
+            codes[i] = c
+        columns[name] = codes
+        dictionaries[name] = list(table)
+    meta = {
+        'version': ARCHIVE_VERSION,
+        'month': month,
+        'rows': len(events),
+        'min_ts': int(columns['ts'][0]) if len(events) else None,
+        'max_ts': int(columns['ts'][-1]) if len(events) else None,
+        'dictionaries': dictionaries,
+    }
+    return columns, meta
+
+
+def merge_key(ev):
+    """A row as the partition stores it: ts seconds plus every present field.
+
+    Values go through the same normalisation as encode(), so an event and
+    its archived copy compare equal and two events differing in any field
+    (check, trigger, scope, ...) do not.
+    """
+    return (ev['_t'],) + tuple(sorted(
+        (k, v if isinstance(v, str) else json.dumps(v))
+        for k, v in ev.items() if k not in ('ts', '_t') and v is not None))
+
+
+def write_partition(archive, month, events):
+    """Merge `events` into the month's partition (rewriting it atomically).
+
+    Rows the partition already holds are not added again, so rerunning a
+    compaction that died between writing partitions and swapping the log
+    archives nothing twice. Keys are counted, not just tested: repeats
+    within `events` beyond what the partition has are kept.
+    """
+    archive = Path(archive)
+    archive.mkdir(parents=True, exist_ok=True)
+    meta_path = archive / f'events-{month}.json'
+    if meta_path.exists():
+        old = [dict(e, _t=parse_ts(e['ts'])) for e in Partition(meta_path).iter_events()]
+        held = Counter(merge_key(e) for e in old)
+        new = []
+        for e in events:
+            k = merge_key(e)
+            if held[k]:
+                held[k] -= 1
+            else:
+                new.append(e)
+        if not new:
+            return Partition(meta_path).meta
+        events = old + new
+    columns, meta = encode(events, month)
+
+    pid = os.getpid()
+    tmp_data = archive / f'.events-{month}.{pid}.npz'
+    tmp_meta = archive / f'.events-{month}.{pid}.json'
+    np.savez_compressed(tmp_data, **columns)
+    tmp_meta.write_text(json.dumps(meta, ensure_ascii=False, separators=(',', ':')))
+    # Data first: a reader only trusts partitions it has metadata for
+    os.replace(tmp_data, archive / f'events-{month}.npz')
+    os.replace(tmp_meta, meta_path)
+    return meta
+
+
+def compact(log=STATS_FILE, archive=ARCHIVE_DIR, keep_days=30, dry_run=False):
+    """Move whole months older than `keep_days` from the log into the archive.
+
+    One streaming pass over the log: lines to keep go straight into the
+    replacement file, older ones into a staging file per month, so memory
+    holds one month's events at a time (while encoding it), never the log.
+    Partitions are written before the swap and merge idempotently, so a
+    crash anywhere leaves at worst rows that the next run skips.
+
+    Returns {month: rows archived}. Lines appended while compacting are
+    copied across before the swap; an appender that still holds the old
+    file open past the swap loses its line, so run this when no session is
+    active.
+    """
+    log, archive = Path(log), Path(archive)
+    boundary = month_of(format_ts(time.time() - keep_days * 86400))
+    decode = json.JSONDecoder().decode
+    pid = os.getpid()
+    tmp = log.with_name(f'.{log.name}.{pid}')
+    summary, staged = {}, {}
+
+    out = None if dry_run else open(tmp, 'wb')
+    try:
+        with open(log, 'rb') as f:
+            end = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break           # torn tail: copied verbatim below
+                end += len(line)
+                try:
+                    ev = decode(line.decode('utf-8', errors='replace'))
+                    t = parse_ts(ev.get('ts'))
+                except (ValueError, AttributeError):
+                    # Torn or non-object lines stay in the log untouched
+                    t = None
+                if t is None or ev['ts'][:7] >= boundary:
+                    if out:
+                        out.write(line)
+                    continue
+                month = month_of(ev['ts'])
+                summary[month] = summary.get(month, 0) + 1
+                if out:
+                    if month not in staged:
+                        archive.mkdir(parents=True, exist_ok=True)
+                        staged[month] = open(archive / f'.stage-{month}.{pid}.jsonl', 'wb')
+                    staged[month].write(line)
+        summary = dict(sorted(summary.items()))
+        if out is None or not summary:
+            return summary
+
+        for month, stage in sorted(staged.items()):
+            stage.close()
+            with open(stage.name, 'rb') as lines:
+                evs = [dict(ev, _t=parse_ts(ev['ts'])) for ev in
+                       (decode(line.decode('utf-8', errors='replace')) for line in lines)]
+            write_partition(archive, month, evs)
+
+        with open(log, 'rb') as f:
+            f.seek(end)
+            shutil.copyfileobj(f, out)
+        out.close()
+        os.replace(tmp, log)
+        return summary
+    finally:
+        for stage in staged.values():
+            stage.close()
+            Path(stage.name).unlink(missing_ok=True)
+        if out:
+            out.close()
+            tmp.unlink(missing_ok=True)
+
+
+def scan(columns, since=None, until=None, archive=ARCHIVE_DIR, log=STATS_FILE,
+         **equals):
+    """Decoded columns for events in [since, until] across archive + log.
+
+    since/until: POSIX seconds. equals: field=value filters, applied on codes
+    inside partitions. Returns {'ts': int64 array, field: object array, ...}.
+    """
+    want = ['ts'] + [c for c in columns if c != 'ts']
+    chunks = {c: [] for c in want}
+
+    for part in partitions(archive, since, until):
+        cols = part.columns(set(want) | set(equals))
+        mask = np.ones(part.rows, dtype=bool)
+        if since is not None:
+            mask &= cols['ts'] >= since
+        if until is not None:
+            mask &= cols['ts'] <= until
+        for field, value in equals.items():
+            code = part.lookup(field, value)
+            if code is None or field not in cols:
+                mask[:] = False
+                break
+            mask &= cols[field] == code
+        if not mask.any():
+            continue
+        for c in want:
+            if c == 'ts':
+                chunks[c].append(cols['ts'][mask])
+            elif c in cols:
+                chunks[c].append(part.decode(c, cols[c][mask]))
+            else:
+                chunks[c].append(np.full(int(mask.sum()), None, dtype=object))
+
+    if Path(log).is_file():
+        from events import iter_jsonl
+        rows = []
+        for ev in iter_jsonl(log):
+            t = parse_ts(ev.get('ts'))
+            if t is None or (since is not None and t < since) or (until is not None and t > until):
+                continue
+            if any(ev.get(k) != v for k, v in equals.items()):
+                continue
+            rows.append((t, [ev.get(c) for c in want[1:]]))
+        if rows:
+            chunks['ts'].append(np.array([r[0] for r in rows], dtype=np.int64))
+            for j, c in enumerate(want[1:]):
+                col = np.empty(len(rows), dtype=object)
+                col[:] = [r[1][j] for r in rows]
+                chunks[c].append(col)
+
+    return {c: (np.concatenate(v) if v else np.empty(0, dtype=np.int64 if c == 'ts' else object))
+            for c, v in chunks.items()}
+
+
+def _day(s):
+    return parse_ts(f'{s}T00:00:00Z') if s else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('compact', 'list', 'query'))
+    parser.add_argument('--events', type=Path, default=STATS_FILE)
+    parser.add_argument('--archive', type=Path, default=None,
+                        help='archive dir (default: archive/ next to the log)')
+    parser.add_argument('--keep-days', type=int, default=30)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--since', help='YYYY-MM-DD (query)')
+    parser.add_argument('--until', help='YYYY-MM-DD, inclusive (query)')
+    parser.add_argument('--project', help='exact project path (query)')
+    parser.add_argument('--event', default='way_fired', help='event type (query)')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    archive = args.archive or args.events.parent / 'archive'
+
+    if args.command == 'compact':
+        if not args.events.is_file():
+            print('No events recorded yet.')
+            return 0
+        summary = compact(args.events, archive, args.keep_days, args.dry_run)
+        verb = 'Would archive' if args.dry_run else 'Archived'
+        for month, n in summary.items():
+            print(f'  {verb} {n:>8} events  {month}')
+        if not summary:
+            print('  Nothing older than the keep window.')
+        return 0
+
+    if args.command == 'list':
+        parts = partitions(archive)
+        rows = [{'month': p.month, 'rows': p.rows, 'first': format_ts(p.min_ts),
+                 'last': format_ts(p.max_ts),
+                 'bytes': p.data_path.stat().st_size + p.meta_path.stat().st_size}
+                for p in parts]
+        if args.json:
+            json.dump(rows, sys.stdout, indent=2)
+            print()
+            return 0
+        for r in rows:
+            print(f"  {r['month']}  {r['rows']:>9} events  {r['bytes'] / 1024:9.1f} KiB")
+        if not rows:
+            print('  Archive is empty.')
+        return 0
+
+    until = _day(args.until) + 86399 if args.until else None
+    equals = {'event': args.event}
+    if args.project:
+        equals['project'] = args.project
+    cols = scan(['way'], _day(args.since), until, archive, args.events, **equals)
+    ways, counts = np.unique(cols['way'].astype(str), return_counts=True)
+    result = dict(sorted(zip(ways.tolist(), counts.tolist()), key=lambda kv: -kv[1]))
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        for way, n in result.items():
+            print(f'  {way:<40} {n:>7}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
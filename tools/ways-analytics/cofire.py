@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Co-firing analysis: how many ways are live at once, and which together.
+
+An injection stays live for --window model units, or until the same way
+fires again (a re-fire renews it, it doesn't add a second copy). At every
+injection point — the distinct times at which something fired — this
+counts the live injections n, the quantity on the x axis of the saturation
+figure (A_inject / (1 + k·n)), and reports:
+
+  at injections   share of injection points at each n
+  over time       share of session time with n live (first firing to the
+                  last injection's expiry)
+  pairs, triples  way sets most often live together at an injection point
+                  (Apriori: a triple is only counted if its three pairs
+                  are frequent), with lift = P(ab) / (P(a)·P(b))
+
+Usage:
+  cofire.py                            # events.jsonl, window from the model
+  cofire.py --window 3 --days 30
+  cofire.py --axis epoch               # live sessions under the sessions root
+  cofire.py --npz docs/images/cofire.npz   # data for the saturation figure
+  cofire.py --json
+
+The default window is how long one injection stays above the noise floor:
+ln(A_inject / floor) / beta. Sessions are read in one streaming pass with
+way ids interned to columns; segments are stacked into flat arrays (gaps
+wider than the window keep them apart) and swept in batches. Each batch's
+points form a boolean points × ways matrix: its Gram product gives every
+pair's support, and its bit-packed columns are kept for the triple counts,
+so memory is one bit per (point, way).
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from events import (
+    INJECTION_EVENTS, STATS_FILE, iter_events, iter_jsonl, parse_ts,
+    sessions_root,
+)
+from replay import NOISE_FLOOR
+
+BATCH_EVENTS = 1 << 16
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+# --------------------------------------------------------------------------
+# Segment readers (streaming) — yield (key, times, way columns)
+# --------------------------------------------------------------------------
+
+def segments_from_events(path, ways, days=None, project=None):
+    """Per-segment firings from events.jsonl, segmented like replay.py.
+
+    A segment is yielded as soon as a later session_start closes it; `ways`
+    maps way id → column and grows as new ways appear.
+    """
+    cutoff = time.time() - days * 86400 if days else None
+    live = {}      # session id → (key, times, columns)
+    segments = {}  # session id → number of session_start seen
+
+    for ev in iter_events(path, events=('session_start',) + INJECTION_EVENTS):
+        ts = parse_ts(ev.get('ts'))
+        sid = ev.get('session', '')
+        if ts is None or not sid or sid == 'unknown':
+            continue
+        if cutoff and ts < cutoff:
+            continue
+        if project and project not in ev.get('project', ''):
+            continue
+
+        if ev['event'] == 'session_start':
+            n = segments.get(sid, 0)
+            segments[sid] = n + 1
+            if sid in live:
+                yield live.pop(sid)
+            live[sid] = (sid if n == 0 else f'{sid}#{n}', array('d'), array('i'))
+            continue
+
+        way = ev.get('way')
+        if not way:
+            continue
+        seg = live.get(sid)
+        if seg is None:
+            segments.setdefault(sid, 1)
+            seg = live[sid] = (sid, array('d'), array('i'))
+        seg[1].append(ts)
+        seg[2].append(ways.setdefault(way, len(ways)))
+
+    yield from live.values()
+
+
+def segments_from_sessions(ways, root=None):
+    """Epoch-axis firings from {sessions root}/{session}/metrics.jsonl."""
+    root = Path(root) if root else sessions_root()
+    for metrics in sorted(root.glob('*/metrics.jsonl')):
+        times, cols = array('d'), array('i')
+        for m in iter_jsonl(metrics, contains=('"way"',)):
+            way = m.get('way')
+            try:
+                epoch = int(m.get('epoch', 0))
+            except (TypeError, ValueError):
+                continue
+            if way:
+                times.append(epoch)
+                cols.append(ways.setdefault(way, len(ways)))
+        yield metrics.parent.name, times, cols
+
+
+def batches(segments, size=BATCH_EVENTS):
+    """Group segments into lists holding about `size` firings each."""
+    batch, n = [], 0
+    for seg in segments:
+        if not seg[1]:
+            continue
+        batch.append(seg)
+        n += len(seg[1])
+        if n >= size:
+            yield batch
+            batch, n = [], 0
+    if batch:
+        yield batch
+
+
+# --------------------------------------------------------------------------
+# Accumulation
+# --------------------------------------------------------------------------
+
+class CoFiring:
+    """Fleet-wide concurrency histograms and co-occurrence counts."""
+
+    def __init__(self, window, unit):
+        self.window = window
+        self.unit = unit
+        self.sessions = 0
+        self.injections = 0
+        self.points = 0
+        self.span = 0.0
+        self.at_points = np.zeros(1, dtype=np.int64)   # points with n live
+        self.live_time = np.zeros(1)                   # time with n live (n ≥ 1)
+        self.co = np.zeros((0, 0), dtype=np.int64)     # pair supports; diagonal = way's
+        self.packed = []                               # per batch: packbits(points × ways)
+
+    def add(self, batch, n_ways):
+        """Fold one batch of segments."""
+        window = self.window
+        times, cols = [], []
+        offset = 0.0
+        for _, t, w in batch:
+            t = np.frombuffer(t, dtype=np.float64) / self.unit
+            lo, hi = t.min(), t.max()
+            times.append(t - lo + offset)
+            cols.append(np.frombuffer(w, dtype=np.int32))
+            # The last firing expires at hi + window; the gap keeps the next
+            # segment's intervals clear of this one's
+            offset += hi - lo + 2 * window
+            self.span += hi - lo + window
+        t, w = np.concatenate(times), np.concatenate(cols)
+        self.sessions += len(batch)
+        self.injections += len(t)
+
+        # One live interval per firing, cut short by the same way's next one
+        order = np.lexsort((t, w))
+        t, w = t[order], w[order]
+        same = w[1:] == w[:-1]
+        keep = np.concatenate(([True], ~(same & (t[1:] == t[:-1]))))
+        t, w = t[keep], w[keep]
+        end = t + window
+        same = w[1:] == w[:-1]
+        end[:-1] = np.where(same, np.minimum(end[:-1], t[1:]), end[:-1])
+
+        # n at each injection point: intervals started minus intervals ended
+        points = np.unique(t)
+        n = (np.searchsorted(np.sort(t), points, side='right')
+             - np.searchsorted(np.sort(end), points, side='right'))
+        self.at_points = _add_hist(self.at_points, np.bincount(n))
+
+        # Time with n live: sweep the interval edges
+        edges = np.concatenate((t, end))
+        step = np.concatenate((np.ones(len(t), np.int64), -np.ones(len(t), np.int64)))
+        order = np.argsort(edges, kind='stable')
+        level = np.cumsum(step[order])[:-1]
+        self.live_time = _add_hist(self.live_time,
+                                   np.bincount(level, weights=np.diff(edges[order])))
+
+        # points × ways membership: firing i is live at points [lo, hi)
+        lo = np.searchsorted(points, t, side='left')
+        hi = np.searchsorted(points, end, side='left')
+        length = hi - lo
+        starts = np.cumsum(length) - length
+        rows = np.repeat(lo - starts, length) + np.arange(length.sum())
+        member = np.zeros((len(points), n_ways), dtype=bool)
+        member[rows, np.repeat(w, length)] = True
+
+        # float32 Gram is exact while a batch has fewer than 2**24 points
+        m = member.astype(np.float32)
+        co = np.zeros((n_ways, n_ways), dtype=np.int64)
+        co[:len(self.co), :len(self.co)] = self.co
+        co += (m.T @ m).astype(np.int64)
+        self.co = co
+        self.packed.append(np.packbits(member, axis=0))
+        self.points += len(points)
+
+    # -- results ------------------------------------------------------------
+
+    def distribution(self):
+        """(share of points at n, share of session time at n), n = 0.."""
+        size = max(len(self.at_points), len(self.live_time))
+        at_points = np.zeros(size)
+        at_points[:len(self.at_points)] = self.at_points
+        live_time = np.zeros(size)
+        live_time[:len(self.live_time)] = self.live_time
+        live_time[0] = max(0.0, self.span - live_time[1:].sum())
+        return (at_points / max(1, self.points),
+                live_time / self.span if self.span > 0 else live_time)
+
+    def bit_columns(self):
+        """ways × (points / 8) packed membership, one row per way."""
+        n_ways = len(self.co)
+        out = np.zeros((n_ways, sum(p.shape[0] for p in self.packed)), dtype=np.uint8)
+        row = 0
+        for p in self.packed:
+            out[:p.shape[1], row:row + p.shape[0]] = p.T
+            row += p.shape[0]
+        return out
+
+    def pairs(self, min_count):
+        """[(a, b, support)] for pairs live together at ≥ min_count points."""
+        a, b = np.triu_indices(len(self.co), k=1)
+        support = self.co[a, b]
+        keep = support >= min_count
+        return list(zip(a[keep].tolist(), b[keep].tolist(), support[keep].tolist()))
+
+    def triples(self, pairs, min_count):
+        """[(a, b, c, support)] from the frequent pairs (Apriori), by bit counts."""
+        frequent = np.zeros(self.co.shape, dtype=bool)
+        for a, b, _ in pairs:
+            frequent[a, b] = frequent[b, a] = True
+        bits = self.bit_columns()
+        found = []
+        for a, b, _ in pairs:
+            cs = np.flatnonzero(frequent[a, b + 1:] & frequent[b, b + 1:]) + b + 1
+            if not len(cs):
+                continue
+            ab = bits[a] & bits[b]
+            support = POPCOUNT[ab & bits[cs]].sum(axis=1, dtype=np.int64)
+            found.extend((a, b, int(c), int(s)) for c, s in zip(cs, support) if s >= min_count)
+        return found
+
+
+def _add_hist(into, h):
+    if len(h) > len(into):
+        into = np.concatenate((into, np.zeros(len(h) - len(into), dtype=into.dtype)))
+    into[:len(h)] += h.astype(into.dtype)
+    return into
+
+
+def quantile(share, q):
+    """Smallest n whose cumulative share reaches q."""
+    cum = np.cumsum(share)
+    return int(min(np.searchsorted(cum, q * cum[-1] - 1e-12), len(share) - 1)) if len(cum) else 0
+
+
+# --------------------------------------------------------------------------
+# Report
+# --------------------------------------------------------------------------
+
+def analyze(segments, ways, window, unit, min_support, top):
+    acc = CoFiring(window, unit)
+    for batch in batches(segments):
+        acc.add(batch, len(ways))
+    names = [None] * len(ways)
+    for way, col in ways.items():
+        names[col] = way
+
+    share_points, share_time = acc.distribution()
+    n = np.arange(len(share_points))
+    min_count = max(2, math.ceil(min_support * acc.points))
+    single = np.diag(acc.co).astype(float) if len(acc.co) else np.zeros(0)
+    points = max(1, acc.points)
+
+    def lift(support, *cols):
+        return support / points / np.prod([single[c] / points for c in cols])
+
+    pairs = acc.pairs(min_count)
+    triples = acc.triples(pairs, min_count) if pairs else []
+    pairs.sort(key=lambda p: -p[2])
+    triples.sort(key=lambda p: -p[3])
+    return {
+        'sessions': acc.sessions,
+        'injections': acc.injections,
+        'points': acc.points,
+        'window': window,
+        'n': n,
+        'share_points': share_points,
+        'share_time': share_time,
+        'mean_points': float(n @ share_points),
+        'mean_time': float(n @ share_time),
+        'quantiles': np.array([quantile(share_points, q) for q in (0.5, 0.9, 0.99)]),
+        'min_count': min_count,
+        'pairs': [{'ways': sorted((names[a], names[b])), 'support': s,
+                   'share': round(s / points, 4), 'lift': round(float(lift(s, a, b)), 2)}
+                  for a, b, s in pairs[:top]],
+        'triples': [{'ways': sorted((names[a], names[b], names[c])), 'support': s,
+                     'share': round(s / points, 4), 'lift': round(float(lift(s, a, b, c)), 2)}
+                    for a, b, c, s in triples[:top]],
+    }
+
+
+def save_npz(path, r):
+    """Arrays for generate-decay-diagrams.py (fig_saturation)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path, n=r['n'], share_points=r['share_points'], share_time=r['share_time'],
+        quantile_levels=np.array([0.5, 0.9, 0.99]), quantiles=r['quantiles'],
+        window=np.array(r['window']), sessions=np.array(r['sessions']),
+        points=np.array(r['points']),
+        pair_names=np.array([' + '.join(p['ways']) for p in r['pairs']], dtype=str),
+        pair_support=np.array([p['support'] for p in r['pairs']], dtype=np.int64),
+        triple_names=np.array([' + '.join(p['ways']) for p in r['triples']], dtype=str),
+        triple_support=np.array([p['support'] for p in r['triples']], dtype=np.int64))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=Path, default=STATS_FILE,
+                        help='event log (default: %(default)s)')
+    parser.add_argument('--axis', choices=('time', 'epoch'), default='time')
+    parser.add_argument('--sessions-root', type=Path, default=None,
+                        help='sessions root for --axis epoch')
+    parser.add_argument('--days', type=int, default=None)
+    parser.add_argument('--project', default=None,
+                        help='only sessions whose project path contains this')
+    parser.add_argument('--unit', type=float, default=60.0,
+                        help='seconds per model unit for --axis time (default: 60)')
+    parser.add_argument('--window', type=float, default=None,
+                        help='model units an injection stays live (default: until it decays to --floor)')
+    parser.add_argument('--beta', type=float, default=0.55)
+    parser.add_argument('--a-inject', type=float, default=0.65)
+    parser.add_argument('--floor', type=float, default=NOISE_FLOOR)
+    parser.add_argument('--min-support', type=float, default=0.01,
+                        help='share of injection points a pair or triple must reach (default: 0.01)')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--npz', type=Path, default=None,
+                        help='write the distribution for the saturation figure here')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    window = args.window or math.log(args.a_inject / args.floor) / args.beta
+    ways = {}
+    if args.axis == 'time':
+        if not args.events.is_file():
+            print('No events recorded yet.')
+            return 0
+        segments = segments_from_events(args.events, ways, args.days, args.project)
+        unit = args.unit
+    else:
+        segments = segments_from_sessions(ways, args.sessions_root)
+        unit = 1.0
+
+    r = analyze(segments, ways, window, unit, args.min_support, args.top)
+    if args.npz and r['points']:
+        save_npz(args.npz, r)
+
+    if args.json:
+        out = {k: (v.tolist() if isinstance(v, np.ndarray) else v) for k, v in r.items()}
+        json.dump(out, sys.stdout, indent=2)
+        print()
+        return 0
+
+    if not r['points']:
+        print('No sessions with way firings.')
+        return 0
+    p50, p90, p99 = r['quantiles']
+    print('Co-firing')
+    print('=========')
+    print(f"Sessions: {r['sessions']}  |  Injections: {r['injections']}"
+          f"  |  Injection points: {r['points']}  |  Window: {window:.2f} units")
+    print(f"Live at an injection:  mean {r['mean_points']:.2f}, p50 {p50}, p90 {p90}, p99 {p99}")
+    print(f"Live over time:        mean {r['mean_time']:.2f}")
+    print()
+    print(f"{'n':>3} {'injections':>11} {'time':>7}")
+    for n in r['n']:
+        if max(r['share_points'][n], r['share_time'][n]) >= 0.0005:
+            print(f"{n:>3} {r['share_points'][n]:>11.1%} {r['share_time'][n]:>7.1%}")
+    for label, rows in (('pairs', r['pairs']), ('triples', r['triples'])):
+        print()
+        print(f"Top {label} (live together at ≥ {r['min_count']} points):")
+        if not rows:
+            print('  (none)')
+        for p in rows:
+            print(f"  {p['support']:>7} {p['share']:>6.1%}  lift {p['lift']:>6.2f}  {' + '.join(p['ways'])}")
+    if args.npz:
+        print()
+        print(f'Wrote {args.npz}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
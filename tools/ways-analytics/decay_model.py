@@ -0,0 +1,243 @@
+"""Context decay model — vectorized adherence curves.
+
+Numeric core behind docs/hooks-and-ways/context-decay.md and the figures in
+docs/images/. Everything here operates on whole numpy arrays so the same
+code serves 2,000-point illustrations and 10^6-sample session timelines.
+
+Parameters (alpha, beta, A0) may be scalars or 1-D arrays of equal length.
+Scalars return a curve shaped like `t`; arrays return one row per
+parameter set, shape (P, len(t)).
+"""
+
+import numpy as np
+
+
+def _param_batch(*params):
+    """Broadcast parameter sets to column vectors.
+
+    Returns (columns, batched) where each column has shape (P, 1) and
+    `batched` says whether the caller passed any array-valued parameter.
+    """
+    arrays = [np.atleast_1d(np.asarray(p, dtype=float)) for p in params]
+    batched = any(np.ndim(p) > 0 for p in params)
+    arrays = np.broadcast_arrays(*arrays)
+    return [a.reshape(-1, 1) for a in arrays], batched
+
+
+def turn_index(t, user_turns):
+    """Count of user turns at or before each sample of `t`.
+
+    Equivalent to walking `t` forward and advancing past every turn with
+    `ti >= turn`, but done with one sorted search.
+    """
+    turns = np.sort(np.asarray(user_turns, dtype=float))
+    return np.searchsorted(turns, t, side='right'), turns
+
+
+def damped_sawtooth(t, user_turns, alpha=0.35, beta=0.8, A0=1.0):
+    """
+    Model adherence as A0 * n^-alpha * exp(-beta * t_local).
+    user_turns: t values where user messages occur (partial reset).
+    Each user turn resets t_local to 0; the peak at reset equals the envelope.
+    Returns an array shaped like t, or (P, len(t)) for P parameter sets.
+    """
+    t = np.asarray(t, dtype=float)
+    idx, turns = turn_index(t, user_turns)
+
+    # n starts at 1 and increments at every user turn crossed
+    log_n = np.log1p(idx.astype(float))
+    last_turn = np.concatenate(([0.0], turns))[idx]
+    t_local = t - last_turn
+
+    (alpha, beta, A0), batched = _param_batch(alpha, beta, A0)
+    # A0 * n^-alpha * exp(-beta t_local) == A0 * exp(-(alpha log n + beta t_local))
+    adherence = A0 * np.exp(-(alpha * log_n + beta * t_local))
+    adherence = np.clip(adherence, 0, A0)
+    return adherence if batched else adherence[0]
+
+
+def _envelope_equal_beta(t, times, log_amp, beta):
+    """Envelope for events sharing one decay rate.
+
+    With a common beta, A_e * exp(-beta (t - t_e)) ranks events by
+    log A_e + beta * t_e regardless of t, so a running max over events in
+    time order gives the dominant event for every sample at once.
+    """
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    key = np.maximum.accumulate(log_amp[order] + beta * times)
+
+    idx = np.searchsorted(times, t, side='right')
+    out = np.zeros_like(t)
+    live = idx > 0
+    out[live] = np.exp(key[idx[live] - 1] - beta * t[live])
+    return out
+
+
+def _upper_hull(slope, icept):
+    """Upper envelope of the lines y = slope * t + icept.
+
+    Returns (lines, breaks): indices of the lines on the envelope, left to
+    right, and the t at which each takes over (-inf for the first).
+    """
+    order = np.lexsort((icept, slope))
+    slope, icept = slope.tolist(), icept.tolist()
+    lines, breaks = [], []
+
+    def takeover(j, i):
+        if slope[j] == slope[i]:
+            return -np.inf      # sorted by intercept: i is never below j
+        return (icept[j] - icept[i]) / (slope[i] - slope[j])
+
+    for i in order.tolist():
+        while lines and takeover(lines[-1], i) <= breaks[-1]:
+            lines.pop()
+            breaks.pop()
+        breaks.append(takeover(lines[-1], i) if lines else -np.inf)
+        lines.append(i)
+    return np.array(lines), np.array(breaks)
+
+
+def injection_envelope(t, events, amplitude=1.0, beta=0.8):
+    """
+    Max of decaying exponentials since each event:
+        max over t_e <= t of amplitude_e * exp(-beta_e * (t - t_e))
+    events: t values where an injection (way firing, user correction) lands.
+    amplitude, beta: scalars or one value per event.
+    Returns an array shaped like t; zero before the first event.
+
+    In log space each event is a line in t, log A_e + beta_e t_e - beta_e t,
+    live from t_e on. With one beta the lines are parallel and a running max
+    settles it (_envelope_equal_beta). Otherwise the time-sorted events are
+    cut into power-of-two blocks: the events live at t are a prefix, which
+    takes at most one block per level, and each block's lines reduce to
+    their upper hull. A level is one sorted search of every sample against
+    the hulls of its blocks, so the cost is O(N log M + M log^2 M) however
+    many distinct betas there are.
+    """
+    t = np.asarray(t, dtype=float)
+    times = np.asarray(events, dtype=float).ravel()
+    if times.size == 0:
+        return np.zeros_like(t)
+
+    amp = np.broadcast_to(np.asarray(amplitude, dtype=float), times.shape)
+    betas = np.broadcast_to(np.asarray(beta, dtype=float), times.shape)
+    keep = amp > 0
+    times, amp, betas = times[keep], amp[keep], betas[keep]
+    if times.size == 0:
+        return np.zeros_like(t)
+    log_amp = np.log(amp)
+
+    flat = t.ravel()
+    if np.all(betas == betas[0]):
+        return _envelope_equal_beta(flat, times, log_amp, betas[0]).reshape(t.shape)
+
+    order = np.argsort(times, kind='stable')
+    times, slope = times[order], -betas[order]
+    icept = log_amp[order] - slope * times
+    live = np.searchsorted(times, flat, side='right')
+
+    # Each block's breakpoints go into its own [pos·span, (pos+1)·span)
+    # window so one searchsorted serves every block of a level
+    lo, hi = flat.min() - 1.0, flat.max() + 1.0
+    span = hi - lo + 1.0
+    best = np.full(flat.shape, -np.inf)
+    level = 0
+    while (1 << level) <= times.size:
+        size = 1 << level
+        rows = np.flatnonzero((live >> level) & 1)
+        level += 1
+        if not rows.size:
+            continue
+        block = (live[rows] >> (level - 1)) - 1
+        blocks, pos = np.unique(block, return_inverse=True)
+        lines, breaks = [], []
+        for b, k in enumerate(blocks.tolist()):
+            first = k * size
+            hull, at = _upper_hull(slope[first:first + size], icept[first:first + size])
+            lines.append(hull + first)
+            breaks.append(np.clip(at, lo, hi) - lo + b * span)
+        lines, breaks = np.concatenate(lines), np.concatenate(breaks)
+        hit = lines[np.searchsorted(breaks, flat[rows] - lo + pos * span, side='right') - 1]
+        np.maximum.at(best, rows, icept[hit] + slope[hit] * flat[rows])
+    return np.exp(best).reshape(t.shape)
+
+
+def injected_adherence(t, user_turns, way_injections, alpha=0.35, beta=0.8,
+                       A0=1.0, A_inject=0.7):
+    """
+    Combined adherence: decaying system prompt + fresh injections.
+    way_injections: t values where ways fire.
+    The injection term uses exp(-beta * t_since_inject) — same local decay,
+    but no turn-count envelope because it's not pinned at position zero.
+    Batched parameters return (P, len(t)) like damped_sawtooth.
+    """
+    t = np.asarray(t, dtype=float)
+    base = damped_sawtooth(t, user_turns, alpha, beta, A0)
+
+    (_, betas, A_injects), batched = _param_batch(alpha, beta, A_inject)
+    inject = np.stack([
+        injection_envelope(t, way_injections, a[0], b[0])
+        for a, b in zip(A_injects, betas)
+    ])
+    combined = base + (inject if batched else inject[0])
+    return np.clip(combined, 0, 1.3)
+
+
+def moving_average(x, size):
+    """Centered moving average via cumulative sums.
+
+    Matches scipy.ndimage.uniform_filter1d(x, size) with its default
+    'reflect' boundary (numpy's 'symmetric' pad) without the scipy import.
+    """
+    x = np.asarray(x, dtype=float)
+    left = size // 2
+    right = size - left - 1
+    padded = np.pad(x, (left, right), mode='symmetric')
+    csum = np.concatenate(([0.0], np.cumsum(padded)))
+    return (csum[size:] - csum[:-size]) / size
+
+
+# --------------------------------------------------------------------------
+# RoPE positional decay
+# --------------------------------------------------------------------------
+
+ROPE_SCALING = (None, 'linear', 'ntk')
+
+
+def rope_frequencies(d_model=128, base=10000.0, scaling=None, factor=1.0):
+    """
+    Per-band rotation frequencies theta_k = base^(-2k/d_model), k < d_model/2.
+    scaling: None, 'linear' (position interpolation: theta / factor) or
+             'ntk' (NTK-aware: base * factor^(d/(d-2))).
+    """
+    if scaling not in ROPE_SCALING:
+        raise ValueError(f'unknown RoPE scaling {scaling!r} (expected one of {ROPE_SCALING})')
+    if scaling == 'ntk':
+        base = base * factor ** (d_model / (d_model - 2))
+    theta = base ** (-2.0 * np.arange(d_model // 2) / d_model)
+    if scaling == 'linear':
+        theta = theta / factor
+    return theta
+
+
+def rope_aggregate(distance, d_model=128, base=10000.0, scaling=None,
+                   factor=1.0, chunk=65536, dtype=np.float64):
+    """
+    Mean of cos(distance * theta_k) over all RoPE bands.
+
+    Evaluated as an outer product over fixed-size chunks of `distance`, so
+    the working set is chunk x d_model/2 regardless of how many distances
+    are requested (64 MB at the defaults). Phases are range-reduced in
+    float64 before the cosine, so dtype=np.float32 halves the cosine
+    buffer and the result without losing accuracy at 10^6-token distances.
+    """
+    distance = np.asarray(distance, dtype=np.float64).ravel()
+    theta = rope_frequencies(d_model, base, scaling, factor)
+    out = np.empty(distance.shape, dtype=dtype)
+
+    for start in range(0, distance.size, chunk):
+        phase = np.multiply.outer(distance[start:start + chunk], theta)
+        np.remainder(phase, 2 * np.pi, out=phase)
+        out[start:start + chunk] = np.cos(phase.astype(dtype, copy=False)).mean(axis=1)
+    return out
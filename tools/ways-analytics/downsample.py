@@ -0,0 +1,119 @@
+"""Downsampling for plotting long traces.
+
+matplotlib's cost and the PNG size follow the number of vertices it is
+handed, not the number of pixels they land on. These reduce a set of
+series sharing one x axis to a bounded number of points before plotting,
+so render time stays flat as traces grow from 2,000 illustration samples
+to 10^6-sample session replays.
+
+Both methods select indices jointly for every series on the axis, so
+stacked fill_between bands and the lines drawn over them stay aligned.
+
+  minmax  per x bucket (≈ pixel column), keep each series' minimum and
+          maximum plus the bucket's first and last sample. Every sawtooth
+          peak and both sides of an injection jump survive exactly.
+  lttb    Largest-Triangle-Three-Buckets: one point per bucket, the one
+          forming the largest triangle with its neighbours (areas summed
+          over series). Smoother, fewer points, but a peak can be traded
+          for a larger feature in the same bucket.
+"""
+
+import numpy as np
+
+METHODS = ('minmax', 'lttb')
+
+
+def _stack(series, n):
+    """Series as rows of a (S, n) float array; (..., n) arrays add one row each."""
+    rows = [np.asarray(s, dtype=float).reshape(-1, n) for s in series]
+    return np.vstack(rows) if rows else np.empty((0, n))
+
+
+def minmax_indices(x, series, buckets):
+    """Sorted indices keeping each bucket's extremes for every series.
+
+    Buckets split the x range evenly (pixel columns); x must be sorted.
+    Returns at most (2·S + 2)·buckets indices and always the endpoints.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    ys = _stack(series, n)
+    span = x[-1] - x[0]
+    if span <= 0:
+        return np.arange(n)
+    bucket = np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    keep = [starts, ends]
+    ids = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    for y in ys:
+        # fmin/fmax skip NaN gaps; an all-NaN bucket keeps only its endpoints
+        for reduce in (np.fmin, np.fmax):
+            ext = reduce.reduceat(y, starts)
+            hit = np.flatnonzero(y == ext[ids])
+            keep.append(hit[np.unique(ids[hit], return_index=True)[1]])
+    return np.unique(np.concatenate(keep))
+
+
+def lttb_indices(x, series, points):
+    """Largest-Triangle-Three-Buckets over several series at once.
+
+    Classic LTTB: the first and last samples are kept, the rest split into
+    `points` - 2 equal-count buckets, and each bucket contributes the sample
+    whose triangle with the previous pick and the next bucket's mean is
+    largest. Work per bucket is vectorized; the loop is over output points.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    ys = _stack(series, n)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    out = np.empty(points, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx = x[nlo:nhi].mean() if nhi > nlo else x[-1]
+        cy = ys[:, nlo:nhi].mean(axis=1) if nhi > nlo else ys[:, -1]
+        bx, by = x[lo:hi], ys[:, lo:hi]
+        area = np.abs((x[a] - cx) * (by - ys[:, a:a + 1])
+                      - (x[a] - bx) * (cy[:, None] - ys[:, a:a + 1])).sum(axis=0)
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample(x, series, points, method='minmax'):
+    """Indices to keep so that roughly `points` samples reach the plot.
+
+    For minmax `points` is the bucket count (one per pixel column is the
+    natural choice); the result can hold up to (2·S + 2) points per bucket.
+    Returns all indices when the trace is already short enough.
+    """
+    n = len(x)
+    if method not in METHODS:
+        raise ValueError(f'unknown downsampling method {method!r} (expected one of {METHODS})')
+    if not points or n <= points:
+        return np.arange(n)
+    if method == 'lttb':
+        return lttb_indices(x, series, points)
+    return minmax_indices(x, series, points)
+
+
+def downsample_curves(curves, x, series, points, method='minmax'):
+    """Apply one index selection to `curves[x]` and every `curves[s]`.
+
+    Returns (new curves dict, samples before, samples after). Keys not
+    named are passed through untouched.
+    """
+    xs = np.asarray(curves[x])
+    idx = downsample(xs, [curves[s] for s in series], points, method)
+    if len(idx) == len(xs):
+        return curves, len(xs), len(xs)
+    out = dict(curves)
+    out[x] = xs[idx]
+    for s in series:
+        out[s] = np.asarray(curves[s])[..., idx]
+    return out, len(xs), len(idx)
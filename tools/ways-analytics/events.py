@@ -0,0 +1,102 @@
+"""Streaming access to the ways event log and session state.
+
+~/.claude/stats/events.jsonl is append-only and unbounded, so nothing here
+loads it whole: readers are generators that yield one event at a time.
+Paths mirror the ways binary (session::sessions_root, session::log_event).
+"""
+
+import calendar
+import json
+import os
+from pathlib import Path
+
+STATS_FILE = Path.home() / '.claude' / 'stats' / 'events.jsonl'
+
+# Events that put way content into context
+INJECTION_EVENTS = ('way_fired', 'way_redisclosed')
+
+# Trigger channels of the prompt scan (scan/mod.rs match_prompt). Nothing
+# logs the user turn itself; a firing on one of these is the trace it leaves.
+PROMPT_TRIGGERS = ('keyword', 'semantic:embedding', 'semantic:bm25')
+
+
+def is_turn(record):
+    """Did this firing come from a user prompt in the main agent?
+
+    Works for events.jsonl lines and metrics.jsonl lines alike. Subagent and
+    teammate injections reuse the prompt channels (inject-subagent.sh) and
+    are excluded by scope / agent_id. Several ways fired by one prompt share
+    a timestamp or epoch; callers collapse them into one turn.
+    """
+    trigger = record.get('trigger') or ''
+    if trigger not in PROMPT_TRIGGERS and not trigger.startswith('semantic'):
+        return False
+    if record.get('scope', 'agent') not in ('agent', ''):
+        return False
+    return record.get('agent_id', 'main') in ('main', '')
+
+
+def sessions_root():
+    """Per-user sessions root — must agree with hooks/ways/sessions-root.sh."""
+    xdg = os.environ.get('XDG_RUNTIME_DIR')
+    if xdg:
+        return Path(xdg) / 'claude-sessions'
+    return Path(f'/tmp/.claude-sessions-{os.getuid()}')
+
+
+_DAY_CACHE = {}
+
+
+def parse_ts(ts):
+    """'2026-02-05T19:00:34Z' → POSIX seconds (None if malformed).
+
+    Events are written with a fixed-width UTC format, so this slices the
+    string and caches the per-day offset instead of calling strptime —
+    timestamp parsing otherwise dominates a replay of a large log.
+    """
+    try:
+        day = _DAY_CACHE.get(ts[:10])
+        if day is None:
+            day = _DAY_CACHE[ts[:10]] = calendar.timegm(
+                (int(ts[0:4]), int(ts[5:7]), int(ts[8:10]), 0, 0, 0))
+        return day + int(ts[11:13]) * 3600 + int(ts[14:16]) * 60 + int(ts[17:19])
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_jsonl(path, contains=None):
+    """Yield decoded objects from a JSONL file, one line at a time.
+
+    `contains` is an optional tuple of substrings; lines with none of them
+    are skipped before JSON decoding, which is most of the cost on big logs.
+    Malformed lines are skipped — the log is written by several processes
+    and a torn line must not abort a replay.
+    """
+    decode = json.JSONDecoder().decode
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if contains and not any(c in line for c in contains):
+                continue
+            try:
+                obj = decode(line)
+            except ValueError:
+                continue
+            if isinstance(obj, dict):
+                yield obj
+
+
+def iter_events(path=STATS_FILE, events=None, archive=True):
+    """Yield event dicts, optionally only the named events.
+
+    With `archive`, months compacted into archive/ next to the log
+    (archive.py) are yielded first, so callers see one continuous log.
+    """
+    if archive:
+        from archive import partitions
+        for part in partitions(Path(path).parent / 'archive'):
+            yield from part.iter_events(events)
+    contains = tuple(f'"{e}"' for e in events) if events else None
+    for obj in iter_jsonl(path, contains):
+        if events and obj.get('event') not in events:
+            continue
+        yield obj
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Fit decay model parameters to observed convention adherence.
+
+Estimates alpha, beta, A_inject and k by maximum likelihood from labelled
+observations — was a way's convention followed at a given token distance
+from its last injection — overall, per way, per model, or per (way, model),
+with bootstrap confidence intervals.
+
+Usage:
+  fit.py observations.jsonl                    # one fit over everything
+  fit.py observations.jsonl --by way --bootstrap 500 -j 8
+  fit.py observations.jsonl --by way,model --json
+
+Observations, one JSON object per line:
+  followed    true/false (or 1/0): was the convention followed
+  distance    tokens since the way was last injected
+  turns       user turns so far in the context window (default 1)
+  since_turn  tokens since the last user turn (default: distance)
+  concurrent  other ways injected alongside it (default 0)
+  way, model  grouping keys for --by (default "")
+
+Likelihood: adherence from decay_model — n^-alpha·exp(-beta·t_turn) for
+the system prompt plus A_inject/(1 + k·concurrent)·exp(-beta·t_inject) for
+the way — is read as a rate, P(followed) = 1 - exp(-adherence), so it maps
+onto (0, 1) without clipping. Token distances become model units with
+--unit (default: a 200K window spans 30 units, as in scheduler.py).
+Parameters are fitted on a log scale (all positive) by Fisher scoring with
+the analytic gradient and expected information. alpha and k are held at
+their defaults when the data cannot identify them (every observation at
+turn 1, or none with concurrent injections).
+
+Bootstrap resamples run across a process pool, each task on its own
+SeedSequence child stream; intervals are percentiles of the refits.
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from events import iter_jsonl
+from replay import NOISE_FLOOR
+
+PARAMS = ('alpha', 'beta', 'a_inject', 'k')
+DEFAULTS = (0.38, 0.55, 0.65, 0.3)
+UNIT = 200000 / 30
+BOOT_CHUNK = 25
+P_MIN = 1e-12
+# Log-parameter bounds: keeps estimates finite when a term fits to nothing
+THETA_RANGE = (-12.0, 5.0)
+
+
+# --------------------------------------------------------------------------
+# Observations
+# --------------------------------------------------------------------------
+
+def _num(v, default):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def load_observations(path, by=(), unit=UNIT):
+    """{group key: dict of arrays} from an observations JSONL file."""
+    rows = {}
+    for ob in iter_jsonl(path):
+        followed = ob.get('followed')
+        distance = _num(ob.get('distance'), None)
+        if followed is None or distance is None or distance < 0:
+            continue
+        key = '/'.join(str(ob.get(b, '')) for b in by) if by else 'all'
+        rows.setdefault(key, []).append((
+            followed in (True, 1, '1', 'true'),
+            max(1.0, _num(ob.get('turns'), 1.0)),
+            _num(ob.get('since_turn'), distance) / unit,
+            distance / unit,
+            max(0.0, _num(ob.get('concurrent'), 0.0)),
+        ))
+    out = {}
+    for key, r in rows.items():
+        y, n, s, d, c = (np.array(col, dtype=float) for col in zip(*r))
+        out[key] = {'y': y, 'log_n': np.log(n), 's': s, 'd': d, 'c': c}
+    return out
+
+
+def identifiable(obs):
+    """Which parameters the data can pin down (see module docstring)."""
+    return np.array([obs['log_n'].any(), True, True, obs['c'].any()])
+
+
+def resample(obs, rng):
+    idx = rng.integers(0, len(obs['y']), len(obs['y']))
+    return {k: v[idx] for k, v in obs.items()}
+
+
+# --------------------------------------------------------------------------
+# Likelihood
+# --------------------------------------------------------------------------
+
+def log_likelihood(theta, obs):
+    """(log-likelihood, gradient, expected information) at log-parameters theta.
+
+    With adherence λ and p = 1 - e^-λ:
+        ℓ = Σ y log p - (1 - y) λ,      ∂ℓ/∂λ = (y - p) / p
+        I = Σ (1 - p)/p · (∂λ/∂θ)(∂λ/∂θ)ᵀ
+    and ∂λ/∂θ_j = φ_j ∂λ/∂φ_j for φ = exp(θ).
+    """
+    alpha, beta, a_inject, k = np.exp(theta)
+    y, log_n, s, d, c = obs['y'], obs['log_n'], obs['s'], obs['d'], obs['c']
+
+    base = np.exp(-alpha * log_n - beta * s)
+    amp = a_inject / (1 + k * c)
+    inject = amp * np.exp(-beta * d)
+    lam = base + inject
+    p = np.maximum(-np.expm1(-lam), P_MIN)
+
+    # Columns: φ ∂λ/∂φ for alpha, beta, A_inject, k
+    jac = np.column_stack([
+        -alpha * log_n * base,
+        -beta * (s * base + d * inject),
+        inject,
+        -k * c * inject / (1 + k * c),
+    ])
+    ll = float(np.sum(y * np.log(p) - (1 - y) * lam))
+    grad = jac.T @ ((y - p) / p)
+    info = (jac * ((1 - p) / p)[:, None]).T @ jac
+    return ll, grad, info
+
+
+def fit(obs, start=DEFAULTS, free=None, max_iter=200, tol=1e-9):
+    """Maximum-likelihood parameters by damped Fisher scoring.
+
+    Returns (params, log-likelihood, iterations, converged). Parameters not
+    in `free` stay at `start`.
+    """
+    free = identifiable(obs) if free is None else np.asarray(free)
+    theta = np.log(np.clip(np.asarray(start, dtype=float), *np.exp(THETA_RANGE)))
+    ll, grad, info = log_likelihood(theta, obs)
+    damping = 1e-3
+    for it in range(1, max_iter + 1):
+        g, h = grad[free], info[np.ix_(free, free)]
+        step = np.zeros_like(theta)
+        while True:
+            try:
+                step[free] = np.linalg.solve(h + damping * (np.diag(np.diag(h)) + 1e-12 * np.eye(len(g))), g)
+            except np.linalg.LinAlgError:
+                damping *= 10
+                continue
+            new = np.clip(theta + np.clip(step, -2.0, 2.0), *THETA_RANGE)
+            ll_new, grad_new, info_new = log_likelihood(new, obs)
+            if ll_new >= ll - 1e-12 or damping > 1e8:
+                break
+            damping *= 10
+        improvement = ll_new - ll
+        theta, ll, grad, info = new, ll_new, grad_new, info_new
+        damping = max(damping / 10, 1e-6)
+        if abs(improvement) < tol * (1 + abs(ll)) and np.abs(grad[free]).max() < 1e-6 * len(obs['y']):
+            return np.exp(theta), ll, it, True
+    return np.exp(theta), ll, max_iter, False
+
+
+def _fit_task(args):
+    key, obs, start = args
+    params, ll, iters, converged = fit(obs, start)
+    return key, params, ll, iters, converged
+
+
+def _boot_task(args):
+    """Refit `reps` bootstrap resamples, warm-started at the point estimate."""
+    obs, params, free, seed, reps = args
+    rng = np.random.default_rng(seed)
+    return np.array([fit(resample(obs, rng), params, free)[0] for _ in range(reps)])
+
+
+# --------------------------------------------------------------------------
+# Reporting
+# --------------------------------------------------------------------------
+
+def floor_gap(params, floor, unit, concurrent=0):
+    """Tokens after an injection until the way's own term falls to `floor`."""
+    _, beta, a_inject, k = params
+    amp = a_inject / (1 + k * concurrent)
+    return float(np.log(amp / floor) / beta * unit) if amp > floor else 0.0
+
+
+def fit_groups(groups, bootstrap=200, jobs=None, seed=0, start=DEFAULTS,
+               floor=NOISE_FLOOR, unit=UNIT):
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for key, params, ll, iters, converged in pool.map(
+                _fit_task, [(k, o, start) for k, o in groups.items()]):
+            obs = groups[key]
+            results[key] = {
+                'observations': int(len(obs['y'])),
+                'followed': round(float(obs['y'].mean()), 4),
+                'log_likelihood': round(ll, 4), 'iterations': iters, 'converged': converged,
+                'free': [p for p, f in zip(PARAMS, identifiable(obs)) if f],
+                'params': {p: round(float(v), 5) for p, v in zip(PARAMS, params)},
+                'half_life_tokens': round(float(np.log(2) / params[1] * unit)),
+                'floor_gap_tokens': round(floor_gap(params, floor, unit)),
+            }
+
+        if bootstrap:
+            tasks, owners = [], []
+            seeds = np.random.SeedSequence(seed)
+            for key, obs in groups.items():
+                params = [results[key]['params'][p] for p in PARAMS]
+                chunks = [min(BOOT_CHUNK, bootstrap - lo) for lo in range(0, bootstrap, BOOT_CHUNK)]
+                for child, reps in zip(seeds.spawn(len(chunks)), chunks):
+                    tasks.append((obs, params, identifiable(obs), child, reps))
+                    owners.append(key)
+            draws = {}
+            for key, part in zip(owners, pool.map(_boot_task, tasks)):
+                draws.setdefault(key, []).append(part)
+            for key, parts in draws.items():
+                boot = np.vstack(parts)
+                lo, hi = np.percentile(boot, [2.5, 97.5], axis=0)
+                gaps = [floor_gap(b, floor, unit) for b in boot]
+                results[key]['ci95'] = {p: [round(float(a), 5), round(float(b), 5)]
+                                        for p, a, b in zip(PARAMS, lo, hi)}
+                results[key]['floor_gap_tokens_ci95'] = [
+                    round(float(v)) for v in np.percentile(gaps, [2.5, 97.5])]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('observations', type=Path)
+    parser.add_argument('--by', default='',
+                        help='group by way, model or way,model (default: one fit)')
+    parser.add_argument('--unit', type=float, default=UNIT,
+                        help='tokens per model unit (default: %(default).0f)')
+    parser.add_argument('--bootstrap', type=int, default=200,
+                        help='bootstrap resamples per group (0 = none)')
+    parser.add_argument('--min-observations', type=int, default=50)
+    parser.add_argument('--floor', type=float, default=NOISE_FLOOR)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    by = tuple(b for b in args.by.split(',') if b)
+    if any(b not in ('way', 'model') for b in by):
+        parser.error('--by takes way, model or way,model')
+    if not args.observations.is_file():
+        print(f'error: {args.observations} not found', file=sys.stderr)
+        return 1
+    groups = {k: o for k, o in load_observations(args.observations, by, args.unit).items()
+              if len(o['y']) >= args.min_observations}
+    if not groups:
+        print(f'No group with at least {args.min_observations} observations.', file=sys.stderr)
+        return 1
+
+    results = fit_groups(groups, args.bootstrap, args.jobs, args.seed,
+                         floor=args.floor, unit=args.unit)
+    if args.json:
+        json.dump({'unit': args.unit, 'floor': args.floor, 'groups': results},
+                  sys.stdout, indent=2)
+        print()
+        return 0
+
+    for key in sorted(results):
+        r = results[key]
+        flag = '' if r['converged'] else '  (not converged)'
+        print(f"{key}: {r['observations']} observations, {r['followed']:.1%} followed{flag}")
+        for p in PARAMS:
+            ci = r.get('ci95', {}).get(p)
+            held = '' if p in r['free'] else '  (held: not identifiable)'
+            span = f'  [{ci[0]:.4g}, {ci[1]:.4g}]' if ci and not held else ''
+            print(f"  {p:<9} {r['params'][p]:<10.4g}{span}{held}")
+        gap_ci = r.get('floor_gap_tokens_ci95')
+        print(f"  half-life {r['half_life_tokens']:,} tokens; way term reaches floor"
+              f" after {r['floor_gap_tokens']:,} tokens"
+              + (f' [{gap_ci[0]:,}, {gap_ci[1]:,}]' if gap_ci else ''))
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
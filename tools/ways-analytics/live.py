@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""Live adherence estimates for running sessions.
+
+Tails every session under the sessions root and keeps the decay model's
+current value up to date event by event, instead of replaying the whole
+timeline. Every term of the model is an exponential in the same beta, so a
+session's state is a handful of numbers plus one entry per way it has
+fired — nothing grows with the length of the session:
+
+  system prompt   n (turn count) and the last turn's time:
+                  A0 · n^-alpha · exp(-beta (t - t_turn))
+  injections      K = max over injections of log A_e + beta·t_e, so the
+                  envelope is exp(K - beta·t) (decay_model's running max)
+  saturation      S decays with --tau and gains 1 per injection; ways fired
+                  in the same epoch get A_inject / (1 + k·n) as in the figures
+
+With no further events all terms decay together, so adherence A(now)
+crosses a threshold after ln(A(now) / threshold) / beta — the "until floor"
+column. A way's own term crosses it at t_w + ln(A_w / threshold) / beta.
+
+Usage:
+  live.py                      # refreshing table of live sessions
+  live.py --once               # one snapshot and exit
+  live.py --json               # one JSON object per session per refresh
+
+Input is the same epoch axis as `replay.py --axis epoch`:
+{sessions root}/{session}/metrics.jsonl (one line per way shown; a
+main-agent firing on a prompt-scan channel — keyword, semantic:* — marks a
+user turn, one per epoch, as events.is_turn) and the session's epoch
+counter for the clock.
+One asyncio task per session polls file sizes every --interval seconds and
+reads only appended bytes, so hundreds of sessions cost a few hundred
+stat() calls per interval.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+from events import is_turn, sessions_root
+from replay import NOISE_FLOOR
+
+
+class Model:
+    """Decay model parameters shared by every session."""
+
+    __slots__ = ('alpha', 'beta', 'a0', 'a_inject', 'k', 'tau', 'unit')
+
+    def __init__(self, alpha=0.38, beta=0.55, a0=1.0, a_inject=0.65, k=0.3,
+                 tau=10.0, unit=1.0):
+        self.alpha = alpha
+        self.beta = beta
+        self.a0 = a0
+        self.a_inject = a_inject
+        self.k = k
+        self.tau = tau
+        self.unit = unit
+
+
+class Estimator:
+    """Recursive adherence state for one session (model units).
+
+    Events must arrive in time order; each update is O(1).
+    """
+
+    __slots__ = ('model', 'now', 'turns', 'turn_t', 'key', 'pre_key', 'group_t',
+                 'group', 'sat', 'sat_t', 'ways', 'injections')
+
+    def __init__(self, model):
+        self.model = model
+        self.now = 0.0
+        self.turns = 0
+        self.turn_t = 0.0
+        self.key = -math.inf       # max log A_e + beta t_e over injections
+        self.pre_key = -math.inf   # the same, before the current epoch's batch
+        self.group_t = None
+        self.group = None          # [ways in the current batch], shared by its ways
+        self.sat = 0.0
+        self.sat_t = 0.0
+        self.ways = {}             # way → (t, batch)
+        self.injections = 0
+
+    def tick(self, t):
+        self.now = max(self.now, t)
+
+    def turn(self, t):
+        self.tick(t)
+        if self.turns and self.turn_t == t:
+            return
+        self.turns += 1
+        self.turn_t = t
+
+    def inject(self, way, t):
+        m = self.model
+        self.tick(t)
+        if t != self.group_t:
+            self.group_t, self.group, self.pre_key = t, [0], self.key
+        self.group[0] += 1
+        amp = m.a_inject / (1 + m.k * (self.group[0] - 1))
+        # The whole batch shares the smaller amplitude; the running max is
+        # rebuilt from the key before the batch so it stays exact
+        self.key = max(self.pre_key, math.log(amp) + m.beta * t)
+        self.sat = self.saturation(t) + 1.0
+        self.sat_t = t
+        self.ways[way] = (t, self.group)
+        self.injections += 1
+
+    # -- readings at self.now (or a given t) ------------------------------
+
+    def base(self, t=None):
+        m = self.model
+        t = self.now if t is None else t
+        return min(m.a0, m.a0 * math.exp(-(m.alpha * math.log1p(self.turns)
+                                           + m.beta * (t - self.turn_t))))
+
+    def envelope(self, t=None):
+        t = self.now if t is None else t
+        return math.exp(self.key - self.model.beta * t) if self.key > -math.inf else 0.0
+
+    def adherence(self, t=None):
+        return min(self.base(t) + self.envelope(t), 1.3)
+
+    def saturation(self, t=None):
+        """Injections in the last ~tau units, exponentially weighted."""
+        t = self.now if t is None else t
+        return self.sat * math.exp(-(t - self.sat_t) / self.model.tau)
+
+    def way_amplitude(self, way):
+        t, batch = self.ways[way]
+        return self.model.a_inject / (1 + self.model.k * (batch[0] - 1)), t
+
+    def until(self, level, threshold):
+        """Units until a level decaying from now drops below threshold."""
+        if level <= threshold:
+            return 0.0
+        return math.log(level / threshold) / self.model.beta
+
+    def way_until(self, way, threshold):
+        amp, t = self.way_amplitude(way)
+        return max(0.0, t + self.until(amp, threshold) - self.now) if amp > threshold else 0.0
+
+    def snapshot(self, threshold):
+        m = self.model
+        ways = {w: self.way_until(w, threshold) for w in self.ways}
+        weakest = min(ways, key=ways.get) if ways else None
+        sat = self.saturation()
+        return {
+            'now': self.now * m.unit, 'turns': self.turns, 'injections': self.injections,
+            'adherence': round(self.adherence(), 4), 'base': round(self.base(), 4),
+            'injected': round(self.envelope(), 4),
+            'until_floor': round(self.until(self.adherence(), threshold) * m.unit, 2),
+            'saturation': round(sat, 3),
+            'a_effective': round(m.a_inject / (1 + m.k * sat), 4),
+            'ways_above_floor': sum(1 for v in ways.values() if v > 0),
+            'weakest_way': weakest,
+            'weakest_until': round(ways[weakest] * m.unit, 2) if weakest else None,
+        }
+
+
+# --------------------------------------------------------------------------
+# Tailing
+# --------------------------------------------------------------------------
+
+class Follower:
+    """Incremental reader for one session directory."""
+
+    def __init__(self, path, model):
+        self.path = path
+        self.model = model
+        self.est = Estimator(model)
+        self.offset = 0
+        self.carry = b''
+        self.epoch_mtime = None
+        self.updated = 0.0
+
+    def reset(self):
+        self.est = Estimator(self.model)
+        self.offset = 0
+        self.carry = b''
+
+    def poll(self):
+        """Fold appended metrics and the current epoch. Returns False once gone."""
+        metrics = self.path / 'metrics.jsonl'
+        try:
+            size = metrics.stat().st_size
+        except FileNotFoundError:
+            return self.path.is_dir()
+        if size < self.offset:
+            self.reset()
+        if size > self.offset:
+            with open(metrics, 'rb') as f:
+                f.seek(self.offset)
+                data = self.carry + f.read(size - self.offset)
+            self.offset = size
+            cut = data.rfind(b'\n') + 1
+            self.carry = data[cut:]
+            for line in data[:cut].splitlines():
+                self.fold(line)
+            self.updated = time.time()
+        epoch = self.path / 'epoch'
+        try:
+            st = epoch.stat()
+            if st.st_mtime_ns != self.epoch_mtime:
+                self.epoch_mtime = st.st_mtime_ns
+                self.est.tick(int(epoch.read_text().strip() or 0) / self.model.unit)
+                self.updated = time.time()
+        except (OSError, ValueError):
+            pass
+        return True
+
+    def fold(self, line):
+        try:
+            m = json.loads(line)
+            t = int(m.get('epoch', 0)) / self.model.unit
+        except (ValueError, TypeError, AttributeError):
+            return
+        if t < self.est.now:
+            t = self.est.now
+        if is_turn(m):
+            self.est.turn(t)
+        if m.get('way'):
+            self.est.inject(m['way'], t)
+
+
+async def follow(follower, interval, live):
+    """Poll one session until its directory disappears."""
+    while follower.poll():
+        await asyncio.sleep(interval)
+    live.pop(follower.path.name, None)
+
+
+async def watch(root, model, interval, discover, on_refresh, refresh):
+    """Follow every session under root; call on_refresh(live) every `refresh` s."""
+    live = {}
+    last_scan = last_refresh = 0.0
+    while True:
+        now = time.monotonic()
+        if now - last_scan >= discover:
+            last_scan = now
+            try:
+                entries = list(os.scandir(root))
+            except FileNotFoundError:
+                entries = []
+            for entry in entries:
+                if entry.is_dir() and entry.name not in live:
+                    follower = Follower(Path(entry.path), model)
+                    live[entry.name] = follower
+                    asyncio.create_task(follow(follower, interval, live))
+        if now - last_refresh >= refresh:
+            last_refresh = now
+            on_refresh(live)
+        await asyncio.sleep(min(interval, refresh))
+
+
+def snapshots(live, threshold):
+    return {name: f.est.snapshot(threshold) for name, f in live.items() if f.est.injections}
+
+
+def print_table(snaps, threshold, clear):
+    if clear:
+        sys.stdout.write('\x1b[H\x1b[2J')
+    print(f'Live adherence — {len(snaps)} sessions, floor {threshold}')
+    print(f"{'session':<14} {'epoch':>6} {'turns':>5} {'adher':>6} {'until':>6}"
+          f" {'sat':>5} {'A_eff':>5}  weakest way")
+    for name, s in sorted(snaps.items(), key=lambda kv: kv[1]['until_floor']):
+        weak = f"{s['weakest_way']} ({s['weakest_until']:g})" if s['weakest_way'] else ''
+        print(f"{name[:14]:<14} {s['now']:>6g} {s['turns']:>5} {s['adherence']:6.3f}"
+              f" {s['until_floor']:6.1f} {s['saturation']:5.2f} {s['a_effective']:5.3f}  {weak}")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions-root', type=Path, default=None)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between polls of each session (default: 1)')
+    parser.add_argument('--refresh', type=float, default=2.0,
+                        help='seconds between reports (default: 2)')
+    parser.add_argument('--discover', type=float, default=5.0,
+                        help='seconds between scans for new sessions (default: 5)')
+    parser.add_argument('--once', action='store_true', help='print one snapshot and exit')
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--alpha', type=float, default=0.38)
+    parser.add_argument('--beta', type=float, default=0.55)
+    parser.add_argument('--a-inject', type=float, default=0.65)
+    parser.add_argument('--k', type=float, default=0.3)
+    parser.add_argument('--tau', type=float, default=10.0,
+                        help='saturation window in model units (default: 10)')
+    parser.add_argument('--unit', type=float, default=1.0,
+                        help='epochs per model unit (default: 1)')
+    parser.add_argument('--floor', type=float, default=NOISE_FLOOR)
+    args = parser.parse_args()
+
+    root = args.sessions_root or sessions_root()
+    model = Model(args.alpha, args.beta, 1.0, args.a_inject, args.k, args.tau, args.unit)
+
+    def report(live):
+        snaps = snapshots(live, args.floor)
+        if args.json:
+            for name, s in snaps.items():
+                print(json.dumps(dict(s, session=name)))
+            sys.stdout.flush()
+        else:
+            print_table(snaps, args.floor, clear=not args.once and sys.stdout.isatty())
+
+    if args.once:
+        live = {}
+        if root.is_dir():
+            for path in sorted(p for p in root.iterdir() if p.is_dir()):
+                live[path.name] = Follower(path, model)
+                live[path.name].poll()
+        report(live)
+        return 0
+
+    try:
+        asyncio.run(watch(root, model, args.interval, args.discover, report, args.refresh))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Replay recorded sessions through the context decay model.
+
+Rebuilds each session's user-turn and way-injection timeline from the event
+log (or live session state) and evaluates the adherence model per session.
+
+Usage:
+  replay.py                          # all sessions in ~/.claude/stats/events.jsonl
+  replay.py --days 7 --project ~/src/app
+  replay.py --axis epoch             # live sessions under the sessions root
+  replay.py --curves /tmp/curves     # also write <session>.npz per session
+  replay.py --json                   # machine-readable report
+  replay.py --events fixtures/events.jsonl   # sample log (make test-analytics)
+
+Timeline sources:
+  time   events.jsonl timestamps, in --unit seconds per model unit. A user
+         turn is a main-agent firing on a prompt-scan channel (keyword,
+         semantic:*), one per timestamp; a prompt that fired nothing leaves
+         no trace. A repeated session_start — compaction — starts a new
+         segment, reported as <session>#<n>.
+  epoch  {sessions root}/{session}/metrics.jsonl. Every hook scan bumps the
+         epoch, so the axis follows conversation progression, not wall time.
+         Turns as above, one per epoch. Session state has no project, so
+         --project only applies to the time axis.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from decay_model import damped_sawtooth, injected_adherence
+from events import (
+    INJECTION_EVENTS, STATS_FILE, is_turn, iter_events, iter_jsonl, parse_ts,
+    sessions_root,
+)
+
+NOISE_FLOOR = 0.15
+
+
+class Timeline:
+    """One context window: user turns and injections on the model axis."""
+
+    __slots__ = ('key', 'project', 'start', 'turns', 'injections', 'end')
+
+    def __init__(self, key, project='', start=None):
+        self.key = key
+        self.project = project
+        self.start = start
+        self.turns = []
+        self.injections = []
+        self.end = start
+
+    def add(self, t, prompt):
+        if self.start is None:
+            self.start = self.end = t
+        if prompt and (not self.turns or self.turns[-1] != t):
+            self.turns.append(t)
+        self.injections.append(t)
+        self.end = max(self.end, t)
+
+    def normalized(self, unit, tail):
+        """Shift to t=0 at session start, scale to model units, add a decay tail."""
+        start = self.start
+        turns = (np.asarray(self.turns) - start) / unit
+        injections = (np.asarray(self.injections) - start) / unit
+        duration = (self.end - start) / unit + tail
+        return self.key, self.project, turns, injections, duration
+
+
+# --------------------------------------------------------------------------
+# Timeline readers (streaming)
+# --------------------------------------------------------------------------
+
+def timelines_from_events(path, days=None, project=None):
+    """Group events.jsonl into per-segment timelines in one streaming pass."""
+    cutoff = time.time() - days * 86400 if days else None
+    live = {}      # session id → current Timeline
+    segments = {}  # session id → number of session_start seen
+    done = []
+
+    for ev in iter_events(path, events=('session_start',) + INJECTION_EVENTS):
+        ts = parse_ts(ev.get('ts'))
+        sid = ev.get('session', '')
+        if ts is None or not sid or sid == 'unknown':
+            continue
+        if cutoff and ts < cutoff:
+            continue
+        proj = ev.get('project', '')
+        if project and project not in proj:
+            continue
+
+        if ev['event'] == 'session_start':
+            n = segments.get(sid, 0)
+            segments[sid] = n + 1
+            if sid in live:
+                done.append(live.pop(sid))
+            live[sid] = Timeline(sid if n == 0 else f'{sid}#{n}', proj, ts)
+            continue
+
+        tl = live.get(sid)
+        if tl is None:
+            # Firings without a recorded session_start (log rotated, old data)
+            segments.setdefault(sid, 1)
+            tl = live[sid] = Timeline(sid, proj)
+        tl.add(ts, is_turn(ev))
+
+    done.extend(live.values())
+    return [tl for tl in done if tl.injections]
+
+
+def timelines_from_sessions(root=None):
+    """Build epoch-axis timelines from live session metrics."""
+    root = Path(root) if root else sessions_root()
+    timelines = []
+    for metrics in sorted(root.glob('*/metrics.jsonl')):
+        sid = metrics.parent.name
+        tl = Timeline(sid, start=0)
+        for m in iter_jsonl(metrics):
+            try:
+                epoch = int(m.get('epoch', 0))
+            except (TypeError, ValueError):
+                continue
+            tl.add(epoch, is_turn(m))
+        try:
+            tl.end = max(tl.end, int((metrics.parent / 'epoch').read_text().strip()))
+        except (OSError, ValueError):
+            pass
+        if tl.injections:
+            timelines.append(tl)
+    return timelines
+
+
+# --------------------------------------------------------------------------
+# Evaluation (runs in pool workers)
+# --------------------------------------------------------------------------
+
+def evaluate(item, alpha, beta, a_inject, floor, resolution, curves_dir):
+    """Evaluate one normalized timeline; returns a summary dict."""
+    key, project, turns, injections, duration = item
+    n = max(2, int(np.ceil(duration * resolution)) + 1)
+    t = np.linspace(0, duration, n)
+
+    base = damped_sawtooth(t, turns, alpha=alpha, beta=beta)
+    combined = injected_adherence(t, turns, injections, alpha=alpha, beta=beta,
+                                  A_inject=a_inject)
+
+    if curves_dir:
+        safe = key.replace('/', '_').replace('#', '.')
+        np.savez_compressed(Path(curves_dir) / f'{safe}.npz', t=t, base=base,
+                            adherence=combined, turns=turns,
+                            injections=injections)
+
+    return {
+        'session': key,
+        'project': project,
+        'duration': round(float(duration), 3),
+        'turns': int(len(turns)),
+        'injections': int(len(injections)),
+        'mean': round(float(combined.mean()), 4),
+        'p10': round(float(np.percentile(combined, 10)), 4),
+        'below_floor': round(float((combined < floor).mean()), 4),
+        'below_floor_base': round(float((base < floor).mean()), 4),
+    }
+
+
+def fleet_summary(results, floor):
+    """Duration-weighted fleet rollup of per-session summaries."""
+    if not results:
+        return {'sessions': 0}
+    dur = np.array([r['duration'] for r in results])
+    below = np.array([r['below_floor'] for r in results])
+    below_base = np.array([r['below_floor_base'] for r in results])
+    mean = np.array([r['mean'] for r in results])
+    weight = dur / dur.sum() if dur.sum() > 0 else np.full(len(dur), 1 / len(dur))
+    return {
+        'sessions': len(results),
+        'duration': round(float(dur.sum()), 3),
+        'turns': int(sum(r['turns'] for r in results)),
+        'injections': int(sum(r['injections'] for r in results)),
+        'noise_floor': floor,
+        'below_floor': round(float(weight @ below), 4),
+        'below_floor_base': round(float(weight @ below_base), 4),
+        'mean_adherence': round(float(weight @ mean), 4),
+        'session_below_floor_p50': round(float(np.percentile(below, 50)), 4),
+        'session_below_floor_p90': round(float(np.percentile(below, 90)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=Path, default=STATS_FILE,
+                        help='event log (default: %(default)s)')
+    parser.add_argument('--axis', choices=('time', 'epoch'), default='time')
+    parser.add_argument('--sessions-root', type=Path, default=None,
+                        help='sessions root for --axis epoch')
+    parser.add_argument('--days', type=int, default=None)
+    parser.add_argument('--project', default=None,
+                        help='only sessions whose project path contains this')
+    parser.add_argument('--unit', type=float, default=60.0,
+                        help='seconds per model unit for --axis time (default: 60)')
+    parser.add_argument('--tail', type=float, default=5.0,
+                        help='model units evaluated after the last event (default: 5)')
+    parser.add_argument('--resolution', type=float, default=20.0,
+                        help='samples per model unit (default: 20)')
+    parser.add_argument('--alpha', type=float, default=0.38)
+    parser.add_argument('--beta', type=float, default=0.55)
+    parser.add_argument('--a-inject', type=float, default=0.65)
+    parser.add_argument('--floor', type=float, default=NOISE_FLOOR)
+    parser.add_argument('--curves', type=Path, default=None,
+                        help='write per-session curves as <session>.npz here')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    if args.axis == 'time':
+        if not args.events.is_file():
+            print('No events recorded yet.')
+            return 0
+        timelines = timelines_from_events(args.events, args.days, args.project)
+        unit = args.unit
+    else:
+        if args.project:
+            parser.error('--project needs --axis time: session state does not record the project')
+        timelines = timelines_from_sessions(args.sessions_root)
+        unit = 1.0
+
+    if timelines and not any(tl.turns for tl in timelines):
+        print('warning: no main-agent prompt-channel firings; every session replays'
+              ' with zero user turns', file=sys.stderr)
+
+    if args.curves:
+        args.curves.mkdir(parents=True, exist_ok=True)
+
+    items = [tl.normalized(unit, args.tail) for tl in timelines]
+    work = partial(evaluate, alpha=args.alpha, beta=args.beta,
+                   a_inject=args.a_inject, floor=args.floor,
+                   resolution=args.resolution, curves_dir=args.curves)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(work, items, chunksize=32))
+
+    fleet = fleet_summary(results, args.floor)
+    if args.json:
+        json.dump({'fleet': fleet, 'sessions': results}, sys.stdout, indent=2)
+        print()
+        return 0
+
+    if not results:
+        print('No sessions with way firings.')
+        return 0
+    print('Adherence replay')
+    print('================')
+    print(f"Sessions: {fleet['sessions']}  |  Turns: {fleet['turns']}"
+          f"  |  Injections: {fleet['injections']}"
+          f"  |  Duration: {fleet['duration']:.0f} units")
+    print(f"Mean adherence:        {fleet['mean_adherence']:.3f}")
+    print(f"Below floor ({args.floor}):    {fleet['below_floor']:.1%} with ways,"
+          f" {fleet['below_floor_base']:.1%} system prompt alone")
+    print(f"Per-session below floor: p50 {fleet['session_below_floor_p50']:.1%},"
+          f" p90 {fleet['session_below_floor_p90']:.1%}")
+    print()
+    print('Most time below floor:')
+    for r in sorted(results, key=lambda r: -r['below_floor'])[:10]:
+        print(f"  {r['session'][:36]:<36} {r['below_floor']:6.1%}"
+              f"  {r['injections']:4d} inj  {r['duration']:7.1f} units")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
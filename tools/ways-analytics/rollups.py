@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Incremental rollups over the ways event log.
+
+Keeps a checkpoint (byte offset into events.jsonl plus aggregated counts) so
+each query only decodes the lines appended since the last one. Queries are
+answered from the rollups, whose size follows the number of distinct
+(day, project, event, way, scope, trigger) cells — not the log length.
+
+Usage:
+  rollups.py                           # update, then print usage stats
+  rollups.py --days 7 --project ~/src/app
+  rollups.py --json                    # same shape as `ways stats --json`
+  rollups.py --rebuild -j 8            # re-read the whole log in parallel
+
+The checkpoint lives in ${XDG_CACHE_HOME:-~/.cache}/claude-ways/stats-rollup.json.
+A log that shrank, or whose first bytes changed (rotated, compacted by
+archive.py), is rebuilt from scratch, archived months included. --days
+works on whole UTC days.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from archive import partitions
+from events import STATS_FILE
+
+STATE_FILE = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') \
+    / 'claude-ways' / 'stats-rollup.json'
+STATE_VERSION = 1
+CHUNK = 4 << 20
+HEAD_BYTES = 4096
+# Below this the pool start-up costs more than the split saves
+PARALLEL_MIN_BYTES = 64 << 20
+
+SEP = '\x1f'
+# Cell value: [count, distance sum, anchored count]
+# distance is `distance` for check_fired and `token_distance` for way_redisclosed
+
+
+def _float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def fold_line(cells, line, decode=json.JSONDecoder().decode):
+    """Add one raw log line to `cells`; malformed lines are ignored."""
+    try:
+        ev = decode(line)
+    except ValueError:
+        return
+    if isinstance(ev, dict):
+        fold_event(cells, ev)
+
+
+def fold_event(cells, ev):
+    event = str(ev.get('event', ''))
+    name = ev.get('check') if event == 'check_fired' else ev.get('way')
+    key = SEP.join((
+        str(ev.get('ts', ''))[:10], str(ev.get('project', '')), event,
+        str(name or ''), str(ev.get('scope') or 'unknown'), str(ev.get('trigger', '')),
+    ))
+    cell = cells.get(key)
+    if cell is None:
+        cell = cells[key] = [0, 0.0, 0]
+    cell[0] += 1
+    if event == 'check_fired':
+        cell[1] += _float(ev.get('distance'))
+        cell[2] += ev.get('anchored') in ('true', True)
+    elif event == 'way_redisclosed':
+        cell[1] += _float(ev.get('token_distance'))
+
+
+def merge(into, cells):
+    for key, (n, dist, anchored) in cells.items():
+        cell = into.get(key)
+        if cell is None:
+            into[key] = [n, dist, anchored]
+        else:
+            cell[0] += n
+            cell[1] += dist
+            cell[2] += anchored
+    return into
+
+
+def fold_range(path, start, end, chunk=CHUNK):
+    """Fold complete lines in [start, end) reading `chunk` bytes at a time.
+
+    Returns (cells, offset just past the last complete line). A trailing
+    partial line — a writer mid-append — is left for the next update.
+    """
+    cells = {}
+    pos = start
+    carry = b''
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while pos < end:
+            block = f.read(min(chunk, end - pos))
+            if not block:
+                break
+            pos += len(block)
+            data = carry + block
+            cut = data.rfind(b'\n')
+            if cut < 0:
+                carry = data
+                continue
+            carry = data[cut + 1:]
+            for line in data[:cut].decode('utf-8', errors='replace').split('\n'):
+                if line:
+                    fold_line(cells, line)
+    return cells, pos - len(carry)
+
+
+def _fold_task(args):
+    return fold_range(*args)
+
+
+def split_ranges(path, size, parts):
+    """Byte ranges of `path` cut at line boundaries."""
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(size * i // parts)
+            f.readline()
+            b = min(f.tell(), size)
+            if b > bounds[-1]:
+                bounds.append(b)
+    bounds.append(size)
+    return [(path, a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _head_hash(path, length):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+
+class Rollups:
+    """Checkpointed rollups for one log file."""
+
+    def __init__(self, log=STATS_FILE, state=STATE_FILE):
+        self.log = Path(log)
+        self.state = Path(state)
+        self.offset = 0
+        self.head = None
+        self.cells = {}
+        self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.state.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get('version') != STATE_VERSION or data.get('log') != str(self.log):
+            return
+        self.offset = data.get('offset', 0)
+        self.head = data.get('head')
+        self.cells = data.get('cells', {})
+
+    def save(self):
+        self.state.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state.with_name(f'{self.state.name}.{os.getpid()}')
+        tmp.write_text(json.dumps({
+            'version': STATE_VERSION, 'log': str(self.log), 'offset': self.offset,
+            'head': self.head, 'cells': self.cells,
+        }, separators=(',', ':')))
+        os.replace(tmp, self.state)
+
+    def rebuild(self, jobs=None):
+        size = self.log.stat().st_size
+        if jobs == 1 or size < PARALLEL_MIN_BYTES:
+            self.cells, self.offset = fold_range(self.log, 0, size)
+        else:
+            ranges = split_ranges(self.log, size, jobs or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                parts = list(pool.map(_fold_task, ranges))
+            self.cells = {}
+            for cells, _ in parts:
+                merge(self.cells, cells)
+            # Only the last range can end in a partial line
+            self.offset = parts[-1][1] if parts else 0
+        # Compacted months no longer appear in the log
+        for part in partitions(self.log.parent / 'archive'):
+            for ev in part.iter_events():
+                fold_event(self.cells, ev)
+        self.head = _head_hash(self.log, self.offset)
+        self.save()
+        return self
+
+    def update(self, jobs=None):
+        """Fold lines appended since the checkpoint. Returns bytes read."""
+        if not self.log.is_file():
+            return 0
+        size = self.log.stat().st_size
+        if (self.head is None or size < self.offset
+                or _head_hash(self.log, self.offset) != self.head):
+            self.rebuild(jobs)
+            return self.offset
+        if size == self.offset:
+            return 0
+        before = self.offset
+        cells, self.offset = fold_range(self.log, self.offset, size)
+        merge(self.cells, cells)
+        if before < HEAD_BYTES:
+            self.head = _head_hash(self.log, self.offset)
+        self.save()
+        return self.offset - before
+
+    def query(self, days=None, project=None):
+        """Aggregate the cells matching a day window and project substring."""
+        cutoff = (time.strftime('%Y-%m-%d', time.gmtime(time.time() - days * 86400))
+                  if days else None)
+        totals = {'total_events': 0, 'sessions': 0, 'way_fires': 0, 'check_fires': 0,
+                  'check_anchored': 0, 'redisclosures': 0}
+        by = {k: {} for k in ('by_way', 'by_trigger', 'by_scope', 'by_check',
+                              'by_project', 'by_day')}
+        sessions_by_project = {}
+        check_dist = redisclose_dist = 0.0
+        first = last = None
+
+        for key, (n, dist, anchored) in self.cells.items():
+            day, proj, event, name, scope, trigger = key.split(SEP)
+            if cutoff and day < cutoff:
+                continue
+            if project and project not in proj:
+                continue
+            totals['total_events'] += n
+            first = day if first is None or day < first else first
+            last = day if last is None or day > last else last
+            if event == 'session_start':
+                totals['sessions'] += n
+                sessions_by_project[proj] = sessions_by_project.get(proj, 0) + n
+            elif event == 'way_fired':
+                totals['way_fires'] += n
+                for table, k in (('by_way', name), ('by_trigger', trigger),
+                                 ('by_scope', scope), ('by_project', proj),
+                                 ('by_day', day)):
+                    by[table][k] = by[table].get(k, 0) + n
+            elif event == 'check_fired':
+                totals['check_fires'] += n
+                totals['check_anchored'] += anchored
+                by['by_check'][name] = by['by_check'].get(name, 0) + n
+                check_dist += dist
+            elif event == 'way_redisclosed':
+                totals['redisclosures'] += n
+                redisclose_dist += dist
+
+        out = dict(totals, **by)
+        out['check_avg_distance'] = check_dist / totals['check_fires'] if totals['check_fires'] else 0.0
+        out['redisclose_avg_token_distance'] = (
+            redisclose_dist / totals['redisclosures'] if totals['redisclosures'] else 0.0)
+        out['sessions_by_project'] = sessions_by_project
+        out['period'] = [first, last]
+        return out
+
+
+def _top(counts, n=None):
+    return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+def print_human(q, days, project):
+    print('\nWays of Working — Usage Stats\n')
+    first, last = q['period']
+    if days:
+        print(f'  Period:  last {days} days')
+    elif first != last:
+        print(f'  Period:  {first} → {last}')
+    else:
+        print(f'  Date:    {first or "?"}')
+    if project:
+        print(f'  Project: {project}')
+    print()
+    print(f"  Sessions: {q['sessions']}  |  Way fires: {q['way_fires']}"
+          f"  |  Re-disclosures: {q['redisclosures']}")
+    print()
+    top = _top(q['by_way'], 10)
+    if top:
+        print('Top ways:')
+        peak = top[0][1]
+        for way, n in top:
+            print(f"  {way:<30} {n:>3}  {'█' * max(1, n * 20 // peak)}")
+        print()
+    for title, table in (('By scope:', 'by_scope'), ('By trigger:', 'by_trigger')):
+        if q[table]:
+            print(title)
+            for k, n in _top(q[table]):
+                print(f"  {k:<10} {n:>4} ({n * 100 // max(1, q['way_fires'])}%)")
+            print()
+    if q['by_project']:
+        print('By project:')
+        for proj, n in _top(q['by_project'], 10):
+            print(f"  {proj:<32} {n:>4} fires ({q['sessions_by_project'].get(proj, 0)} sessions)")
+        print()
+    if q['check_fires']:
+        print(f"Check fires: {q['check_fires']}")
+        for check, n in _top(q['by_check'], 10):
+            print(f'  {check:<30} {n:>3}')
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=Path, default=STATS_FILE)
+    parser.add_argument('--state', type=Path, default=STATE_FILE)
+    parser.add_argument('--days', type=int, default=None)
+    parser.add_argument('--project', default=None,
+                        help='only events whose project path contains this')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='discard the checkpoint and re-read the whole log')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    if not args.events.is_file():
+        if not args.json:
+            print('No events recorded yet. Stats will appear after ways start firing.')
+        return 0
+    roll = Rollups(args.events, args.state)
+    if args.rebuild:
+        roll.rebuild(args.jobs)
+    else:
+        roll.update(args.jobs)
+
+    q = roll.query(args.days, args.project)
+    if args.json:
+        json.dump(q, sys.stdout, indent=2)
+        print()
+    else:
+        print_human(q, args.days, args.project)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Optimal re-disclosure schedules under a token budget (ADR-104).
+
+Token-gated re-disclosure re-injects a way once the context has grown a
+fixed share of the window since it was last shown (`redisclose:` in the
+frontmatter, 25% by default). This computes where re-disclosures *should*
+land to keep adherence up, and compares that against the current gating.
+
+Usage:
+  scheduler.py --way softwaredev/delivery/commits --budget 4000
+  scheduler.py --budget 20000 --window 1000000      # every way, 1M context
+  scheduler.py --session <id>                       # ways fired in a live session
+  scheduler.py --objective min --json
+
+Model: the context window is split into --slots equal token slots mapped
+onto --units model units; user turns arrive every --turn-gap units and the
+system prompt decays as in decay_model.damped_sawtooth. A way disclosed at
+t_s contributes A_inject·exp(-beta (t - t_s)) until its next disclosure.
+The objective is each way's mean (or minimum) adherence from its first
+disclosure to the end of the window.
+
+Method: with one decay rate the latest disclosure dominates, so a
+schedule's value splits into independent segments [s, e) between
+consecutive disclosures. A DP over (disclosures used, last slot) is then
+exact on the grid in O(K·slots²) per way. The shared budget is split
+across ways by an exact group-knapsack DP over those per-way value curves
+(budget quantized to --quantum tokens). Re-disclosures still need a
+matching trigger at run time, so schedules are targets, not guarantees.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from decay_model import damped_sawtooth
+from events import sessions_root
+
+WAYS_DIR = Path(__file__).resolve().parents[2] / 'hooks' / 'ways'
+# Must match REDISCLOSE_PCT in tools/ways-cli/src/session.rs
+REDISCLOSE_PCT = 25
+CLIP = 1.3
+
+
+# --------------------------------------------------------------------------
+# Ways
+# --------------------------------------------------------------------------
+
+def read_way(path):
+    """(redisclose pct or None, body token estimate) for one way file."""
+    text = path.read_text(encoding='utf-8')
+    pct, body = None, text
+    if text.startswith('---\n'):
+        head, sep, rest = text[4:].partition('\n---')
+        if sep:
+            body = rest.split('\n', 1)[1] if '\n' in rest else ''
+            for line in head.splitlines():
+                key, _, value = line.partition(':')
+                if key.strip() == 'redisclose':
+                    try:
+                        pct = int(value.strip())
+                    except ValueError:
+                        pass
+    # Same estimate as `ways tree`: body bytes / 4
+    return pct, max(1, len(body.encode('utf-8')) // 4)
+
+
+def way_files(root=WAYS_DIR):
+    """{way id: path} for every primary way file ({dir}/{dir}.md)."""
+    return {
+        str(p.parent.relative_to(root)): p
+        for p in sorted(root.rglob('*.md')) if p.stem == p.parent.name
+    }
+
+
+def session_ways(session):
+    """{way id: token position of its last disclosure} from live session state."""
+    root = sessions_root() / session / 'way-tokens'
+    out = {}
+    for value in root.rglob('.value'):
+        try:
+            out[str(value.parent.relative_to(root))] = int(value.read_text().strip() or 0)
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+# --------------------------------------------------------------------------
+# Per-way DP
+# --------------------------------------------------------------------------
+
+class Timeline:
+    """The discretized window: slot times (model units) and base adherence."""
+
+    def __init__(self, window, slots=200, units=30.0, turn_gap=5.0,
+                 alpha=0.38, beta=0.55, a_inject=0.65):
+        self.window = window
+        self.slots = slots
+        self.t = np.arange(slots) * (units / slots)
+        self.tokens_per_slot = window / slots
+        self.beta = beta
+        self.a_inject = a_inject
+        self.base = damped_sawtooth(self.t, np.arange(0.0, units, turn_gap),
+                                    alpha=alpha, beta=beta)
+        self._segments = {}
+
+    def slot(self, tokens):
+        return int(min(self.slots - 1, max(0, tokens // self.tokens_per_slot)))
+
+    def segments(self, objective):
+        """C[s, e]: value of slots [s, e) with the last disclosure at s.
+
+        Sums for 'mean', minima for 'min'; e runs to `slots` (end of
+        window), entries with e <= s are unused.
+        """
+        if objective not in self._segments:
+            t = self.t
+            since = t[None, :] - t[:, None]
+            upper = since >= 0
+            vals = np.clip(self.base[None, :]
+                           + self.a_inject * np.exp(-self.beta * np.where(upper, since, 0.0)),
+                           0, CLIP)
+            if objective == 'mean':
+                acc = np.cumsum(np.where(upper, vals, 0.0), axis=1)
+            else:
+                acc = np.minimum.accumulate(np.where(upper, vals, np.inf), axis=1)
+            c = np.full((self.slots, self.slots + 1), np.nan)
+            c[:, 1:] = acc
+            self._segments[objective] = c
+        return self._segments[objective]
+
+
+def _combine(objective):
+    return np.add if objective == 'mean' else np.minimum
+
+
+def schedule_value(timeline, slots, objective):
+    """Value of a given disclosure schedule (first disclosure first)."""
+    c = timeline.segments(objective)
+    ends = list(slots[1:]) + [timeline.slots]
+    vals = [c[s, e] for s, e in zip(slots, ends)]
+    if objective == 'mean':
+        return float(sum(vals) / (timeline.slots - slots[0]))
+    return float(min(vals))
+
+
+def optimal_schedules(timeline, first, max_k, objective='mean'):
+    """Best schedule using at most k re-disclosures, for k = 0..max_k.
+
+    Returns [(value, [slots])]; value is non-decreasing in k. Exact on the
+    grid: V_k[e] = best_s combine(V_{k-1}[s], C[s, e]).
+    """
+    n = timeline.slots
+    c = timeline.segments(objective)
+    combine = _combine(objective)
+    identity = 0.0 if objective == 'mean' else np.inf
+    span = n - first
+
+    v = np.full(n, -np.inf)
+    v[first] = identity
+    parents = []
+    s_idx, e_idx = np.arange(n)[:, None], np.arange(n)[None, :]
+    forward = (s_idx >= first) & (e_idx > s_idx)
+    inner = np.where(forward, c[:, :n], 0.0)
+    out, best = [], None
+    for k in range(max_k + 1):
+        finish = np.where(v > -np.inf, combine(v, c[:, n]), -np.inf)
+        s = int(np.argmax(finish))
+        value = finish[s] / span if objective == 'mean' else finish[s]
+        if best is None or value > best[0] + 1e-12:
+            best = (float(value), _trace(parents, s))
+        out.append(best)
+        if k == max_k:
+            break
+        m = np.where(forward & (v > -np.inf)[:, None], combine(v[:, None], inner), -np.inf)
+        parents.append(np.argmax(m, axis=0))
+        v = m.max(axis=0)
+    return out
+
+
+def _trace(parents, last):
+    """Disclosure slots ending at `last`, walking back through the DP."""
+    slots = [last]
+    for parent in reversed(parents):
+        slots.append(int(parent[slots[-1]]))
+    return slots[::-1]
+
+
+def gated_schedule(timeline, first, pct):
+    """Disclosures under the current gating, assuming a trigger is always there."""
+    gap = max(1, int(round(timeline.slots * pct / 100)))
+    return list(range(first, timeline.slots, gap))
+
+
+# --------------------------------------------------------------------------
+# Budget allocation
+# --------------------------------------------------------------------------
+
+def allocate(curves, costs, budget, quantum):
+    """Exact group knapsack: re-disclosures per way maximizing the summed value.
+
+    curves[w][k] is way w's best value with k re-disclosures, each costing
+    costs[w] tokens. Returns the chosen k per way.
+    """
+    cap = int(budget // quantum)
+    units = [max(1, int(np.ceil(c / quantum))) for c in costs]
+    best = np.zeros(cap + 1)
+    choice = []
+    for curve, u in zip(curves, units):
+        new = np.full(cap + 1, -np.inf)
+        pick = np.zeros(cap + 1, dtype=np.int64)
+        for k, value in enumerate(curve):
+            if k * u > cap:
+                break
+            cand = np.full(cap + 1, -np.inf)
+            cand[k * u:] = best[:cap + 1 - k * u] + value
+            better = cand > new
+            new[better] = cand[better]
+            pick[better] = k
+        best = new
+        choice.append(pick)
+    ks, c = [], int(np.argmax(best))
+    for pick, u in zip(reversed(choice), reversed(units)):
+        k = int(pick[c])
+        ks.append(k)
+        c -= k * u
+    return ks[::-1]
+
+
+def plan(timeline, ways, budget, objective='mean', max_k=12, quantum=50):
+    """Schedule every way in `ways` = {id: (first tokens, pct, cost)}."""
+    curves, costs, firsts = [], [], []
+    for way, (first_tokens, _, cost) in ways.items():
+        first = timeline.slot(first_tokens)
+        k = min(max_k, timeline.slots - first - 1, int(budget // cost))
+        curves.append(optimal_schedules(timeline, first, max(k, 0), objective))
+        costs.append(cost)
+        firsts.append(first)
+    ks = allocate([[v for v, _ in c] for c in curves], costs, budget, quantum)
+
+    tps = timeline.tokens_per_slot
+    rows = []
+    for (way, (first_tokens, pct, cost)), curve, first, k in zip(ways.items(), curves, firsts, ks):
+        value, slots = curve[k]
+        gated = gated_schedule(timeline, first, pct)
+        positions = [int(s * tps) for s in slots]
+        gaps = np.diff(positions)
+        rows.append({
+            'way': way, 'tokens': cost, 'first': int(first_tokens),
+            'current': {
+                'redisclose_pct': pct, 'redisclosures': len(gated) - 1,
+                'token_cost': (len(gated) - 1) * cost,
+                'value': round(schedule_value(timeline, gated, objective), 4),
+            },
+            'optimal': {
+                'redisclosures': len(slots) - 1, 'token_cost': (len(slots) - 1) * cost,
+                'value': round(value, 4), 'positions': positions,
+                'gaps': [int(g) for g in gaps],
+                'recommended_pct': round(float(np.median(gaps)) * 100 / timeline.window, 1)
+                if len(gaps) else None,
+            },
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--way', action='append', help='way id (repeatable; default: all ways)')
+    parser.add_argument('--session', help='schedule the ways fired in this session')
+    parser.add_argument('--budget', type=float, default=20000,
+                        help='tokens available for re-disclosed content (default: 20000)')
+    parser.add_argument('--window', type=int, default=200000, help='context window in tokens')
+    parser.add_argument('--objective', choices=('mean', 'min'), default='mean')
+    parser.add_argument('--slots', type=int, default=200)
+    parser.add_argument('--units', type=float, default=30.0,
+                        help='model units spanned by the window (default: 30)')
+    parser.add_argument('--turn-gap', type=float, default=5.0,
+                        help='model units between user turns (default: 5)')
+    parser.add_argument('--max-k', type=int, default=12,
+                        help='most re-disclosures per way (default: 12)')
+    parser.add_argument('--quantum', type=int, default=50, help='budget granularity in tokens')
+    parser.add_argument('--alpha', type=float, default=0.38)
+    parser.add_argument('--beta', type=float, default=0.55)
+    parser.add_argument('--a-inject', type=float, default=0.65)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    files = way_files()
+    if args.session:
+        firsts = session_ways(args.session)
+        if not firsts:
+            print(f'No disclosed ways recorded for session {args.session}.', file=sys.stderr)
+            return 1
+    else:
+        firsts = {w: 0 for w in (args.way or files)}
+    ways = {}
+    for way, first in sorted(firsts.items()):
+        if way not in files:
+            print(f'warning: unknown way {way}', file=sys.stderr)
+            continue
+        pct, cost = read_way(files[way])
+        ways[way] = (first, pct or REDISCLOSE_PCT, cost)
+    if not ways:
+        return 1
+
+    timeline = Timeline(args.window, args.slots, args.units, args.turn_gap,
+                        args.alpha, args.beta, args.a_inject)
+    rows = plan(timeline, ways, args.budget, args.objective, args.max_k, args.quantum)
+
+    if args.json:
+        json.dump({'window': args.window, 'budget': args.budget, 'objective': args.objective,
+                   'ways': rows}, sys.stdout, indent=2)
+        print()
+        return 0
+
+    spent = sum(r['optimal']['token_cost'] for r in rows)
+    current = sum(r['current']['token_cost'] for r in rows)
+    print(f'Re-disclosure schedule ({args.objective} adherence, {args.window:,}-token window)')
+    print(f'Budget {args.budget:,.0f} tokens: optimal uses {spent:,},'
+          f' current gating would use {current:,}')
+    print()
+    print(f"{'way':<38} {'tok':>5} {'cur %':>5} {'n':>3} {'value':>6}"
+          f"   {'n':>3} {'value':>6} {'rec %':>6}")
+    for r in rows:
+        cur, opt = r['current'], r['optimal']
+        rec = f"{opt['recommended_pct']:.1f}" if opt['recommended_pct'] is not None else '-'
+        print(f"{r['way']:<38} {r['tokens']:>5} {cur['redisclose_pct']:>5} "
+              f"{cur['redisclosures']:>3} {cur['value']:6.3f}   {opt['redisclosures']:>3} "
+              f"{opt['value']:6.3f} {rec:>6}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
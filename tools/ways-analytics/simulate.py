@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""Monte Carlo sessions through the context decay model.
+
+Samples many synthetic sessions — random turn counts and spacing, random
+way firings, random numbers of ways injected together — and evaluates the
+adherence model on all of them, reporting how adherence is distributed
+rather than the single hand-picked schedule of each figure.
+
+Usage:
+  simulate.py                          # 10^5 sessions, default distributions
+  simulate.py -n 1000000 -j 8
+  simulate.py --fit                    # distributions fitted to events.jsonl
+  simulate.py --fit --events fixtures/events.jsonl   # sample log (make test-analytics)
+  simulate.py --k 0.6 --json
+
+Session model (model units, as in replay.py):
+  turns         1 + Poisson(--turns - 1) user turns per session, or resampled
+                from the log with --fit
+  gaps          exponential, mean --gap, between turns; the session ends one
+                gap after its last turn
+  prompt fires  Poisson(--fires) ways injected together at each turn; each
+                gets A_inject / (1 + k·n), n being the other ways in the batch
+  tool fires    Poisson process at --tool-rate per unit between turns, one
+                way at a time (n = 0)
+
+Sessions are evaluated in vectorized batches spread over a process pool.
+Every batch draws from its own SeedSequence child stream, so results depend
+on --seed and -n only, not on -j. Sensitivities are central differences
+(±10%) over the same sampled sessions for every parameter set.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from events import STATS_FILE
+from replay import NOISE_FLOOR, timelines_from_events
+
+BATCH = 1000
+MAX_TURNS = 400
+QUANTILES = (5, 25, 50, 75, 95)
+SENSITIVITY = ('alpha', 'beta', 'k')
+STEP = 0.10
+
+
+# --------------------------------------------------------------------------
+# Session distributions
+# --------------------------------------------------------------------------
+
+class SessionModel:
+    """Distributions sessions are drawn from.
+
+    turns and fires are either a mean (Poisson) or an array of observed
+    values to resample from.
+    """
+
+    def __init__(self, turns=20.0, gap=1.0, fires=1.5, tool_rate=0.3):
+        self.turns = turns
+        self.gap = gap
+        self.fires = fires
+        self.tool_rate = tool_rate
+
+    def describe(self):
+        def dist(v):
+            if np.ndim(v):
+                return {'empirical': int(len(v)), 'mean': round(float(np.mean(v)), 3)}
+            return {'poisson': float(v)}
+        return {'turns': dist(self.turns), 'gap': self.gap,
+                'fires': dist(self.fires), 'tool_rate': self.tool_rate}
+
+    def _draw(self, rng, spec, size, offset=0):
+        if np.ndim(spec):
+            return rng.choice(np.asarray(spec), size)
+        return offset + rng.poisson(max(spec - offset, 0.0), size)
+
+    def sample(self, rng, size):
+        """A batch of sessions as padded per-row arrays.
+
+        Returns (turns, events, others, end): turn times (B, M) and event
+        times (B, E) sorted per row and +inf padded, the concurrent-way
+        count n per event (-1 = padding), and each session's end.
+        """
+        n_turns = np.clip(self._draw(rng, self.turns, size, offset=1), 1, MAX_TURNS)
+        m = int(n_turns.max())
+        live = np.arange(m)[None, :] < n_turns[:, None]
+
+        gaps = rng.exponential(self.gap, (size, m))
+        gaps[~live] = 0.0
+        ends = np.cumsum(gaps, axis=1)
+        turns = np.where(live, ends - gaps, np.inf)
+        end = ends[:, -1]
+
+        # Prompt firings land on the turn, all at once
+        fires = np.where(live, self._draw(rng, self.fires, (size, m)), 0)
+        prompt_n = np.where(fires > 0, fires - 1, -1)
+
+        # Tool firings: uniform within each gap, one at a time
+        tools = rng.poisson(self.tool_rate * gaps)
+        total = int(tools.sum())
+        per_row = tools.sum(axis=1)
+        width = int(per_row.max()) if total else 0
+        tool_t = np.full((size, width), np.inf)
+        if total:
+            flat = tools.ravel()
+            t0 = np.repeat(turns.ravel(), flat)
+            t = t0 + rng.random(total) * np.repeat(gaps.ravel(), flat)
+            row = np.repeat(np.arange(size), per_row)
+            col = np.arange(total) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+            tool_t[row, col] = t
+
+        times = np.hstack([np.where(fires > 0, turns, np.inf), tool_t])
+        others = np.hstack([prompt_n, np.where(np.isfinite(tool_t), 0, -1)])
+        order = np.argsort(times, axis=1, kind='stable')
+        return (turns, np.take_along_axis(times, order, axis=1),
+                np.take_along_axis(others, order, axis=1), end)
+
+
+def fit_model(path, unit=60.0, days=None, project=None):
+    """SessionModel from recorded sessions (see replay.py for the timeline)."""
+    turn_counts, gaps, fires = [], [], []
+    tool_events = duration = 0.0
+    for tl in timelines_from_events(path, days, project):
+        _, _, turns, injections, span = tl.normalized(unit, 0.0)
+        if not len(turns):
+            continue
+        turn_counts.append(len(turns))
+        gaps.extend(np.diff(turns))
+        at_turn = np.isin(injections, turns)
+        fires.extend(np.unique(injections[at_turn], return_counts=True)[1])
+        tool_events += int((~at_turn).sum())
+        duration += span
+    if not turn_counts:
+        return None
+    gap = float(np.mean(gaps)) if gaps else 1.0
+    return SessionModel(
+        turns=np.array(turn_counts), gap=gap or 1.0, fires=np.array(fires),
+        tool_rate=tool_events / duration if duration else 0.0)
+
+
+# --------------------------------------------------------------------------
+# Batched evaluation (runs in pool workers)
+# --------------------------------------------------------------------------
+
+def row_counts(rows, t, span):
+    """Entries <= each t, per row of a sorted +inf-padded (B, M) array.
+
+    Each row is shifted into its own [b·span, (b+1)·span) window so a single
+    searchsorted over the flattened array answers every row at once.
+    """
+    b, m = rows.shape
+    if not m:
+        return np.zeros((b, len(t)), dtype=np.int64)
+    base = np.arange(b)[:, None] * span
+    flat = (np.where(np.isfinite(rows), rows, span - 1.0) + base).ravel()
+    hits = np.searchsorted(flat, (t[None, :] + base).ravel(), side='right')
+    return hits.reshape(b, len(t)) - np.arange(b)[:, None] * m
+
+
+def evaluate_batch(sessions, t, params, floor):
+    """Adherence for a batch of sessions under each parameter set.
+
+    Same curves as decay_model.damped_sawtooth + injection_envelope, with
+    every session in the batch evaluated together. Returns per-session
+    (mean adherence, fraction below floor, fraction below floor without
+    ways), each shaped (P, B).
+    """
+    turns, times, others, end = sessions
+    span = t[-1] + 2.0
+    valid = t[None, :] <= end[:, None]
+    steps = valid.sum(axis=1)
+
+    idx = row_counts(turns, t, span)
+    log_n = np.log1p(idx)
+    prefixed = np.hstack([np.zeros((len(turns), 1)), np.where(np.isfinite(turns), turns, 0.0)])
+    t_local = t[None, :] - np.take_along_axis(prefixed, idx, axis=1)
+    fired = row_counts(times, t, span)
+    live = fired > 0
+    last = np.maximum(fired - 1, 0)
+
+    out = np.empty((3, len(params), len(turns)))
+    for p, (alpha, beta, a0, a_inject, k) in enumerate(params):
+        base = np.clip(a0 * np.exp(-(alpha * log_n + beta * t_local)), 0, a0)
+        with np.errstate(divide='ignore'):
+            log_amp = np.where(others >= 0, np.log(a_inject / (1 + k * np.maximum(others, 0))),
+                               -np.inf)
+        key = np.maximum.accumulate(log_amp + beta * np.where(others >= 0, times, 0.0), axis=1)
+        inject = np.zeros_like(base)
+        if key.shape[1]:
+            inject[live] = np.exp(np.take_along_axis(key, last, axis=1)[live]
+                                  - beta * np.broadcast_to(t, base.shape)[live])
+        combined = np.clip(base + inject, 0, 1.3)
+        out[0, p] = np.where(valid, combined, 0).sum(axis=1) / steps
+        out[1, p] = (valid & (combined < floor)).sum(axis=1) / steps
+        out[2, p] = (valid & (base < floor)).sum(axis=1) / steps
+    return out
+
+
+def run_batch(task, model, params, floor, resolution):
+    seed, size = task
+    rng = np.random.default_rng(seed)
+    sessions = model.sample(rng, size)
+    end = sessions[3]
+    t = np.arange(0.0, float(end.max()) + 1.0 / resolution, 1.0 / resolution)
+    res = evaluate_batch(sessions, t, params, floor)
+    turns = np.isfinite(sessions[0]).sum(axis=1)
+    return res.astype(np.float32), end.astype(np.float32), turns
+
+
+# --------------------------------------------------------------------------
+# Reporting
+# --------------------------------------------------------------------------
+
+def param_sets(alpha, beta, a0, a_inject, k):
+    """Baseline first, then (low, high) pairs for each SENSITIVITY parameter."""
+    base = {'alpha': alpha, 'beta': beta, 'a0': a0, 'a_inject': a_inject, 'k': k}
+    sets, steps = [base], {}
+    for name in SENSITIVITY:
+        h = max(abs(base[name]) * STEP, 1e-3)
+        steps[name] = h
+        sets += [dict(base, **{name: base[name] - h}), dict(base, **{name: base[name] + h})]
+    order = ('alpha', 'beta', 'a0', 'a_inject', 'k')
+    return [tuple(s[n] for n in order) for s in sets], base, steps
+
+
+def summarize(res, end, turns, base, steps):
+    mean, below, below_base = res
+    weight = end / end.sum()
+
+    def quantiles(x):
+        return {f'p{q}': round(float(v), 4) for q, v in zip(QUANTILES, np.percentile(x, QUANTILES))}
+
+    def metrics(p):
+        return float(np.median(mean[p])), float(weight @ below[p])
+
+    med0, fleet0 = metrics(0)
+    sensitivity = {}
+    for i, name in enumerate(SENSITIVITY):
+        (med_lo, fleet_lo), (med_hi, fleet_hi) = metrics(1 + 2 * i), metrics(2 + 2 * i)
+        d_med = (med_hi - med_lo) / (2 * steps[name])
+        d_fleet = (fleet_hi - fleet_lo) / (2 * steps[name])
+        value = base[name]
+        sensitivity[name] = {
+            'value': value,
+            'd_median_adherence': round(d_med, 4),
+            'd_below_floor': round(d_fleet, 4),
+            'elasticity_median_adherence': round(d_med * value / med0, 4) if med0 else None,
+            'elasticity_below_floor': round(d_fleet * value / fleet0, 4) if fleet0 else None,
+        }
+    return {
+        'sessions': int(len(end)),
+        'mean_turns': round(float(turns.mean()), 2),
+        'mean_duration': round(float(end.mean()), 2),
+        'mean_adherence': quantiles(mean[0]),
+        'below_floor': quantiles(below[0]),
+        'fleet_below_floor': round(fleet0, 4),
+        'fleet_below_floor_base': round(float(weight @ below_base[0]), 4),
+        'sensitivity': sensitivity,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--sessions', type=int, default=100_000)
+    parser.add_argument('--turns', type=float, default=20.0, help='mean user turns per session')
+    parser.add_argument('--gap', type=float, default=1.0, help='mean units between turns')
+    parser.add_argument('--fires', type=float, default=1.5, help='mean ways fired per turn')
+    parser.add_argument('--tool-rate', type=float, default=0.3,
+                        help='tool-triggered firings per unit')
+    parser.add_argument('--fit', action='store_true',
+                        help='fit turns, gaps and firings to the event log instead')
+    parser.add_argument('--events', type=Path, default=STATS_FILE)
+    parser.add_argument('--days', type=int, default=None)
+    parser.add_argument('--project', default=None)
+    parser.add_argument('--unit', type=float, default=60.0,
+                        help='seconds per model unit for --fit (default: 60)')
+    parser.add_argument('--alpha', type=float, default=0.38)
+    parser.add_argument('--beta', type=float, default=0.55)
+    parser.add_argument('--a-inject', type=float, default=0.65)
+    parser.add_argument('--k', type=float, default=0.3, help='competition coefficient')
+    parser.add_argument('--floor', type=float, default=NOISE_FLOOR)
+    parser.add_argument('--resolution', type=float, default=10.0,
+                        help='samples per model unit (default: 10)')
+    parser.add_argument('--batch', type=int, default=BATCH, help='sessions per task')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    model = SessionModel(args.turns, args.gap, args.fires, args.tool_rate)
+    if args.fit:
+        fitted = fit_model(args.events, args.unit, args.days, args.project) \
+            if args.events.is_file() else None
+        if fitted is None:
+            print('No sessions with way firings to fit.', file=sys.stderr)
+            return 1
+        model = fitted
+
+    params, base, steps = param_sets(args.alpha, args.beta, 1.0, args.a_inject, args.k)
+    sizes = [min(args.batch, args.sessions - lo) for lo in range(0, args.sessions, args.batch)]
+    seeds = np.random.SeedSequence(args.seed).spawn(len(sizes))
+    work = partial(run_batch, model=model, params=params, floor=args.floor,
+                   resolution=args.resolution)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        parts = list(pool.map(work, zip(seeds, sizes)))
+    elapsed = time.perf_counter() - start
+
+    res = np.concatenate([p[0] for p in parts], axis=2).astype(float)
+    end = np.concatenate([p[1] for p in parts]).astype(float)
+    turns = np.concatenate([p[2] for p in parts])
+    report = summarize(res, end, turns, base, steps)
+    report.update(model=model.describe(), params=base, floor=args.floor,
+                  seed=args.seed, seconds=round(elapsed, 2))
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return 0
+
+    print('Adherence Monte Carlo')
+    print('=====================')
+    print(f"Sessions: {report['sessions']}  |  Mean turns: {report['mean_turns']}"
+          f"  |  Mean duration: {report['mean_duration']} units  |  {elapsed:.1f}s")
+    print(f"alpha {args.alpha}  beta {args.beta}  A_inject {args.a_inject}  k {args.k}"
+          f"  floor {args.floor}")
+    print()
+    print(f"{'':<22}" + ''.join(f'{f"p{q}":>8}' for q in QUANTILES))
+    for label, key in (('Mean adherence', 'mean_adherence'), ('Time below floor', 'below_floor')):
+        print(f'{label:<22}' + ''.join(f'{v:8.3f}' for v in report[key].values()))
+    print()
+    print(f"Fleet time below floor: {report['fleet_below_floor']:.1%} with ways,"
+          f" {report['fleet_below_floor_base']:.1%} system prompt alone")
+    print()
+    print(f"Sensitivity (±{STEP:.0%}):  {'d median/dθ':>12} {'elasticity':>11}"
+          f" {'d below/dθ':>11} {'elasticity':>11}")
+    for name, s in report['sensitivity'].items():
+        print(f"  {name:<5} = {s['value']:<7.3g}   {s['d_median_adherence']:12.4f}"
+              f" {s['elasticity_median_adherence'] or 0:11.3f}"
+              f" {s['d_below_floor']:11.4f} {s['elasticity_below_floor'] or 0:11.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""Power spectra of recorded sessions: what the ways absorb, what the human corrects.
+
+Turns every session into uniformly sampled event-count signals and averages
+their power spectra across the fleet (Welch: Hann-windowed, half-overlapping
+segments, mean removed per segment). Channels:
+
+  ways         way injections (events.jsonl, way_fired / way_redisclosed)
+  corrections  user prompts that correct or interrupt (--corrections regex)
+  failures     tool results flagged is_error — failed lint, test and build
+               commands surface here
+  errors       corrections + failures: the total disturbance
+
+The hooks log firings but not errors, so corrections and failures come from
+the session transcripts under ~/.claude/projects/, joined to the event log
+by session id. A transcript is split into active stretches wherever nothing
+happens for --max-gap seconds; stretches shorter than one segment are
+skipped.
+
+The crossover is where the corrections' share of the error power falls to
+half its value in the lowest band — the -3 dB point of the human's loop.
+Below it the human carries the disturbance, above it the inner loop does.
+Frequencies are in cycles per user turn (seconds × the fleet's median gap
+between prompts), the axis of the cascade Bode figure.
+
+Usage:
+  spectra.py                         # every transcript, default sampling
+  spectra.py --days 30 --dt 5 --segment 256
+  spectra.py --npz docs/images/spectra.npz   # data for the Bode figure
+  spectra.py --json
+
+Transcripts are read in a process pool, a batch of files per task. Each
+task stacks its segments into (segments × channels × samples) blocks of at
+most --chunk segments and reduces them with one batched rfft, so memory is
+bounded by the chunk and only the per-frequency sums leave the worker.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from events import INJECTION_EVENTS, STATS_FILE, iter_events, parse_ts
+
+PROJECTS_DIR = Path.home() / '.claude' / 'projects'
+CHANNELS = ('ways', 'corrections', 'failures', 'errors')
+CORRECTIONS = (r"^\s*(\[request interrupted|no\b|nope\b|don'?t\b|do not\b|stop\b|"
+               r"wait\b|wrong\b|that'?s (not|wrong)|not what|actually\b|instead\b|"
+               r"undo\b|revert\b)")
+FILES_PER_TASK = 32
+# Bins averaged for the low-frequency reference of the correction share
+LOW_BINS = 3
+
+
+# --------------------------------------------------------------------------
+# Event times
+# --------------------------------------------------------------------------
+
+def injection_times(path, days=None):
+    """{session id: array of injection times} from the event log."""
+    cutoff = time.time() - days * 86400 if days else None
+    times = {}
+    for ev in iter_events(path, events=INJECTION_EVENTS):
+        ts = parse_ts(ev.get('ts'))
+        sid = ev.get('session', '')
+        if ts is None or not sid or (cutoff and ts < cutoff):
+            continue
+        times.setdefault(sid, array('d')).append(ts)
+    return times
+
+
+def transcript_times(path, correction):
+    """(activity, prompts, corrections, failures) timestamps from one transcript.
+
+    Only user lines that are prompts are decoded; timestamps and error flags
+    are found by substring, since most of a transcript is tool output.
+    """
+    activity, prompts, corrections, failures = [], [], [], []
+    decode = json.JSONDecoder().decode
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            i = line.find('"timestamp":"')
+            ts = parse_ts(line[i + 13:i + 32]) if i >= 0 else None
+            if ts is None:
+                continue
+            activity.append(ts)
+            if '"tool_result"' in line:
+                failures.extend([ts] * line.count('"is_error":true'))
+                continue
+            if '"type":"user"' not in line or '"isMeta":true' in line:
+                continue
+            try:
+                content = decode(line)['message']['content']
+            except (ValueError, KeyError, TypeError):
+                continue
+            if isinstance(content, list):
+                content = ' '.join(b.get('text', '') for b in content if isinstance(b, dict))
+            if not isinstance(content, str):
+                continue
+            prompts.append(ts)
+            if correction.search(content):
+                corrections.append(ts)
+    return activity, prompts, corrections, failures
+
+
+# --------------------------------------------------------------------------
+# Signals and spectra (run in pool workers)
+# --------------------------------------------------------------------------
+
+def stretches(activity, max_gap):
+    """(start, end) of each run of activity without a gap over max_gap."""
+    t = np.sort(np.asarray(activity, dtype=np.float64))
+    if not len(t):
+        return []
+    cut = np.flatnonzero(np.diff(t) > max_gap)
+    starts = np.concatenate(([t[0]], t[cut + 1]))
+    ends = np.concatenate((t[cut], [t[-1]]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class Welch:
+    """Running sums of |rfft|² per channel over windowed segments."""
+
+    def __init__(self, segment, chunk):
+        self.segment = segment
+        self.hop = segment // 2
+        self.chunk = chunk
+        self.window = np.hanning(segment)
+        self.power = np.zeros((len(CHANNELS), segment // 2 + 1))
+        self.segments = 0
+        self.pending = []
+        self.pending_n = 0
+
+    def add(self, signal):
+        """Queue the segments of one (channels × samples) signal."""
+        if signal.shape[1] < self.segment:
+            return False
+        view = np.lib.stride_tricks.sliding_window_view(signal, self.segment, axis=1)
+        segs = view[:, ::self.hop].transpose(1, 0, 2)   # segments × channels × samples
+        self.pending.append(segs)
+        self.pending_n += len(segs)
+        while self.pending_n >= self.chunk:
+            self.flush(self.chunk)
+        return True
+
+    def flush(self, limit=None):
+        if not self.pending_n:
+            return
+        block = np.concatenate(self.pending)
+        n = len(block) if limit is None else limit
+        block, rest = block[:n], block[n:]
+        self.pending = [rest] if len(rest) else []
+        self.pending_n = len(rest)
+        x = block - block.mean(axis=2, keepdims=True)
+        spec = np.fft.rfft(x * self.window, axis=2)
+        self.power += (spec.real ** 2 + spec.imag ** 2).sum(axis=0)
+        self.segments += n
+
+
+def spectra_task(files, dt, segment, chunk, max_gap, correction):
+    """Welch sums for a batch of (transcript, injection times) pairs."""
+    correction = re.compile(correction, re.IGNORECASE)
+    welch = Welch(segment, chunk)
+    gaps, counts = [], np.zeros(len(CHANNELS), dtype=np.int64)
+    used = skipped = 0
+    seconds = 0.0
+    for path, ways in files:
+        activity, prompts, corrections, failures = transcript_times(path, correction)
+        gaps.append(np.diff(np.sort(np.asarray(prompts, dtype=np.float64))))
+        events = [np.asarray(ways, dtype=np.float64), np.asarray(corrections, dtype=np.float64),
+                  np.asarray(failures, dtype=np.float64)]
+        for start, end in stretches(activity, max_gap):
+            n = int((end - start) // dt) + 1
+            signal = np.zeros((len(CHANNELS), n))
+            for ch, t in enumerate(events):
+                t = t[(t >= start) & (t <= end)]
+                signal[ch] = np.bincount(((t - start) // dt).astype(np.int64), minlength=n)
+                counts[ch] += len(t)
+            signal[3] = signal[1] + signal[2]
+            if welch.add(signal):
+                used += 1
+                seconds += end - start
+            else:
+                skipped += 1
+    welch.flush()
+    gaps = np.concatenate(gaps) if gaps else np.zeros(0)
+    counts[3] = counts[1] + counts[2]
+    return {'power': welch.power, 'segments': welch.segments, 'gaps': gaps[gaps > 0],
+            'counts': counts, 'stretches': used, 'skipped': skipped, 'seconds': seconds}
+
+
+# --------------------------------------------------------------------------
+# Fleet
+# --------------------------------------------------------------------------
+
+def rejection(human, total):
+    """Human share of the error power per frequency, relative to the lowest band.
+
+    1 at the low end, like the figure's inner-loop rejection 1 / (1 + (f/fc)²).
+    Event counts have nearly flat spectra, so the raw share mostly reflects
+    the two rates; normalising shows how it changes with frequency.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(total > 0, human / total, np.nan)
+    ref = np.nanmean(share[:LOW_BINS]) if np.isfinite(share[:LOW_BINS]).any() else np.nan
+    return share / ref if ref and np.isfinite(ref) else np.full_like(share, np.nan)
+
+
+def crossover(freq, ratio):
+    """Lowest frequency where the smoothed ratio falls through 0.5 (log-interpolated)."""
+    padded = np.concatenate((ratio[:1], ratio, ratio[-1:]))
+    smooth = np.median(np.lib.stride_tricks.sliding_window_view(padded, 3), axis=1)
+    for i in range(len(freq) - 1):
+        r0, r1 = smooth[i], smooth[i + 1]
+        if r0 >= 0.5 > r1:
+            frac = (r0 - 0.5) / (r0 - r1)
+            return float(np.exp(np.log(freq[i]) + frac * (np.log(freq[i + 1]) - np.log(freq[i]))))
+    return None
+
+
+def analyze(transcripts, ways, dt, segment, chunk, max_gap, correction, jobs=None):
+    """Fleet Welch spectra; frequencies in cycles per user turn."""
+    files = [(str(p), ways.get(p.stem, array('d'))) for p in transcripts]
+    tasks = [files[i:i + FILES_PER_TASK] for i in range(0, len(files), FILES_PER_TASK)]
+    work = partial(spectra_task, dt=dt, segment=segment, chunk=chunk,
+                   max_gap=max_gap, correction=correction)
+
+    power = np.zeros((len(CHANNELS), segment // 2 + 1))
+    counts = np.zeros(len(CHANNELS), dtype=np.int64)
+    gaps, segments, used, skipped, seconds = [], 0, 0, 0, 0.0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for r in pool.map(work, tasks):
+            power += r['power']
+            counts += r['counts']
+            gaps.append(r['gaps'])
+            segments += r['segments']
+            used += r['stretches']
+            skipped += r['skipped']
+            seconds += r['seconds']
+
+    # One-sided PSD in events² per Hz, averaged over segments
+    fs = 1.0 / dt
+    window = np.hanning(segment)
+    psd = 2 * power / (max(1, segments) * fs * (window ** 2).sum())
+    freq_hz = np.fft.rfftfreq(segment, dt)
+    gaps = np.concatenate(gaps) if gaps else np.zeros(0)
+    turn = float(np.median(gaps)) if len(gaps) else 1.0 / fs
+
+    # Drop DC (the per-segment mean is removed) and the Nyquist bin
+    freq_hz, psd = freq_hz[1:-1], psd[:, 1:-1]
+    freq = freq_hz * turn
+    ratio = rejection(psd[1], psd[3])
+    cross = crossover(freq, ratio) if segments else None
+    return {
+        'transcripts': len(files), 'stretches': used, 'skipped': skipped,
+        'segments': segments, 'hours': seconds / 3600, 'turn_seconds': turn,
+        'counts': dict(zip(CHANNELS, counts.tolist())),
+        'freq': freq, 'freq_hz': freq_hz,
+        'psd': dict(zip(CHANNELS, psd)),
+        'rejection': ratio,
+        'crossover': cross,
+    }
+
+
+def save_npz(path, r):
+    """Arrays for generate-decay-diagrams.py (fig_cascade_bode)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    psd = r['psd']
+    np.savez_compressed(
+        path, freq=r['freq'], freq_hz=r['freq_hz'],
+        disturbance_spectrum=psd['errors'], human_sees=psd['corrections'],
+        ways_spectrum=psd['ways'], failures_spectrum=psd['failures'],
+        rejection=r['rejection'],
+        crossover_freq=np.array(np.nan if r['crossover'] is None else r['crossover']),
+        turn_seconds=np.array(r['turn_seconds']), segments=np.array(r['segments']))
+
+
+def bands(r, edges=(0.1, 0.3, 1, 3, 10)):
+    """Share of each channel's power per band of cycles per turn."""
+    freq, rows = r['freq'], []
+    lo = np.concatenate(([0], edges))
+    hi = np.concatenate((edges, [np.inf]))
+    total = {ch: r['psd'][ch].sum() for ch in CHANNELS}
+    for a, b in zip(lo, hi):
+        sel = (freq >= a) & (freq < b)
+        if sel.any():
+            rows.append((a, b, {ch: r['psd'][ch][sel].sum() / total[ch] if total[ch] else 0.0
+                                for ch in CHANNELS}))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=Path, default=STATS_FILE,
+                        help='event log (default: %(default)s)')
+    parser.add_argument('--projects', type=Path, default=PROJECTS_DIR,
+                        help='transcript root (default: %(default)s)')
+    parser.add_argument('--days', type=int, default=None,
+                        help='only transcripts modified in the last N days')
+    parser.add_argument('--dt', type=float, default=10.0,
+                        help='seconds per sample (default: 10)')
+    parser.add_argument('--segment', type=int, default=128,
+                        help='samples per Welch segment (default: 128)')
+    parser.add_argument('--max-gap', type=float, default=1800.0,
+                        help='idle seconds that split a transcript (default: 1800)')
+    parser.add_argument('--corrections', default=CORRECTIONS,
+                        help='regex (case-insensitive) marking a prompt as a correction')
+    parser.add_argument('--chunk', type=int, default=2048,
+                        help='segments per batched FFT (default: 2048)')
+    parser.add_argument('--npz', type=Path, default=None,
+                        help='write the spectra for the Bode figure here')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    cutoff = time.time() - args.days * 86400 if args.days else None
+    transcripts = sorted(p for p in args.projects.glob('*/*.jsonl')
+                         if not cutoff or os.path.getmtime(p) >= cutoff)
+    if not transcripts:
+        print('No transcripts found.')
+        return 0
+    ways = injection_times(args.events, args.days) if args.events.is_file() else {}
+
+    r = analyze(transcripts, ways, args.dt, args.segment, args.chunk,
+                args.max_gap, args.corrections, args.jobs)
+    if args.npz and r['segments']:
+        save_npz(args.npz, r)
+
+    if args.json:
+        out = dict(r, freq=r['freq'].tolist(), freq_hz=r['freq_hz'].tolist(),
+                   rejection=[None if np.isnan(v) else v for v in r['rejection'].tolist()],
+                   psd={ch: v.tolist() for ch, v in r['psd'].items()})
+        json.dump(out, sys.stdout, indent=2)
+        print()
+        return 0
+
+    if not r['segments']:
+        print(f"No stretch of activity spans a segment ({args.segment} × {args.dt:g} s).")
+        return 0
+    c = r['counts']
+    print('Session spectra')
+    print('===============')
+    print(f"Transcripts: {r['transcripts']}  |  Stretches: {r['stretches']}"
+          f" ({r['skipped']} too short)  |  Segments: {r['segments']}  |  {r['hours']:.1f} h")
+    print(f"Events: {c['ways']} injections, {c['corrections']} corrections, {c['failures']} failures")
+    print(f"Median turn: {r['turn_seconds']:.0f} s  |  "
+          f"Band: {r['freq'][0]:.3g}-{r['freq'][-1]:.3g} cycles/turn")
+    if r['crossover'] is None:
+        print('Crossover: none (the correction share never halves across the band)')
+    else:
+        print(f"Crossover: {r['crossover']:.3g} cycles/turn"
+              f" (period {r['turn_seconds'] / r['crossover']:.0f} s)")
+    print()
+    print(f"{'cycles/turn':<14}" + ''.join(f'{ch:>13}' for ch in CHANNELS))
+    for a, b, share in bands(r):
+        label = f'{a:g}-{b:g}' if np.isfinite(b) else f'≥{a:g}'
+        print(f'{label:<14}' + ''.join(f'{share[ch]:>13.1%}' for ch in CHANNELS))
+    if args.npz:
+        print()
+        print(f'Wrote {args.npz}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
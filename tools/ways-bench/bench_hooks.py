@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""Latency benchmark for the per-prompt and per-tool-call hook path.
+
+Replays a corpus of hook payloads through the real hook scripts
+(check-prompt.sh, check-bash-pre.sh, check-file-pre.sh, check-task-pre.sh)
+in a throwaway HOME and sessions root, so nothing touches live session
+state or ~/.claude/stats.
+
+Usage:
+  bench_hooks.py                         # repo hooks + bin/ways, compare to baseline
+  bench_hooks.py --rounds 20 --concurrency 1,4,8
+  bench_hooks.py --save                  # write baseline.json for review
+                                         # (required first: without a baseline
+                                         # the bench exits 2 before running)
+  bench_hooks.py --check                 # exit 1 if p95 regressed past --tolerance
+  bench_hooks.py --json                  # full report on stdout
+
+Stages, per call:
+  pre    hook start until `ways` starts — bash startup, the jq extractions,
+         the response-topics read in check-prompt.sh
+  scan   the `ways scan` process itself
+  post   after `ways` exits until the hook returns
+The `ways` binary is wrapped by a small bash shim that stamps its start and
+end, so `pre` includes one extra bash exec (~1-2 ms) that a real install
+does not pay.
+
+Corpus lines are {"hook": "prompt|bash|file|task", "payload": {...}};
+session_id, agent_id and cwd are filled in per replay. Each round replays
+the corpus in a fresh session, so later firings in a round exercise the
+already-shown marker path just as a real session does.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent.parent
+CORPUS = BENCH_DIR / 'corpus.jsonl'
+BASELINE = BENCH_DIR / 'baseline.json'
+
+HOOKS = {
+    'prompt': 'check-prompt.sh',
+    'bash': 'check-bash-pre.sh',
+    'file': 'check-file-pre.sh',
+    'task': 'check-task-pre.sh',
+}
+STAGES = ('total', 'pre', 'scan', 'post')
+QUANTILES = (50, 95, 99)
+
+SHIM = '''#!/bin/bash
+start=$EPOCHREALTIME
+"$WAYS_BENCH_REAL" "$@"
+rc=$?
+echo "$start $EPOCHREALTIME" > "$WAYS_BENCH_STAGE"
+exit $rc
+'''
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile of a non-empty list."""
+    s = sorted(values)
+    pos = (len(s) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+
+def summarize(values):
+    if not values:
+        return {}
+    out = {f'p{q}': round(percentile(values, q), 3) for q in QUANTILES}
+    out['mean'] = round(sum(values) / len(values), 3)
+    return out
+
+
+def find_ways_bin(explicit=None):
+    for candidate in (explicit, REPO_ROOT / 'bin' / 'ways',
+                      Path.home() / '.claude' / 'bin' / 'ways'):
+        if candidate and Path(candidate).is_file() and os.access(candidate, os.X_OK):
+            return Path(candidate).resolve()
+    return None
+
+
+def load_corpus(path):
+    cases = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                case = json.loads(line)
+                if case.get('hook') not in HOOKS:
+                    raise ValueError(f"{path}: unknown hook {case.get('hook')!r}")
+                cases.append(case)
+    return cases
+
+
+# --------------------------------------------------------------------------
+# Sandbox
+# --------------------------------------------------------------------------
+
+class Sandbox:
+    """Temporary HOME + sessions root wired to a ways tree and binary."""
+
+    def __init__(self, ways_bin, hooks_dir, project=None, cold_cache=False):
+        self.root = Path(tempfile.mkdtemp(prefix='ways-bench-'))
+        self.hooks_dir = Path(hooks_dir).resolve()
+        home = self.root / 'home'
+        bin_dir = home / '.claude' / 'bin'
+        bin_dir.mkdir(parents=True)
+        (home / '.claude' / 'hooks').symlink_to(self.hooks_dir.parent)
+        shim = bin_dir / 'ways'
+        shim.write_text(SHIM)
+        shim.chmod(0o755)
+        # Semantic scoring needs the embedder next to the binary
+        embed = Path.home() / '.claude' / 'bin' / 'way-embed'
+        if embed.exists():
+            (bin_dir / 'way-embed').symlink_to(embed.resolve())
+
+        self.stage_dir = self.root / 'stages'
+        self.stage_dir.mkdir()
+        (self.root / 'run').mkdir(mode=0o700)
+        self.project = Path(project).resolve() if project else self.root / 'project'
+        self.project.mkdir(exist_ok=True)
+
+        self.env = dict(os.environ)
+        self.env.pop('CLAUDE_PROJECT_DIR', None)
+        self.env.pop('CLAUDE_AGENT_ID', None)
+        self.env.update({
+            'HOME': str(home),
+            'XDG_RUNTIME_DIR': str(self.root / 'run'),
+            'WAYS_BENCH_REAL': str(ways_bin),
+        })
+        if cold_cache:
+            self.env['XDG_CACHE_HOME'] = str(self.root / 'cache')
+        else:
+            # Keep the real corpus and model cache, or scan measures a cold miss
+            self.env.setdefault('XDG_CACHE_HOME', str(Path.home() / '.cache'))
+        self._topics = []
+
+    def response_topics(self, session, topics):
+        """Seed the Stop-hook state that check-prompt.sh reads."""
+        path = Path(f'/tmp/claude-response-topics-{session}')
+        path.write_text(json.dumps({'timestamp': int(time.time()),
+                                    'topics': topics, 'response_length': 2000}))
+        self._topics.append(path)
+
+    def run(self, case, session, agent, seq):
+        payload = dict(case['payload'], session_id=session, cwd=str(self.project))
+        if agent:
+            payload['agent_id'] = agent
+        stage_file = self.stage_dir / f'{session}.{agent or "main"}.{seq}'
+        env = dict(self.env, WAYS_BENCH_STAGE=str(stage_file))
+
+        start = time.time()
+        proc = subprocess.run(['bash', str(self.hooks_dir / HOOKS[case['hook']])],
+                              input=json.dumps(payload).encode(), env=env,
+                              capture_output=True)
+        end = time.time()
+
+        sample = {'hook': case['hook'], 'rc': proc.returncode,
+                  'output': len(proc.stdout), 'total': (end - start) * 1000}
+        try:
+            s, e = (float(x) for x in stage_file.read_text().split())
+            stage_file.unlink()
+        except (OSError, ValueError):
+            # Hook exited before calling ways (e.g. no file_path)
+            s = e = end
+        sample['pre'] = max(0.0, (s - start) * 1000)
+        sample['scan'] = max(0.0, (e - s) * 1000)
+        sample['post'] = max(0.0, (end - e) * 1000)
+        return sample
+
+    def close(self):
+        for p in self._topics:
+            p.unlink(missing_ok=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# --------------------------------------------------------------------------
+# Runs
+# --------------------------------------------------------------------------
+
+def replay(sandbox, cases, session, agent=None, topics=None):
+    if topics:
+        sandbox.response_topics(session, topics)
+    return [sandbox.run(case, session, agent, i) for i, case in enumerate(cases)]
+
+
+def sequential(sandbox, cases, rounds, warmup, topics):
+    tag = f'bench-{os.getpid()}'
+    for r in range(warmup):
+        replay(sandbox, cases, f'{tag}-warm{r}', topics=topics)
+    samples = []
+    for r in range(rounds):
+        samples.extend(replay(sandbox, cases, f'{tag}-{r}', topics=topics))
+    return samples
+
+
+def concurrent(sandbox, cases, workers, rounds, topics):
+    """N subagents sharing one session, each replaying the corpus."""
+    session = f'bench-{os.getpid()}-c{workers}'
+    if topics:
+        sandbox.response_topics(session, topics)
+
+    def agent(i):
+        out = []
+        for r in range(rounds):
+            out.extend(replay(sandbox, cases, session, agent=f'agent-{i}-{r}'))
+        return out
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = [s for batch in pool.map(agent, range(workers)) for s in batch]
+    wall = time.perf_counter() - start
+    totals = [s['total'] for s in samples]
+    return dict(summarize(totals), calls=len(samples),
+                throughput=round(len(samples) / wall, 2), wall_s=round(wall, 3))
+
+
+def report(samples, concurrency, meta):
+    hooks = {}
+    for hook in HOOKS:
+        rows = [s for s in samples if s['hook'] == hook]
+        if not rows:
+            continue
+        hooks[hook] = {stage: summarize([s[stage] for s in rows]) for stage in STAGES}
+        hooks[hook]['calls'] = len(rows)
+        hooks[hook]['errors'] = sum(1 for s in rows if s['rc'] != 0)
+        hooks[hook]['fired'] = sum(1 for s in rows if s['output'])
+    return {'meta': meta, 'hooks': hooks, 'concurrency': concurrency}
+
+
+def compare(current, baseline, tolerance, floor_ms=2.0):
+    """Regressions in per-hook/per-stage p95 beyond tolerance and an absolute floor."""
+    regressions = []
+    for hook, stages in current['hooks'].items():
+        base_stages = baseline.get('hooks', {}).get(hook, {})
+        for stage in STAGES:
+            now = stages.get(stage, {}).get('p95')
+            before = base_stages.get(stage, {}).get('p95')
+            if now is None or before is None:
+                continue
+            if now > before * (1 + tolerance) and now - before > floor_ms:
+                regressions.append((hook, stage, before, now))
+    return regressions
+
+
+def metadata(ways_bin, hooks_dir, corpus, rounds):
+    try:
+        version = subprocess.run([str(ways_bin), '--version'], capture_output=True,
+                                 text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        version = ''
+    try:
+        commit = subprocess.run(['git', '-C', str(REPO_ROOT), 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'ways': version,
+        'commit': commit,
+        'hooks_dir': str(hooks_dir),
+        'corpus_sha256': hashlib.sha256(Path(corpus).read_bytes()).hexdigest()[:16],
+        'rounds': rounds,
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def print_report(rep, regressions):
+    print('Hook latency (ms)')
+    print('=================')
+    print(f"{'hook':<8} {'stage':<6} {'p50':>8} {'p95':>8} {'p99':>8} {'mean':>8}")
+    for hook, stages in rep['hooks'].items():
+        for stage in STAGES:
+            q = stages[stage]
+            print(f"{hook:<8} {stage:<6} {q['p50']:8.2f} {q['p95']:8.2f} {q['p99']:8.2f} {q['mean']:8.2f}")
+        print(f"{'':<8} {stages['calls']} calls, {stages['fired']} with output,"
+              f" {stages['errors']} errors")
+    if rep['concurrency']:
+        print()
+        print('Concurrent subagents (one session)')
+        print(f"{'agents':>6} {'calls/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for n, c in rep['concurrency'].items():
+            print(f"{n:>6} {c['throughput']:9.1f} {c['p50']:8.2f} {c['p95']:8.2f} {c['p99']:8.2f}")
+    if regressions is not None:
+        print()
+        if regressions:
+            print('Regressions vs baseline (p95):')
+            for hook, stage, before, now in regressions:
+                print(f'  {hook}/{stage}: {before:.2f} → {now:.2f} ms')
+        else:
+            print('No p95 regressions vs baseline.')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', type=Path, default=CORPUS)
+    parser.add_argument('--ways-bin', type=Path, default=None,
+                        help='ways binary (default: bin/ways, then ~/.claude/bin/ways)')
+    parser.add_argument('--hooks-dir', type=Path, default=REPO_ROOT / 'hooks' / 'ways',
+                        help='ways tree whose hook scripts are benchmarked')
+    parser.add_argument('--project', type=Path, default=None,
+                        help='project dir passed as cwd (default: empty temp dir)')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--concurrency', default='1,4,8',
+                        help='comma-separated subagent counts ("" to skip)')
+    parser.add_argument('--concurrency-rounds', type=int, default=2)
+    parser.add_argument('--topics', default='testing git commit security',
+                        help='response topics seeded for check-prompt.sh ("" for none)')
+    parser.add_argument('--cold-cache', action='store_true',
+                        help='empty XDG_CACHE_HOME (no corpus, no embedding cache)')
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save', action='store_true', help='write the report as the baseline')
+    parser.add_argument('--check', action='store_true',
+                        help='exit 1 on p95 regressions vs the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 growth before --check fails (default: 0.25)')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    if not args.save and not args.baseline.is_file():
+        print(f'no baseline at {args.baseline} — record one on this machine with --save '
+              '(make bench-hooks BENCH_ARGS=--save), review it, then rerun', file=sys.stderr)
+        return 2
+
+    ways_bin = find_ways_bin(args.ways_bin)
+    if ways_bin is None:
+        print('ways binary not found — run `make ways` or pass --ways-bin', file=sys.stderr)
+        return 2
+    cases = load_corpus(args.corpus)
+    levels = [int(n) for n in args.concurrency.split(',') if n.strip()]
+
+    sandbox = Sandbox(ways_bin, args.hooks_dir, args.project, args.cold_cache)
+    try:
+        samples = sequential(sandbox, cases, args.rounds, args.warmup, args.topics)
+        conc = {str(n): concurrent(sandbox, cases, n, args.concurrency_rounds, args.topics)
+                for n in levels}
+    finally:
+        sandbox.close()
+
+    rep = report(samples, conc, metadata(ways_bin, args.hooks_dir, args.corpus, args.rounds))
+
+    regressions = None
+    if not args.save:
+        regressions = compare(rep, json.loads(args.baseline.read_text()), args.tolerance)
+        rep['regressions'] = [dict(zip(('hook', 'stage', 'baseline', 'current'), r))
+                              for r in regressions]
+    if args.save:
+        args.baseline.write_text(json.dumps(rep, indent=2) + '\n')
+
+    if args.json:
+        json.dump(rep, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(rep, regressions)
+        if args.save:
+            print(f'\nBaseline written to {args.baseline}')
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -133,6 +133,12 @@ pub fn run(ways_dir: Option<String>, quiet: bool, if_stale: bool) -> Result<()>
     // Auto-embed if way-embed binary and model are available
     auto_embed(&xdg_way, &output, &log)?;
 
+    // Topic extraction's df table — after embedding, which rewrites the corpus
+    match crate::cmd::scan::write_vocabulary_df(&output) {
+        Ok(path) => log(&format!("Vocabulary table: {}", path.display())),
+        Err(e) => eprintln!("WARNING: vocabulary table not written: {e}"),
+    }
+
     // Write manifest
     let manifest = json!({
         "global_hash": global_hash,
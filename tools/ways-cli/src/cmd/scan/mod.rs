@@ -4,8 +4,11 @@
 //! scope/precondition gating, parent-threshold lowering, and show (display).
 
 mod candidates;
+mod response;
 mod scoring;
 pub(crate) use scoring::batch_embed_score;
+pub use response::response;
+pub(crate) use response::write_vocabulary_df;
 
 use anyhow::Result;
 use regex::Regex;
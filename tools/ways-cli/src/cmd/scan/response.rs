@@ -0,0 +1,355 @@
+//! Response topics for the Stop hook — replaces check-response.sh's pipeline.
+//!
+//! Reads the last assistant turn from the end of the transcript, scores its
+//! words against the way vocabulary in the corpus, and writes the topics the
+//! next prompt scan appends to its query.
+
+use anyhow::Result;
+use serde::{Deserialize, Serialize};
+use std::borrow::Cow;
+use std::collections::HashMap;
+use std::fs::File;
+use std::io::{Read, Seek, SeekFrom};
+use std::path::Path;
+
+use crate::bm25;
+use crate::cmd::suggest::tokenize_pairs;
+
+use super::scoring::default_corpus;
+
+/// Never read further back than this from the end of the transcript.
+const TAIL_WINDOW: u64 = 1024 * 1024;
+const TAIL_CHUNK: u64 = 64 * 1024;
+/// Response text scored per turn (the newest part of the turn is kept).
+const MAX_RESPONSE: usize = 16 * 1024;
+const MAX_TOPICS: usize = 10;
+
+pub fn response(session: Option<&str>, transcript: Option<&str>) -> Result<()> {
+    // Hook payload on stdin unless both are given on the command line
+    let (session_id, transcript) = match (session, transcript) {
+        (Some(s), Some(t)) => (s.to_string(), t.to_string()),
+        _ => {
+            let mut input = String::new();
+            std::io::stdin().read_to_string(&mut input)?;
+            let payload: serde_json::Value =
+                serde_json::from_str(&input).unwrap_or(serde_json::Value::Null);
+            // Prevent infinite loops
+            if payload["stop_hook_active"].as_bool() == Some(true) {
+                return Ok(());
+            }
+            (
+                session.or(payload["session_id"].as_str()).unwrap_or("").to_string(),
+                transcript.or(payload["transcript_path"].as_str()).unwrap_or("").to_string(),
+            )
+        }
+    };
+
+    let text = match last_response(Path::new(&transcript)) {
+        Some(t) if !t.is_empty() => t,
+        _ => return Ok(()),
+    };
+
+    let stemmer = bm25::new_stemmer();
+    let corpus = default_corpus();
+    let (df, n_docs) = load_vocabulary_df(&corpus)
+        .unwrap_or_else(|| vocabulary_index(&corpus, &stemmer));
+    let topics = extract_topics(&text, &df, n_docs, &stemmer);
+    if topics.is_empty() {
+        return Ok(());
+    }
+
+    let state = serde_json::json!({
+        "timestamp": crate::session::chrono_utc_now(),
+        "topics": topics.join(" "),
+        "response_length": text.chars().count(),
+    });
+    let path = format!("/tmp/claude-response-topics-{session_id}");
+    let tmp = format!("{path}.{}", std::process::id());
+    std::fs::write(&tmp, serde_json::to_string_pretty(&state)?)?;
+    std::fs::rename(&tmp, &path)?;
+    Ok(())
+}
+
+// ── Transcript tail ─────────────────────────────────────────────
+
+/// Text of the last assistant turn, reading the transcript backwards.
+///
+/// Walks lines from the end in TAIL_CHUNK blocks, collecting assistant text
+/// blocks until the user prompt that started the turn. Tool results and
+/// meta lines are skipped without parsing. Stops at TAIL_WINDOW or once
+/// MAX_RESPONSE bytes are collected.
+fn last_response(path: &Path) -> Option<String> {
+    let mut file = File::open(path).ok()?;
+    let len = file.metadata().ok()?.len();
+    let floor = len.saturating_sub(TAIL_WINDOW);
+
+    let mut parts: Vec<String> = Vec::new(); // newest first
+    let mut collected = 0;
+    let mut carry: Vec<u8> = Vec::new(); // head of the line cut by the previous block
+    let mut end = len;
+
+    while end > floor {
+        let start = end.saturating_sub(TAIL_CHUNK).max(floor);
+        let mut buf = vec![0u8; (end - start) as usize];
+        file.seek(SeekFrom::Start(start)).ok()?;
+        file.read_exact(&mut buf).ok()?;
+        buf.extend_from_slice(&carry);
+        end = start;
+
+        let mut lines: Vec<&[u8]> = buf.split(|&b| b == b'\n').collect();
+        // The first piece may continue before this block
+        let head = if start > 0 { lines.remove(0).to_vec() } else { Vec::new() };
+
+        for line in lines.iter().rev() {
+            match classify(line) {
+                Line::Prompt => return join(parts),
+                Line::Assistant => {
+                    for text in assistant_text(line) {
+                        collected += text.len();
+                        parts.push(text);
+                    }
+                    if collected >= MAX_RESPONSE {
+                        return join(parts);
+                    }
+                }
+                Line::Other => {}
+            }
+        }
+        carry = head;
+    }
+    join(parts)
+}
+
+enum Line {
+    Prompt,
+    Assistant,
+    Other,
+}
+
+fn classify(line: &[u8]) -> Line {
+    let has = |needle: &[u8]| line.windows(needle.len()).any(|w| w == needle);
+    if has(b"\"type\":\"assistant\"") {
+        Line::Assistant
+    } else if has(b"\"type\":\"user\"") && !has(b"\"tool_result\"") && !has(b"\"isMeta\":true") {
+        Line::Prompt
+    } else {
+        Line::Other
+    }
+}
+
+fn assistant_text(line: &[u8]) -> Vec<String> {
+    let entry: serde_json::Value = match serde_json::from_slice(line) {
+        Ok(v) => v,
+        Err(_) => return Vec::new(),
+    };
+    let mut texts: Vec<String> = entry["message"]["content"]
+        .as_array()
+        .map(|blocks| {
+            blocks
+                .iter()
+                .filter_map(|b| b["text"].as_str())
+                .filter(|t| !t.is_empty())
+                .map(|t| t.to_string())
+                .collect()
+        })
+        .unwrap_or_default();
+    texts.reverse(); // callers collect newest first
+    texts
+}
+
+fn join(mut parts: Vec<String>) -> Option<String> {
+    if parts.is_empty() {
+        return None;
+    }
+    parts.reverse();
+    let mut text = parts.join("\n");
+    if text.len() > MAX_RESPONSE {
+        let mut cut = text.len() - MAX_RESPONSE;
+        while !text.is_char_boundary(cut) {
+            cut += 1;
+        }
+        text.drain(..cut);
+    }
+    Some(text)
+}
+
+// ── Vocabulary scoring ──────────────────────────────────────────
+
+/// The one corpus field topics need. Everything else on the line, the
+/// 384-float embedding included, is skipped by the parser, not built.
+#[derive(Deserialize)]
+struct VocabularyEntry<'a> {
+    #[serde(borrow, default)]
+    vocabulary: Option<Cow<'a, str>>,
+}
+
+/// The document-frequency table `ways corpus` stores next to the corpus, so
+/// the Stop hook neither re-reads the embeddings nor re-stems every way.
+#[derive(Serialize, Deserialize)]
+struct VocabularyDf {
+    docs: u32,
+    df: HashMap<String, u32>,
+}
+
+fn vocabulary_df_path(corpus: &Path) -> std::path::PathBuf {
+    corpus.with_file_name("ways-vocabulary-df.json")
+}
+
+/// Write the df table for `corpus`. Runs after embedding, which rewrites the
+/// corpus, so a table older than the corpus is known to be out of date.
+pub(crate) fn write_vocabulary_df(corpus: &Path) -> Result<std::path::PathBuf> {
+    let (df, docs) = vocabulary_index(corpus, &bm25::new_stemmer());
+    let path = vocabulary_df_path(corpus);
+    let tmp = path.with_extension("json.tmp");
+    std::fs::write(&tmp, serde_json::to_string(&VocabularyDf { docs, df })?)?;
+    std::fs::rename(&tmp, &path)?;
+    Ok(path)
+}
+
+/// The stored df table, unless the corpus has been rewritten since.
+fn load_vocabulary_df(corpus: &Path) -> Option<(HashMap<String, u32>, u32)> {
+    let path = vocabulary_df_path(corpus);
+    let stored = std::fs::metadata(&path).and_then(|m| m.modified()).ok()?;
+    let current = std::fs::metadata(corpus).and_then(|m| m.modified()).ok()?;
+    if stored < current {
+        return None;
+    }
+    let table: VocabularyDf = serde_json::from_slice(&std::fs::read(&path).ok()?).ok()?;
+    Some((table.df, table.docs))
+}
+
+/// Stemmed vocabulary term → number of corpus entries listing it, and the
+/// entry count. The corpus holds every way's vocabulary plus locale stubs.
+fn vocabulary_index(corpus: &Path, stemmer: &rust_stemmers::Stemmer) -> (HashMap<String, u32>, u32) {
+    let mut df: HashMap<String, u32> = HashMap::new();
+    let mut n_docs = 0;
+    let content = std::fs::read_to_string(corpus).unwrap_or_default();
+    for line in content.lines() {
+        let vocab = match serde_json::from_str::<VocabularyEntry>(line) {
+            Ok(VocabularyEntry { vocabulary: Some(v) }) => v,
+            _ => continue,
+        };
+        if vocab.is_empty() {
+            continue;
+        }
+        n_docs += 1;
+        let mut terms = bm25::tokenize(&vocab, stemmer);
+        terms.sort();
+        terms.dedup();
+        for t in terms {
+            *df.entry(t).or_insert(0) += 1;
+        }
+    }
+    (df, n_docs)
+}
+
+/// Response words that appear in some way's vocabulary, ranked by
+/// frequency × IDF (the BM25 IDF, so a term most ways share ranks low).
+/// Returns the first surface form seen for each stem.
+fn extract_topics(
+    text: &str,
+    df: &HashMap<String, u32>,
+    n_docs: u32,
+    stemmer: &rust_stemmers::Stemmer,
+) -> Vec<String> {
+    let n = n_docs as f64;
+    // stem → (count, first position, surface form)
+    let mut seen: HashMap<String, (u32, usize, String)> = HashMap::new();
+    for (pos, (stem, surface)) in tokenize_pairs(text, stemmer).into_iter().enumerate() {
+        if df.contains_key(&stem) {
+            seen.entry(stem).or_insert((0, pos, surface)).0 += 1;
+        }
+    }
+
+    let mut ranked: Vec<(f64, usize, String)> = seen
+        .into_iter()
+        .map(|(stem, (count, pos, surface))| {
+            let d = df[&stem] as f64;
+            let idf = ((n - d + 0.5) / (d + 0.5) + 1.0).ln().max(0.0);
+            (count as f64 * idf, pos, surface)
+        })
+        .collect();
+    ranked.sort_by(|a, b| {
+        b.0.partial_cmp(&a.0)
+            .unwrap_or(std::cmp::Ordering::Equal)
+            .then(a.1.cmp(&b.1))
+    });
+    ranked.into_iter().take(MAX_TOPICS).map(|(_, _, s)| s).collect()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn write_transcript(name: &str, lines: &[serde_json::Value]) -> std::path::PathBuf {
+        let path = std::env::temp_dir().join(format!("ways-response-{name}-{}.jsonl", std::process::id()));
+        let body: Vec<String> = lines.iter().map(|l| l.to_string()).collect();
+        std::fs::write(&path, body.join("\n") + "\n").unwrap();
+        path
+    }
+
+    fn assistant(text: &str) -> serde_json::Value {
+        serde_json::json!({"type": "assistant", "message": {"content": [{"type": "text", "text": text}]}})
+    }
+
+    #[test]
+    fn last_turn_stops_at_prompt() {
+        let path = write_transcript("turn", &[
+            assistant("old answer"),
+            serde_json::json!({"type": "user", "message": {"content": "next question"}}),
+            assistant("first part"),
+            serde_json::json!({"type": "user", "message": {"content": [{"type": "tool_result", "content": "x"}]}}),
+            assistant("second part"),
+        ]);
+        assert_eq!(last_response(&path).as_deref(), Some("first part\nsecond part"));
+        std::fs::remove_file(path).ok();
+    }
+
+    #[test]
+    fn tail_crosses_block_boundaries() {
+        let filler = "y".repeat(TAIL_CHUNK as usize);
+        let path = write_transcript("blocks", &[
+            serde_json::json!({"type": "user", "message": {"content": "go"}}),
+            assistant("migration plan"),
+            serde_json::json!({"type": "user", "message": {"content": [{"type": "tool_result", "content": filler}]}}),
+        ]);
+        assert_eq!(last_response(&path).as_deref(), Some("migration plan"));
+        std::fs::remove_file(path).ok();
+    }
+
+    #[test]
+    fn topics_rank_rare_vocabulary_first() {
+        let stemmer = bm25::new_stemmer();
+        let mut df = HashMap::new();
+        df.insert(stemmer.stem("migration").to_string(), 1);
+        df.insert(stemmer.stem("test").to_string(), 8);
+        let topics = extract_topics("Tests pass. The migration and the migrations run.", &df, 10, &stemmer);
+        assert_eq!(topics, vec!["migration".to_string(), "tests".to_string()]);
+    }
+
+    #[test]
+    fn stored_df_until_corpus_rewritten() {
+        let dir = std::env::temp_dir().join(format!("ways-response-df-{}", std::process::id()));
+        std::fs::create_dir_all(&dir).unwrap();
+        let corpus = dir.join("ways-corpus.jsonl");
+        std::fs::write(&corpus, concat!(
+            r#"{"id":"a","vocabulary":"migration schema","embedding":[0.1,0.2]}"#, "\n",
+            r#"{"id":"b","vocabulary":"schema test"}"#, "\n",
+            r#"{"id":"c","description":"no vocabulary"}"#, "\n",
+        )).unwrap();
+
+        let stemmer = bm25::new_stemmer();
+        let (df, n_docs) = vocabulary_index(&corpus, &stemmer);
+        assert_eq!(n_docs, 2);
+        assert_eq!(df[stemmer.stem("schema").as_ref()], 2);
+
+        write_vocabulary_df(&corpus).unwrap();
+        assert_eq!(load_vocabulary_df(&corpus), Some((df, n_docs)));
+
+        // A corpus newer than the table (re-embedded, regenerated) wins
+        let later = std::time::SystemTime::now() + std::time::Duration::from_secs(5);
+        std::fs::File::options().write(true).open(&corpus).unwrap().set_modified(later).unwrap();
+        assert_eq!(load_vocabulary_df(&corpus), None);
+        std::fs::remove_dir_all(dir).ok();
+    }
+}
@@ -122,7 +122,7 @@ fn parse_way_file(content: &str) -> Option<(String, String, String)> {
 }
 
 /// Tokenize text preserving original form alongside stem.
-fn tokenize_pairs(text: &str, stemmer: &rust_stemmers::Stemmer) -> Vec<(String, String)> {
+pub(crate) fn tokenize_pairs(text: &str, stemmer: &rust_stemmers::Stemmer) -> Vec<(String, String)> {
     let mut pairs = Vec::new();
     let mut current = String::new();
 
@@ -339,6 +339,18 @@ enum ScanCommand {
         #[arg(long)]
         transcript: Option<String>,
     },
+    /// Extract topics from the last response for the next prompt scan (Stop hook)
+    ///
+    /// Reads the Stop hook payload on stdin unless --session and --transcript
+    /// are both given. Writes /tmp/claude-response-topics-{session}.
+    Response {
+        /// Session ID
+        #[arg(long)]
+        session: Option<String>,
+        /// Transcript path
+        #[arg(long)]
+        transcript: Option<String>,
+    },
 }
 
 #[derive(Subcommand)]
@@ -474,6 +486,9 @@ fn main() -> Result<()> {
             ScanCommand::State { session, project, transcript } => {
                 cmd::scan::state(&session, project.as_deref(), transcript.as_deref())
             }
+            ScanCommand::Response { session, transcript } => {
+                cmd::scan::response(session.as_deref(), transcript.as_deref())
+            }
         },
         Commands::Show { what } => match what {
             ShowCommand::Way { id, session, trigger } => {
@@ -400,7 +400,7 @@ pub fn log_event(fields: &[(&str, &str)]) {
 }
 
 /// UTC timestamp without chrono dependency.
-fn chrono_utc_now() -> String {
+pub(crate) fn chrono_utc_now() -> String {
     let secs = std::time::SystemTime::now()
         .duration_since(std::time::UNIX_EPOCH)
         .unwrap_or_default()
@@ -170,6 +170,24 @@ impl Session {
 
         String::from_utf8_lossy(&output.stdout).to_string()
     }
+
+    /// Run the Stop-hook extraction; returns the topics it wrote.
+    fn scan_response(&self, transcript: &std::path::Path) -> Option<String> {
+        let topics_file = format!("/tmp/claude-response-topics-{}", self.id);
+        std::fs::remove_file(&topics_file).ok();
+        Command::new(ways_bin())
+            .args(["scan", "response", "--session", &self.id, "--transcript"])
+            .arg(transcript)
+            .env("HOME", fixture_home())
+            .env("XDG_CACHE_HOME", self.corpus.parent().unwrap().parent().unwrap().parent().unwrap())
+            .status()
+            .expect("Failed to run ways scan response");
+
+        let state = std::fs::read_to_string(&topics_file).ok()?;
+        std::fs::remove_file(&topics_file).ok();
+        let state: serde_json::Value = serde_json::from_str(&state).ok()?;
+        state["topics"].as_str().map(|s| s.to_string())
+    }
 }
 
 impl Drop for Session {
@@ -489,3 +507,32 @@ fn scenario_10_state_triggers() {
         "State trigger should not re-fire (marker exists)"
     );
 }
+
+// ── Scenario 11: Response Topics ──────────────────────────────
+
+#[test]
+fn scenario_11_response_topics() {
+    let s = Session::new("s11");
+    let transcript = std::env::temp_dir().join(format!("{}-transcript.jsonl", s.id));
+    let lines = [
+        serde_json::json!({"type": "user", "message": {"content": "tidy this module"}}),
+        serde_json::json!({"type": "assistant", "message": {"content": [
+            {"type": "text", "text": "I will refactor the parser and add a mock for the unit tests."}
+        ]}}),
+        serde_json::json!({"type": "user", "message": {"content": [{"type": "tool_result", "content": "ok"}]}}),
+        serde_json::json!({"type": "assistant", "message": {"content": [
+            {"type": "text", "text": "Done: the refactor is in and the mock covers the edge case."}
+        ]}}),
+    ];
+    let body: Vec<String> = lines.iter().map(|l| l.to_string()).collect();
+    std::fs::write(&transcript, body.join("\n") + "\n").unwrap();
+
+    // Words from way vocabulary across the whole turn; plain words are dropped
+    let topics = s.scan_response(&transcript).expect("Expected a topics file");
+    let topics: Vec<&str> = topics.split_whitespace().collect();
+    assert!(topics.contains(&"refactor"), "Expected refactor in {topics:?}");
+    assert!(topics.contains(&"mock"), "Expected mock in {topics:?}");
+    assert!(!topics.contains(&"parser"), "Non-vocabulary word in {topics:?}");
+
+    std::fs::remove_file(transcript).ok();
+}